@@ -46,6 +46,10 @@ export class Media {
   @Column({ name: 'error_message', type: 'text', nullable: true })
   errorMessage: string;
 
+  // Percent transcribed so far (set by transcription-worker while streaming)
+  @Column({ type: 'int', nullable: true })
+  progress: number;
+
   @CreateDateColumn({ name: 'created_at' })
   createdAt: Date;
 
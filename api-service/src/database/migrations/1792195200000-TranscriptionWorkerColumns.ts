@@ -0,0 +1,19 @@
+import { MigrationInterface, QueryRunner } from 'typeorm';
+
+// Columns written by transcription-worker on API-owned tables (declared on the
+// Media and Transcript entities). The worker only creates its own tables.
+export class TranscriptionWorkerColumns1792195200000 implements MigrationInterface {
+  name = 'TranscriptionWorkerColumns1792195200000';
+
+  public async up(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`ALTER TABLE "media" ADD COLUMN IF NOT EXISTS "progress" integer`);
+    await queryRunner.query(`ALTER TABLE "transcripts" ADD COLUMN IF NOT EXISTS "model" character varying`);
+    await queryRunner.query(`ALTER TABLE "transcripts" ADD COLUMN IF NOT EXISTS "segments_packed" bytea`);
+  }
+
+  public async down(queryRunner: QueryRunner): Promise<void> {
+    await queryRunner.query(`ALTER TABLE "transcripts" DROP COLUMN IF EXISTS "segments_packed"`);
+    await queryRunner.query(`ALTER TABLE "transcripts" DROP COLUMN IF EXISTS "model"`);
+    await queryRunner.query(`ALTER TABLE "media" DROP COLUMN IF EXISTS "progress"`);
+  }
+}
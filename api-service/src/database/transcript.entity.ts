@@ -21,6 +21,15 @@ export class Transcript {
   @Column({ type: 'float', nullable: true })
   confidence: number;
 
+  // Whisper model that produced this transcript (set by transcription-worker)
+  @Column({ type: 'varchar', nullable: true })
+  model: string;
+
+  // Compact binary segments (transcription-worker segment_codec.py); set when the
+  // worker runs with TRANSCRIPT_STORAGE_FORMAT=packed or both
+  @Column({ name: 'segments_packed', type: 'bytea', nullable: true, select: false })
+  segmentsPacked: Buffer;
+
   @CreateDateColumn({ name: 'created_at' })
   createdAt: Date;
 
@@ -30,16 +39,22 @@ export class Transcript {
   media: Media;
 }
 
-// Interface for transcript segments (Whisper output format)
+// Interface for transcript segments (as saved by transcription-worker)
 export interface TranscriptSegment {
-  id: number;
-  seek: number;
   start: number;
   end: number;
   text: string;
+  confidence: number; // Geometric-mean token probability (0-1)
   tokens: number[];
-  temperature: number;
   avg_logprob: number;
-  compression_ratio: number;
   no_speech_prob: number;
+  words?: TranscriptWords; // Set when the worker runs with WORD_TIMESTAMPS_ENABLED
+}
+
+// Per-word timings as parallel arrays (index i across all four is one word)
+export interface TranscriptWords {
+  text: string[];
+  start: number[];
+  end: number[];
+  probability: number[];
 }
@@ -0,0 +1,173 @@
+"""
+Async database service for the asyncio runtime (asyncpg)
+"""
+import time
+from typing import Dict, List, Optional
+import asyncpg
+from logger import logger
+from database_service import SCHEMA_LOCK_ID, SCHEMA_STATEMENTS, segment_columns
+import metrics
+import config
+
+class AsyncDatabaseService:
+    def __init__(self):
+        """Initialize (the pool is opened in connect)"""
+        self.pool = None
+    
+    async def connect(self):
+        """Open the connection pool"""
+        try:
+            self.pool = await asyncpg.create_pool(
+                host=config.DATABASE_HOST,
+                port=config.DATABASE_PORT,
+                database=config.DATABASE_NAME,
+                user=config.DATABASE_USER,
+                password=config.DATABASE_PASSWORD,
+                min_size=config.DATABASE_POOL_MIN,
+                max_size=config.DATABASE_POOL_MAX
+            )
+            logger.info(f"✅ Database connected (async pool: {config.DATABASE_POOL_MIN}-{config.DATABASE_POOL_MAX})")
+            
+            # Same worker-owned tables as the sync runtime
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute("SELECT pg_advisory_xact_lock($1)", SCHEMA_LOCK_ID)
+                    for statement in SCHEMA_STATEMENTS:
+                        await conn.execute(statement)
+        except Exception as e:
+            logger.error(f"❌ Database connection failed: {str(e)}")
+            raise
+    
+    async def disconnect(self):
+        """Close the connection pool"""
+        if self.pool:
+            await self.pool.close()
+            logger.info("✅ Database disconnected")
+    
+    async def get_media(self, media_id: str) -> Optional[Dict]:
+        """
+        Get media information
+        
+        Args:
+            media_id: Media UUID
+            
+        Returns:
+            Media dict or None
+        """
+        try:
+            row = await self.pool.fetchrow(
+                """
+                SELECT id, user_id, project_id, filename, original_s3_key,
+                       audio_s3_key, duration, status
+                FROM media
+                WHERE id = $1
+                """,
+                media_id
+            )
+            if row:
+                return {
+                    'id': str(row['id']),
+                    'user_id': str(row['user_id']),
+                    'project_id': str(row['project_id']),
+                    'filename': row['filename'],
+                    'original_s3_key': row['original_s3_key'],
+                    'audio_s3_key': row['audio_s3_key'],
+                    'duration': row['duration'],
+                    'status': row['status']
+                }
+            return None
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get media: {str(e)}")
+            raise
+    
+    async def update_media_status(self, media_id: str, status: str, error: Optional[str] = None):
+        """
+        Update media status
+        
+        Args:
+            media_id: Media UUID
+            status: New status (processing, transcribing, complete, failed)
+            error: Optional error message
+        """
+        try:
+            with metrics.DB_WRITE_SECONDS.labels('update_media_status').time():
+                if error:
+                    await self.pool.execute(
+                        "UPDATE media SET status = $1, error = $2, updated_at = NOW() WHERE id = $3",
+                        status, error, media_id
+                    )
+                else:
+                    await self.pool.execute(
+                        "UPDATE media SET status = $1, updated_at = NOW() WHERE id = $2",
+                        status, media_id
+                    )
+            logger.info(f"📝 Updated media {media_id} status: {status}")
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to update media status: {str(e)}")
+            raise
+    
+    async def complete_transcript(
+        self,
+        media_id: str,
+        text: str,
+        segments: List[Dict],
+        language: str,
+        confidence: float,
+        model: Optional[str] = None
+    ) -> str:
+        """
+        Save transcript, its segment rows and mark media complete in one commit
+        
+        Args:
+            media_id: Media UUID
+            text: Full transcript text
+            segments: List of transcript segments with timestamps
+            language: Detected language
+            confidence: Average confidence score
+            model: Whisper model that produced the transcript (None = config.WHISPER_MODEL)
+            
+        Returns:
+            Transcript UUID
+        """
+        try:
+            start_time = time.time()
+            segments_json, segments_packed = segment_columns(segments)
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    # Same per-media advisory lock as the sync runtime (live jobs vs backfill)
+                    await conn.execute("SELECT pg_advisory_xact_lock(hashtext($1))", media_id)
+                    transcript_id = await conn.fetchval(
+                        """
+                        INSERT INTO transcripts (media_id, text, segments, segments_packed, language, confidence, model)
+                        VALUES ($1, $2, $3::jsonb, $4, $5, $6, $7)
+                        RETURNING id
+                        """,
+                        media_id, text, segments_json, segments_packed, language, confidence,
+                        model or config.WHISPER_MODEL
+                    )
+                    
+                    # Segment rows go in through COPY
+                    await conn.execute("DELETE FROM transcript_segments WHERE media_id = $1", media_id)
+                    await conn.copy_records_to_table(
+                        'transcript_segments',
+                        columns=['media_id', 'idx', 'start_time', 'end_time', 'text'],
+                        records=[
+                            (media_id, idx, segment['start'], segment['end'], segment['text'])
+                            for idx, segment in enumerate(segments)
+                        ]
+                    )
+                    
+                    await conn.execute(
+                        "UPDATE media SET status = 'complete', progress = 100, updated_at = NOW() WHERE id = $1",
+                        media_id
+                    )
+            metrics.DB_WRITE_SECONDS.labels('complete_transcript').observe(time.time() - start_time)
+            
+            logger.info(f"💾 Saved transcript {transcript_id} for media {media_id} (status: complete)")
+            return str(transcript_id)
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to save transcript: {str(e)}")
+            raise
@@ -0,0 +1,133 @@
+"""
+Async RabbitMQ service for the asyncio runtime (aio-pika)
+"""
+import json
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict
+import aio_pika
+from logger import logger
+from queue_service import JobPoisoned, retry_delay_ms, retry_queue_name, retry_queue_arguments
+import metrics
+import config
+
+class AsyncQueueService:
+    def __init__(self, prefetch_count: int):
+        """
+        Initialize (the connection is opened in connect)
+        
+        Args:
+            prefetch_count: Jobs in flight at once
+        """
+        self.prefetch_count = prefetch_count
+        self.connection = None
+        self.channel = None
+        self.queue = None
+        self._tasks = set()  # Running job tasks (kept referenced until done)
+        self._retry_queues = set()
+    
+    async def connect(self):
+        """Connect to RabbitMQ"""
+        try:
+            self.connection = await aio_pika.connect_robust(config.RABBITMQ_URL)
+            self.channel = await self.connection.channel()
+            await self.channel.set_qos(prefetch_count=self.prefetch_count)
+            
+            # Ensure queue exists with same configuration as API service
+            self.queue = await self.channel.declare_queue(
+                config.RABBITMQ_QUEUE,
+                durable=True,
+                arguments={
+                    'x-message-ttl': 3600000,  # 1 hour TTL
+                    'x-dead-letter-exchange': f'{config.RABBITMQ_EXCHANGE}.dlx'
+                }
+            )
+            
+            logger.info("✅ RabbitMQ connected (aio-pika)")
+            logger.info(f"   Queue: {config.RABBITMQ_QUEUE}")
+            logger.info(f"   Prefetch: {self.prefetch_count}")
+            
+        except Exception as e:
+            logger.error(f"❌ RabbitMQ connection failed: {str(e)}")
+            raise
+    
+    async def disconnect(self):
+        """Wait for running jobs, then disconnect"""
+        try:
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            if self.connection:
+                await self.connection.close()
+            logger.info("✅ RabbitMQ disconnected")
+        except Exception as e:
+            logger.error(f"❌ RabbitMQ disconnect error: {str(e)}")
+    
+    async def _retry_or_dead_letter(self, message: aio_pika.IncomingMessage, retry_count: int, poisoned: bool = False):
+        """Park a failed job in its backoff queue, or send it to the DLQ (poisoned jobs right away)"""
+        if retry_count < config.MAX_RETRIES and not poisoned:
+            delay_ms = retry_delay_ms(retry_count)
+            logger.warning(
+                f"🔄 Retrying job in {delay_ms / 1000:g}s (attempt {retry_count + 1}/{config.MAX_RETRIES})"
+            )
+            
+            queue = retry_queue_name(delay_ms)
+            if queue not in self._retry_queues:
+                await self.channel.declare_queue(queue, durable=True, arguments=retry_queue_arguments(delay_ms))
+                self._retry_queues.add(queue)
+            
+            headers = dict(message.headers or {})
+            headers['x-retry-count'] = retry_count + 1
+            await self.channel.default_exchange.publish(
+                aio_pika.Message(
+                    body=message.body,
+                    headers=headers,
+                    timestamp=message.timestamp,
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+                ),
+                routing_key=queue
+            )
+            await message.ack()
+            metrics.JOBS_TOTAL.labels('retried').inc()
+        else:
+            logger.error(f"💀 {'Poisoned job' if poisoned else 'Max retries reached'}, sending to DLQ")
+            await message.reject(requeue=False)
+            metrics.JOBS_TOTAL.labels('dead_lettered').inc()
+    
+    async def _handle(self, message: aio_pika.IncomingMessage, handler: Callable[[Dict], Awaitable[None]]):
+        """Run one job and settle its message"""
+        retry_count = (message.headers or {}).get('x-retry-count', 0)
+        try:
+            job = json.loads(message.body)
+            logger.info(f"📥 Received job: {job.get('mediaId')} ({job.get('operation')})")
+            
+            try:
+                if message.timestamp:
+                    metrics.QUEUE_WAIT_SECONDS.observe(max(0.0, time.time() - message.timestamp.timestamp()))
+            except (ValueError, OverflowError, OSError):
+                pass  # Publisher used a non-standard timestamp unit
+            
+            await handler(job)
+            
+            await message.ack()
+            metrics.JOBS_TOTAL.labels('completed').inc()
+            logger.info(f"✅ Job completed: {job.get('mediaId')}")
+            
+        except Exception as e:
+            logger.error(f"❌ Job failed: {str(e)}")
+            await self._retry_or_dead_letter(message, retry_count, isinstance(e, JobPoisoned))
+    
+    async def consume(self, handler: Callable[[Dict], Awaitable[None]]):
+        """
+        Consume jobs until cancelled, up to prefetch_count at a time
+        
+        Args:
+            handler: Coroutine processing one job
+        """
+        async def on_message(message: aio_pika.IncomingMessage):
+            task = asyncio.create_task(self._handle(message, handler))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        
+        logger.info(f"🎧 Listening for jobs on queue: {config.RABBITMQ_QUEUE}")
+        await self.queue.consume(on_message, no_ack=False)
+        await asyncio.Future()  # Run until cancelled
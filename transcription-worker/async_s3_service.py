@@ -0,0 +1,133 @@
+"""
+Async S3 service for streaming audio downloads (asyncio runtime)
+"""
+import os
+import time
+import asyncio
+import numpy as np
+from aiobotocore.session import get_session
+from logger import logger
+from audio_utils import ffmpeg_command, duration_of
+import metrics
+import config
+
+STREAM_CHUNK_SIZE = 1024 * 1024  # bytes per read from the S3 body
+
+class AsyncS3Service:
+    def __init__(self):
+        """Initialize (the client is opened in connect)"""
+        self.bucket = config.S3_BUCKET
+        self._client_context = None
+        self.client = None
+    
+    async def connect(self):
+        """Open the S3 client"""
+        session = get_session()
+        self._client_context = session.create_client(
+            's3',
+            endpoint_url=config.S3_ENDPOINT,
+            aws_access_key_id=config.S3_ACCESS_KEY,
+            aws_secret_access_key=config.S3_SECRET_KEY,
+            region_name=config.S3_REGION
+        )
+        self.client = await self._client_context.__aenter__()
+        logger.info(f"✅ Async S3 client initialized (endpoint: {config.S3_ENDPOINT})")
+    
+    async def disconnect(self):
+        """Close the S3 client"""
+        if self._client_context:
+            await self._client_context.__aexit__(None, None, None)
+            self._client_context = None
+    
+    async def download_file(self, s3_key: str, local_path: str) -> None:
+        """
+        Stream an S3 object to a local file
+        
+        Args:
+            s3_key: S3 object key
+            local_path: Local file path to save to
+        """
+        try:
+            logger.info(f"📥 Downloading from S3: {s3_key} → {local_path}")
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            
+            start_time = time.time()
+            response = await self.client.get_object(Bucket=self.bucket, Key=s3_key)
+            body = response['Body']
+            with open(local_path, 'wb') as f:
+                while True:
+                    chunk = await body.read(STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            
+            file_size = os.path.getsize(local_path)
+            metrics.S3_DOWNLOAD_SECONDS.labels('file').observe(time.time() - start_time)
+            metrics.S3_DOWNLOAD_BYTES.labels('file').observe(file_size)
+            logger.info(f"✅ Downloaded {file_size} bytes from S3")
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to download from S3: {str(e)}")
+            raise
+    
+    async def download_pcm(self, s3_key: str) -> np.ndarray:
+        """
+        Stream an S3 object through an ffmpeg subprocess into memory
+        
+        Args:
+            s3_key: S3 object key
+            
+        Returns:
+            float32 mono PCM at 16 kHz
+        """
+        try:
+            logger.info(f"📥 Streaming from S3: {s3_key} → memory")
+            
+            start_time = time.time()
+            response = await self.client.get_object(Bucket=self.bucket, Key=s3_key)
+            body = response['Body']
+            
+            process = await asyncio.create_subprocess_exec(
+                *ffmpeg_command('pipe:0'),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            
+            async def feed():
+                try:
+                    while True:
+                        chunk = await body.read(STREAM_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        process.stdin.write(chunk)
+                        await process.stdin.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # ffmpeg exited early; reported via its return code
+                finally:
+                    process.stdin.close()
+            
+            # Not communicate(): it would close stdin before feed() is done
+            _, stdout, stderr = await asyncio.gather(
+                feed(), process.stdout.read(), process.stderr.read()
+            )
+            await process.wait()
+            if process.returncode != 0:
+                raise RuntimeError(f"ffmpeg decode failed: {stderr.decode(errors='ignore').strip()}")
+            
+            # bytearray keeps the NumPy view writable (torch.from_numpy needs that)
+            audio = np.frombuffer(bytearray(stdout), dtype=np.float32)
+            
+            elapsed = time.time() - start_time
+            metrics.S3_DOWNLOAD_SECONDS.labels('stream').observe(elapsed)
+            metrics.S3_DOWNLOAD_BYTES.labels('stream').observe(response['ContentLength'])
+            metrics.DECODE_SECONDS.labels('stream').observe(elapsed)
+            logger.info(
+                f"✅ Decoded {response['ContentLength']} bytes from S3 "
+                f"({duration_of(audio):.1f}s of audio)"
+            )
+            return audio
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to stream from S3: {str(e)}")
+            raise
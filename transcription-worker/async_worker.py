@@ -0,0 +1,197 @@
+"""
+Asyncio Transcription Worker
+Overlaps many downloads and DB writes while Whisper inference stays busy
+"""
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from logger import logger
+from queue_service import JobPoisoned
+from async_queue_service import AsyncQueueService
+from async_s3_service import AsyncS3Service
+from async_database_service import AsyncDatabaseService
+from whisper_service import WhisperService
+from metrics import start_metrics_server
+from readiness import mark_ready, mark_not_ready
+from silence_trimmer import trim_silence
+from audio_utils import decode_file
+import config
+
+def unsupported_settings() -> List[str]:
+    """
+    Enabled settings this runtime doesn't implement
+    
+    Each of them changes which model runs or what gets written, so starting
+    anyway would silently produce different transcripts than the sync
+    runtime.
+    """
+    enabled = {
+        'ADAPTIVE_MODELS_ENABLED': config.ADAPTIVE_MODELS_ENABLED,
+        'MODEL_UPGRADE_ENABLED': config.MODEL_UPGRADE_ENABLED,
+        'LANGUAGE_ROUTING_ENABLED': config.LANGUAGE_ROUTING_ENABLED,
+        'MEMORY_ADMISSION_ENABLED': config.MEMORY_ADMISSION_ENABLED,
+        'JOB_CRASH_LIMIT': config.JOB_CRASH_LIMIT > 0,
+        'TRANSCRIPT_CACHE_ENABLED': config.TRANSCRIPT_CACHE_ENABLED,
+        'STREAMING_ENABLED': config.STREAMING_ENABLED
+    }
+    return [name for name, on in enabled.items() if on]
+
+class AsyncTranscriptionWorker:
+    def __init__(self):
+        """Initialize worker (connections are opened in start)"""
+        unsupported = unsupported_settings()
+        if unsupported:
+            raise RuntimeError(
+                f"The asyncio runtime doesn't support {', '.join(unsupported)}: "
+                f"unset them or use --runtime sync"
+            )
+        
+        self.s3_service = AsyncS3Service()
+        self.db_service = AsyncDatabaseService()
+        self.queue_service = AsyncQueueService(prefetch_count=config.ASYNC_PREFETCH)
+        self.whisper_service = None  # Loaded in start, alongside the connects
+        
+        # One inference thread: the model is CPU-bound and not safe to share
+        # across concurrent calls, so extra jobs wait here while their I/O runs
+        self.inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
+        
+        os.makedirs(config.TEMP_DIR, exist_ok=True)
+    
+    async def process_job(self, job: Dict):
+        """
+        Process a transcription job (same job format as TranscriptionWorker)
+        
+        Long-form chunking and semantic indexing are only available in the
+        sync runtime. Upgrade jobs are dead-lettered untouched: they replace
+        an existing transcript, which only the sync runtime does.
+        """
+        media_id = job['mediaId']
+        audio_path = os.path.join(config.TEMP_DIR, f"{media_id}-audio.mp3")
+        model_name = job.get('model') or config.WHISPER_MODEL
+        
+        if job.get('operation') == 'upgrade':
+            raise JobPoisoned(f"Upgrade jobs need the sync runtime (media {media_id})")
+        
+        logger.info(f"🎯 Processing transcription job: {media_id}")
+        
+        try:
+            # Step 1: Get media info
+            media = await self.db_service.get_media(media_id)
+            if not media:
+                raise Exception(f"Media not found: {media_id}")
+            
+            # Step 2: Download audio from S3
+            if config.AUDIO_IN_MEMORY:
+                audio = await self.s3_service.download_pcm(job['s3Key'])
+            else:
+                await self.s3_service.download_file(job['s3Key'], audio_path)
+                audio = audio_path
+            
+            # Step 3: Transcribe off the event loop
+            start_time = time.time()
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.inference_executor, self._transcribe, audio, model_name)
+            transcription_time = time.time() - start_time
+            logger.info(f"⏱️  Transcription took {transcription_time:.2f} seconds (incl. queueing for the model)")
+            
+            # Step 4: Save transcript and mark media COMPLETE in one commit
+            transcript_id = await self.db_service.complete_transcript(
+                media_id=media_id,
+                text=result['text'],
+                segments=result['segments'],
+                language=result['language'],
+                confidence=result['confidence'],
+                model=model_name
+            )
+            
+            logger.info(f"✅ Transcription complete!")
+            logger.info(f"   Media ID: {media_id}")
+            logger.info(f"   Transcript ID: {transcript_id}")
+            
+        except Exception as e:
+            logger.error(f"❌ Job failed: {str(e)}")
+            
+            # Update media status to FAILED
+            try:
+                await self.db_service.update_media_status(media_id, 'failed', str(e))
+            except:
+                pass
+            
+            raise
+        
+        finally:
+            # Cleanup temp file
+            if os.path.exists(audio_path):
+                try:
+                    os.remove(audio_path)
+                    logger.info(f"🗑️  Cleaned up temp file: {audio_path}")
+                except Exception as e:
+                    logger.warning(f"⚠️  Failed to cleanup temp file: {str(e)}")
+    
+    async def start(self):
+        """Start the worker"""
+        logger.info("═" * 60)
+        logger.info("🎙️  SyncSearch Transcription Worker (asyncio runtime)")
+        logger.info("    Whisper AI Transcription Service")
+        logger.info("═" * 60)
+        logger.info("")
+        logger.info("🚀 Starting Transcription Worker...")
+        
+        try:
+            start_metrics_server()
+            
+            # Load and warm up the model on the inference thread while connecting
+            loop = asyncio.get_running_loop()
+            self.whisper_service, *_ = await asyncio.gather(
+                loop.run_in_executor(self.inference_executor, self._load_whisper),
+                self.s3_service.connect(),
+                self.db_service.connect(),
+                self.queue_service.connect()
+            )
+            mark_ready()
+            
+            logger.info("✅ Worker initialized")
+            logger.info(f"🎬 Transcription Worker started - up to {config.ASYNC_PREFETCH} jobs in flight...")
+            logger.info("")
+            
+            await self.queue_service.consume(self.process_job)
+            
+        except asyncio.CancelledError:
+            logger.info("")
+            logger.info("🛑 Received shutdown signal")
+        finally:
+            await self.stop()
+    
+    def _load_whisper(self) -> WhisperService:
+        """Load the model and run the warm-up inference (on the inference thread)"""
+        whisper_service = WhisperService()
+        if config.WARMUP_ENABLED:
+            whisper_service.warm_up()
+        return whisper_service
+
+    def _transcribe(self, audio, model_name: str) -> Dict:
+        """Transcribe on the inference thread, trimming silence first when enabled"""
+        if not config.SILENCE_TRIM_ENABLED:
+            return self.whisper_service.transcribe(audio, model_name)
+
+        pcm = audio if not isinstance(audio, str) else decode_file(audio)
+        trimmed, offset_map = trim_silence(pcm)
+        result = self.whisper_service.transcribe(trimmed, model_name)
+        return offset_map.remap_result(result) if offset_map else result
+
+    async def stop(self):
+        """Stop the worker gracefully"""
+        logger.info("🛑 Shutting down Transcription Worker...")
+        mark_not_ready()
+        
+        try:
+            await self.queue_service.disconnect()
+            await self.db_service.disconnect()
+            await self.s3_service.disconnect()
+            self.inference_executor.shutdown(wait=True)
+        except Exception as e:
+            logger.error(f"❌ Error during shutdown: {str(e)}")
+        
+        logger.info("✅ Worker stopped")
@@ -0,0 +1,174 @@
+"""
+Host-level audio cache shared by the worker processes on one machine
+"""
+import os
+import fcntl
+import shutil
+import hashlib
+from contextlib import contextmanager
+from typing import Callable
+from logger import logger
+import metrics
+
+class AudioCache:
+    """
+    Content-addressed on-disk cache of S3 audio objects
+
+    Entries are named by a hash of the object's ETag and size, so a changed
+    object never matches an old entry. Every process pointed at the same
+    AUDIO_CACHE_DIR shares the entries:
+
+    - Fills are serialized with flock on one of 256 striped lock files, so
+      concurrent misses for one object download it once.
+    - Downloads go to a temp file that is renamed into place, so readers
+      never see a partial entry.
+    - Hits bump the entry's mtime. Whichever process pushes the total over
+      AUDIO_CACHE_MAX_MB evicts least-recently-used entries. Unlinking is
+      safe while another process still reads the file.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        """
+        Initialize cache
+
+        Args:
+            root: Cache directory (shared between processes, e.g. a host volume)
+            max_bytes: Total size budget
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, 'locks'), exist_ok=True)
+        logger.info(f"✅ Audio cache: {root} ({max_bytes // (1024 * 1024)} MB)")
+
+    def _entry_path(self, etag: str) -> str:
+        """Entry file for an object version"""
+        return os.path.join(self.root, hashlib.sha256(etag.encode('utf-8')).hexdigest() + '.audio')
+
+    @contextmanager
+    def _locked(self, name: str, blocking: bool = True):
+        """Exclusive flock on locks/<name>; yields False if non-blocking and already held"""
+        with open(os.path.join(self.root, 'locks', name), 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _valid(self, path: str, size: int) -> bool:
+        """Entry exists and has the object's size (catches truncated files)"""
+        try:
+            return os.path.getsize(path) == size
+        except FileNotFoundError:
+            return False
+
+    def _link(self, entry: str, local_path: str):
+        """Place an entry at local_path (hard link, or a copy across filesystems)"""
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        if os.path.exists(local_path):
+            os.remove(local_path)
+        try:
+            os.link(entry, local_path)
+        except OSError:
+            shutil.copyfile(entry, local_path)
+
+    def entry(self, etag: str, size: int, fill: Callable[[str], None]) -> str:
+        """
+        Path of the cached copy of an object, filling it on a miss
+
+        Args:
+            etag: Object ETag (version identity)
+            size: Object size in bytes (validates the entry)
+            fill: Downloads the object to the given path
+
+        Returns:
+            Entry path (may be evicted later: link or copy it before use)
+        """
+        path = self._entry_path(etag)
+        if self._valid(path, size):
+            os.utime(path)
+            metrics.AUDIO_CACHE_LOOKUPS_TOTAL.labels('hit').inc()
+            return path
+
+        # Striped by hash prefix: lock files are never deleted, so they must not grow per entry
+        with self._locked(os.path.basename(path)[:2] + '.lock'):
+            # Another process may have filled it while we waited
+            if self._valid(path, size):
+                os.utime(path)
+                metrics.AUDIO_CACHE_LOOKUPS_TOTAL.labels('hit').inc()
+                return path
+
+            metrics.AUDIO_CACHE_LOOKUPS_TOTAL.labels('miss').inc()
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                fill(tmp_path)
+                if os.path.getsize(tmp_path) != size:
+                    raise IOError(f"Downloaded {os.path.getsize(tmp_path)} bytes, expected {size}")
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        self.evict()
+        return path
+
+    def fetch(self, etag: str, size: int, local_path: str, fill: Callable[[str], None]) -> bool:
+        """
+        Put an object at local_path, from the cache when possible
+
+        Returns:
+            True if it was served from the cache
+        """
+        path = self._entry_path(etag)
+        hit = self._valid(path, size)
+        entry = self.entry(etag, size, fill)
+        try:
+            self._link(entry, local_path)
+        except FileNotFoundError:
+            # Evicted between lookup and link: fill again
+            self._link(self.entry(etag, size, fill), local_path)
+        return hit
+
+    def evict(self) -> int:
+        """
+        Remove least-recently-used entries until the cache fits its budget
+
+        Only one process evicts at a time; others skip instead of waiting.
+
+        Returns:
+            Bytes freed
+        """
+        with self._locked('evict.lock', blocking=False) as acquired:
+            if not acquired:
+                return 0
+
+            entries = []
+            total = 0
+            with os.scandir(self.root) as it:
+                for item in it:
+                    if not item.name.endswith('.audio'):
+                        continue
+                    try:
+                        stat = item.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+                    total += stat.st_size
+
+            freed = 0
+            entries.sort()
+            for _, size, path in entries:
+                if total - freed <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    freed += size
+                except FileNotFoundError:
+                    pass
+
+            if freed:
+                logger.info(f"🧹 Evicted {freed // (1024 * 1024)} MB from the audio cache")
+            return freed
@@ -0,0 +1,206 @@
+"""
+Audio decoding helpers (ffmpeg → 16 kHz mono float32 PCM)
+"""
+import subprocess
+import threading
+from typing import Iterable, List, Optional
+import numpy as np
+import metrics
+
+SAMPLE_RATE = 16000  # Whisper's expected input rate
+READ_SIZE = 1024 * 1024  # ffmpeg stdout read size (bytes)
+
+def ffmpeg_command(input_arg: str, max_seconds: Optional[float] = None) -> List[str]:
+    """ffmpeg invocation that writes 16 kHz mono float32 PCM to stdout (the first max_seconds only, if set)"""
+    return [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-i', input_arg,
+        *(['-t', str(max_seconds)] if max_seconds else []),
+        '-f', 'f32le', '-acodec', 'pcm_f32le',
+        '-ac', '1', '-ar', str(SAMPLE_RATE),
+        'pipe:1'
+    ]
+
+def _ffmpeg(input_arg: str, chunks: Optional[Iterable[bytes]] = None, max_seconds: Optional[float] = None) -> np.ndarray:
+    """
+    Run ffmpeg and collect its raw PCM output
+    
+    Args:
+        input_arg: ffmpeg input ('pipe:0' to read from chunks, else a file path)
+        chunks: Encoded audio to feed into stdin
+        max_seconds: Stop after this much audio (None = all of it)
+        
+    Returns:
+        float32 mono samples at SAMPLE_RATE
+    """
+    process = subprocess.Popen(
+        ffmpeg_command(input_arg, max_seconds),
+        stdin=subprocess.PIPE if chunks is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    
+    # Feed stdin from a separate thread so stdout never backs up
+    feed_errors: List[Exception] = []
+    
+    def feed():
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            pass  # ffmpeg exited early; reported via its return code
+        except Exception as e:
+            feed_errors.append(e)
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+    
+    writer = None
+    if chunks is not None:
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
+    
+    # bytearray keeps the resulting NumPy view writable (torch.from_numpy needs that)
+    buffer = bytearray()
+    while True:
+        data = process.stdout.read(READ_SIZE)
+        if not data:
+            break
+        buffer += data
+    
+    stderr = process.stderr.read()
+    process.wait()
+    if writer:
+        writer.join()
+    
+    if feed_errors:
+        raise feed_errors[0]
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg decode failed: {stderr.decode(errors='ignore').strip()}")
+    
+    return np.frombuffer(buffer, dtype=np.float32)
+
+def decode_stream(chunks: Iterable[bytes]) -> np.ndarray:
+    """
+    Decode an encoded audio byte stream without touching disk
+    
+    Args:
+        chunks: Iterable of encoded audio bytes (e.g. an S3 body)
+        
+    Returns:
+        float32 mono samples at SAMPLE_RATE
+    """
+    with metrics.DECODE_SECONDS.labels('stream').time():
+        return _ffmpeg('pipe:0', chunks)
+
+def decode_file(path: str, max_seconds: Optional[float] = None) -> np.ndarray:
+    """
+    Decode an audio file on disk
+    
+    Args:
+        path: Local audio file path
+        max_seconds: Only decode the start of the file (None = all of it)
+        
+    Returns:
+        float32 mono samples at SAMPLE_RATE
+    """
+    with metrics.DECODE_SECONDS.labels('file').time():
+        return _ffmpeg(path, max_seconds=max_seconds)
+
+def duration_of(audio: np.ndarray) -> float:
+    """Length of a PCM buffer in seconds"""
+    return len(audio) / SAMPLE_RATE
+
+def frame_levels(audio: np.ndarray, frame_ms: int = 30) -> np.ndarray:
+    """
+    RMS level of each fixed-size frame in dBFS
+    
+    Args:
+        audio: float32 PCM at SAMPLE_RATE
+        frame_ms: Frame length in milliseconds
+        
+    Returns:
+        One dB value per frame (trailing partial frame dropped)
+    """
+    frame = SAMPLE_RATE * frame_ms // 1000
+    n_frames = len(audio) // frame
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    return 20.0 * np.log10(rms + 1e-10)
+
+def frame_zero_crossings(audio: np.ndarray, frame_ms: int = 30) -> np.ndarray:
+    """
+    Zero-crossing rate of each fixed-size frame
+    
+    Args:
+        audio: float32 PCM at SAMPLE_RATE
+        frame_ms: Frame length in milliseconds
+        
+    Returns:
+        Fraction of adjacent sample pairs that change sign, one per frame
+    """
+    frame = SAMPLE_RATE * frame_ms // 1000
+    n_frames = len(audio) // frame
+    signs = np.signbit(audio[:n_frames * frame].reshape(n_frames, frame))
+    return np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame - 1)
+
+def silence_runs(mask: np.ndarray) -> np.ndarray:
+    """
+    Find contiguous True runs in a boolean frame mask
+    
+    Returns:
+        (n, 2) array of [start_frame, end_frame) pairs
+    """
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return edges.reshape(-1, 2)
+
+def split_on_silence(
+    audio: np.ndarray,
+    max_chunk: float,
+    silence_db: float = -40.0,
+    min_silence: float = 0.5,
+    frame_ms: int = 30
+) -> List[tuple]:
+    """
+    Split audio into chunks no longer than max_chunk, cutting inside silences
+    
+    An energy-based VAD marks frames below silence_db as silent. Each chunk
+    ends at the midpoint of the last long-enough silence before the length
+    limit, or is hard-cut at the limit if no silence is found. The result is
+    deterministic for the same audio and parameters, which lets chunk
+    checkpoints be reused across retries.
+    
+    Args:
+        audio: float32 PCM at SAMPLE_RATE
+        max_chunk: Maximum chunk length in seconds
+        silence_db: Frames quieter than this (dBFS) count as silence
+        min_silence: Minimum silence length in seconds to allow a cut
+        frame_ms: VAD frame length in milliseconds
+        
+    Returns:
+        List of (start_sample, end_sample) tuples covering the whole audio
+    """
+    total = len(audio)
+    max_samples = int(max_chunk * SAMPLE_RATE)
+    if total <= max_samples:
+        return [(0, total)]
+    
+    frame = SAMPLE_RATE * frame_ms // 1000
+    runs = silence_runs(frame_levels(audio, frame_ms) < silence_db)
+    min_frames = max(1, int(min_silence * 1000 / frame_ms))
+    runs = runs[(runs[:, 1] - runs[:, 0]) >= min_frames]
+    cut_points = ((runs[:, 0] + runs[:, 1]) // 2) * frame
+    
+    chunks = []
+    start = 0
+    while total - start > max_samples:
+        limit = start + max_samples
+        candidates = cut_points[(cut_points > start) & (cut_points <= limit)]
+        end = int(candidates[-1]) if len(candidates) else limit
+        chunks.append((start, end))
+        start = end
+    chunks.append((start, total))
+    return chunks
@@ -0,0 +1,285 @@
+"""
+Bulk re-transcription of existing media (e.g. after a model change)
+
+Selects media with a server-side cursor and runs them through a bounded
+download → transcribe → write pipeline: S3 downloads on a thread pool, one
+Whisper model per child process across all cores, and bulk writes of
+BACKFILL_BATCH_SIZE transcripts per commit. Progress is checkpointed per
+item in backfill_items, so rerunning the same --run-id resumes.
+
+Usage:
+    python backfill.py --run-id large-v3 --project <uuid> --model large-v3
+    python backfill.py --run-id relabel --status failed --since 2024-01-01
+"""
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+from logger import logger
+import config
+
+# Per-child model, created once by the pool initializer
+_child_whisper = None
+
+def _init_child(num_threads: int, model_name: str):
+    """Load the backfill model (and only that one) inside a freshly spawned child"""
+    global _child_whisper
+
+    # Cap BLAS/OpenMP threads before torch spins up its thread pools
+    os.environ['OMP_NUM_THREADS'] = str(num_threads)
+    os.environ['MKL_NUM_THREADS'] = str(num_threads)
+
+    from whisper_service import WhisperService
+    _child_whisper = WhisperService(num_threads=num_threads, default_model=model_name)
+
+def _transcribe_file(path: str, model_name: str) -> Dict:
+    """Decode and transcribe one file in a child (trimming silence when enabled)"""
+    from audio_utils import decode_file
+    from silence_trimmer import trim_silence
+
+    if not config.SILENCE_TRIM_ENABLED:
+        return _child_whisper.transcribe(path, model_name)
+    trimmed, offset_map = trim_silence(decode_file(path))
+    result = _child_whisper.transcribe(trimmed, model_name)
+    return offset_map.remap_result(result) if offset_map else result
+
+def parse_args():
+    """Parse command line flags"""
+    parser = argparse.ArgumentParser(description='Re-transcribe existing media in bulk')
+    parser.add_argument('--run-id', required=True, help='Run name; rerun with the same name to resume')
+    parser.add_argument('--project', default=None, help='Only media of this project')
+    parser.add_argument('--status', default='complete,failed', help='Only media in these statuses (comma-separated)')
+    parser.add_argument('--since', default=None, help='Only media created at or after this timestamp')
+    parser.add_argument('--until', default=None, help='Only media created before this timestamp')
+    parser.add_argument('--model', default=config.WHISPER_MODEL, help='Whisper model to transcribe with')
+    parser.add_argument('--workers', type=int, default=config.BACKFILL_WORKERS,
+                        help='Transcription processes (0 = cores / WORKER_THREADS_PER_CHILD)')
+    parser.add_argument('--downloads', type=int, default=config.BACKFILL_DOWNLOADS, help='Concurrent S3 downloads')
+    parser.add_argument('--batch-size', type=int, default=config.BACKFILL_BATCH_SIZE, help='Transcripts per commit')
+    parser.add_argument('--limit', type=int, default=None, help='Stop after this many media')
+    parser.add_argument('--dry-run', action='store_true', help='Only count the media that would be transcribed')
+    return parser.parse_args()
+
+class Backfill:
+    def __init__(self, args):
+        """Initialize services (children are spawned on run)"""
+        from s3_service import S3Service
+        from database_service import DatabaseService
+
+        self.args = args
+        self.num_threads = config.WORKER_THREADS_PER_CHILD
+        self.workers = args.workers or max(1, (os.cpu_count() or 1) // self.num_threads)
+        self.s3_service = S3Service()
+        self.db_service = DatabaseService()
+
+        # Downloaded-but-unsaved items: bounds temp disk use and memory ahead of the model
+        self.slots = threading.BoundedSemaphore(self.workers * 2)
+        self.finished = queue.Queue()  # (media_id, result or None, error or None)
+        self.in_flight = 0
+        self.counts = {'done': 0, 'skipped': 0, 'failed': 0}
+        self.downloads = None
+        self.executor = None
+        self._executor_lock = threading.Lock()
+
+    def _audio_path(self, media_id: str) -> str:
+        """Temp file path for an item's audio"""
+        return os.path.join(config.TEMP_DIR, f"backfill-{media_id}-audio")
+
+    def _finish(self, media_id: str, path: str, result: Optional[Dict], error: Optional[str]):
+        """Hand a finished item to the writer and free its slot"""
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"⚠️  Failed to cleanup temp file: {str(e)}")
+        self.finished.put((media_id, result, error))
+        self.slots.release()
+
+    def _start_item(self, media: Dict):
+        """Download one media, then queue it on a child (runs on a download thread)"""
+        media_id = media['id']
+        path = self._audio_path(media_id)
+        try:
+            self.s3_service.download_file(media['audio_s3_key'], path)
+        except Exception as e:
+            self._finish(media_id, path, None, f"Download failed: {str(e)}")
+            return
+
+        executor = self.executor
+        try:
+            transcription = executor.submit(_transcribe_file, path, self.args.model)
+        except BrokenProcessPool:
+            # Another item's child died before this one was queued: retry on a fresh pool
+            executor = self._replace_executor(executor)
+            try:
+                transcription = executor.submit(_transcribe_file, path, self.args.model)
+            except Exception as e:
+                self._finish(media_id, path, None, f"Transcription pool unavailable: {str(e)}")
+                return
+        except Exception as e:
+            self._finish(media_id, path, None, f"Transcription pool unavailable: {str(e)}")
+            return
+
+        def on_done(future: Future):
+            if future.cancelled():
+                self._finish(media_id, path, None, "Cancelled")
+            elif isinstance(future.exception(), BrokenProcessPool):
+                # A child died (e.g. OOM): every item on that pool fails; rerunning the run retries them
+                self._replace_executor(executor)
+                self._finish(media_id, path, None, "Transcription process died")
+            elif future.exception() is not None:
+                self._finish(media_id, path, None, str(future.exception()))
+            else:
+                self._finish(media_id, path, future.result(), None)
+        transcription.add_done_callback(on_done)
+
+    def _spawn(self) -> ProcessPoolExecutor:
+        """Start the transcription children"""
+        # 'spawn' avoids forking a parent that may already hold torch thread state
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_child,
+            initargs=(self.num_threads, self.args.model)
+        )
+
+    def _replace_executor(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Swap a broken pool for a fresh one (once, however many items noticed)"""
+        with self._executor_lock:
+            if self.executor is broken:
+                logger.error("💥 A backfill transcription process died; restarting the pool")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.executor = self._spawn()
+            return self.executor
+
+    def _check_memory(self):
+        """Refuse to start more children than their models fit in memory"""
+        from memory_guard import memory_limit_mb
+        from whisper_service import model_memory_mb
+
+        needed_mb = self.workers * model_memory_mb(self.args.model)
+        limit_mb = memory_limit_mb() - config.MEMORY_HEADROOM_MB
+        if needed_mb > limit_mb:
+            fitting = max(0, int(limit_mb // model_memory_mb(self.args.model)))
+            raise RuntimeError(
+                f"{self.workers} workers x {self.args.model} need ~{needed_mb} MB but only "
+                f"{limit_mb:.0f} MB is available; use --workers {fitting} or less"
+            )
+
+    def _flush(self, force: bool = False):
+        """Write finished items in batches of --batch-size (all of them if force)"""
+        while True:
+            if not force and self.finished.qsize() < self.args.batch_size:
+                return
+            results: List[Dict] = []
+            failures: List[Dict] = []
+            while len(results) + len(failures) < self.args.batch_size:
+                try:
+                    media_id, result, error = self.finished.get_nowait()
+                except queue.Empty:
+                    break
+                self.in_flight -= 1
+                if error is not None:
+                    logger.warning(f"⚠️  Backfill item {media_id} failed: {error}")
+                    failures.append({'media_id': media_id, 'error': error})
+                else:
+                    results.append({
+                        'media_id': media_id,
+                        'text': result['text'],
+                        'segments': result['segments'],
+                        'language': result['language'],
+                        'confidence': result['confidence'],
+                        'model': self.args.model
+                    })
+            if not results and not failures:
+                return
+            for key, count in self.db_service.save_backfill_batch(self.args.run_id, results, failures).items():
+                self.counts[key] += count
+
+    def run(self):
+        """Stream the selection through the pipeline until everything is written"""
+        args = self.args
+        statuses = [status.strip() for status in args.status.split(',') if status.strip()]
+        selection = self.db_service.iter_backfill_media(
+            args.run_id, project_id=args.project, statuses=statuses, since=args.since, until=args.until
+        )
+
+        if args.dry_run:
+            try:
+                total = sum(1 for _ in selection)
+            finally:
+                selection.close()
+                self.db_service.disconnect()
+            logger.info(f"🔎 Backfill '{args.run_id}' would transcribe {total} media")
+            return
+
+        try:
+            self._check_memory()
+            from whisper_service import ensure_model_downloaded
+            ensure_model_downloaded(args.model)
+        except Exception:
+            self.db_service.disconnect()
+            raise
+
+        logger.info(f"🚀 Backfill '{args.run_id}': {self.workers} workers x {self.num_threads} threads, "
+                    f"{args.downloads} downloads, batches of {args.batch_size} (model: {args.model})")
+
+        self.executor = self._spawn()
+        self.downloads = ThreadPoolExecutor(max_workers=args.downloads, thread_name_prefix='backfill-download')
+        start_time = time.time()
+        submitted = 0
+
+        try:
+            for media in selection:
+                if args.limit is not None and submitted >= args.limit:
+                    break
+                # Wait for a free slot, writing finished items meanwhile
+                while not self.slots.acquire(timeout=1.0):
+                    self._flush()
+                self.in_flight += 1
+                submitted += 1
+                self.downloads.submit(self._start_item, media)
+                self._flush()
+
+                if submitted % 100 == 0:
+                    elapsed = time.time() - start_time
+                    logger.info(f"📈 Backfill: {submitted} started, {self.counts['done']} saved "
+                                f"({self.counts['done'] / elapsed:.2f}/s)")
+
+            # Drain: full batches as they fill, then the remainder once everything is back
+            while self.in_flight:
+                self._flush(force=self.finished.qsize() >= self.in_flight)
+                time.sleep(0.5)
+
+        finally:
+            # Releases the cursor and the run lock
+            selection.close()
+            self.downloads.shutdown(wait=True, cancel_futures=True)
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            # Items finished before an interrupt are still worth saving
+            self._flush(force=True)
+            self.db_service.disconnect()
+
+        elapsed = time.time() - start_time
+        logger.info(f"✅ Backfill '{args.run_id}' finished in {elapsed:.0f}s: {self.counts['done']} saved, "
+                    f"{self.counts['skipped']} skipped (live jobs own them), {self.counts['failed']} failed")
+
+def main():
+    """Backfill entry point"""
+    args = parse_args()
+    try:
+        Backfill(args).run()
+    except KeyboardInterrupt:
+        logger.info("🛑 Backfill interrupted; rerun with the same --run-id to resume")
+    except Exception as e:
+        logger.error(f"💥 Backfill failed: {str(e)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+"""
+Transcription pipeline benchmarks
+"""
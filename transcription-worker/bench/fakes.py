@@ -0,0 +1,159 @@
+"""
+Local stand-ins for S3 and PostgreSQL used by the benchmarks
+"""
+import os
+import json
+import shutil
+import sqlite3
+import uuid
+from typing import Dict, List, Optional
+
+class FilesystemS3:
+    """S3Service look-alike that serves objects from a local directory"""
+    
+    def __init__(self, root: str):
+        self.root = root
+    
+    def upload(self, s3_key: str, local_path: str) -> None:
+        target = os.path.join(self.root, s3_key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(local_path, target)
+    
+    def download_file(self, s3_key: str, local_path: str) -> None:
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        shutil.copyfile(os.path.join(self.root, s3_key), local_path)
+
+class MinioS3:
+    """Real S3Service pointed at a local MinIO (S3_* env vars)"""
+    
+    def __init__(self):
+        from s3_service import S3Service
+        self.service = S3Service()
+    
+    def upload(self, s3_key: str, local_path: str) -> None:
+        self.service.s3_client.upload_file(local_path, self.service.bucket, s3_key)
+    
+    def download_file(self, s3_key: str, local_path: str) -> None:
+        self.service.download_file(s3_key, local_path)
+
+class SQLiteDatabase:
+    """DatabaseService look-alike backed by an in-memory SQLite database"""
+    
+    def __init__(self):
+        self.connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self.connection.executescript(
+            """
+            CREATE TABLE media (
+                id TEXT PRIMARY KEY, user_id TEXT, project_id TEXT, filename TEXT,
+                original_s3_key TEXT, audio_s3_key TEXT, duration INTEGER, status TEXT
+            );
+            CREATE TABLE transcripts (
+                id TEXT PRIMARY KEY, media_id TEXT UNIQUE, text TEXT, segments TEXT,
+                language TEXT, confidence REAL
+            );
+            CREATE TABLE transcript_segments (
+                media_id TEXT, idx INTEGER, start_time REAL, end_time REAL, text TEXT,
+                PRIMARY KEY (media_id, idx)
+            );
+            """
+        )
+    
+    def create_media(self, s3_key: str, duration: float) -> str:
+        media_id = str(uuid.uuid4())
+        self.connection.execute(
+            "INSERT INTO media VALUES (?, ?, ?, ?, ?, ?, ?, 'transcribing')",
+            (media_id, str(uuid.uuid4()), str(uuid.uuid4()), os.path.basename(s3_key), s3_key, s3_key, int(duration))
+        )
+        self.connection.commit()
+        return media_id
+    
+    def get_media(self, media_id: str) -> Optional[Dict]:
+        row = self.connection.execute(
+            "SELECT id, user_id, project_id, filename, original_s3_key, audio_s3_key, duration, status "
+            "FROM media WHERE id = ?",
+            (media_id,)
+        ).fetchone()
+        if not row:
+            return None
+        keys = ['id', 'user_id', 'project_id', 'filename', 'original_s3_key', 'audio_s3_key', 'duration', 'status']
+        return dict(zip(keys, row))
+    
+    def complete_transcript(
+        self,
+        media_id: str,
+        text: str,
+        segments: List[Dict],
+        language: str,
+        confidence: float,
+        clear_chunks: bool = False
+    ) -> str:
+        transcript_id = str(uuid.uuid4())
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO transcripts VALUES (?, ?, ?, ?, ?, ?)",
+                (transcript_id, media_id, text, json.dumps(segments), language, confidence)
+            )
+            self.connection.execute("DELETE FROM transcript_segments WHERE media_id = ?", (media_id,))
+            self.connection.executemany(
+                "INSERT INTO transcript_segments VALUES (?, ?, ?, ?, ?)",
+                [(media_id, i, s['start'], s['end'], s['text']) for i, s in enumerate(segments)]
+            )
+            self.connection.execute("UPDATE media SET status = 'complete' WHERE id = ?", (media_id,))
+        return transcript_id
+
+BENCH_SCHEMA = 'syncsearch_bench'
+
+class PostgresDatabase:
+    """
+    Real DatabaseService confined to a scratch schema
+    
+    Minimal media/transcripts tables (no foreign keys to users/projects) are
+    created in BENCH_SCHEMA, and PGOPTIONS points the service's search_path
+    there, so the production SQL runs without touching application data.
+    """
+    
+    def __init__(self):
+        import psycopg2
+        import config
+        
+        setup = psycopg2.connect(
+            host=config.DATABASE_HOST, port=config.DATABASE_PORT, database=config.DATABASE_NAME,
+            user=config.DATABASE_USER, password=config.DATABASE_PASSWORD
+        )
+        with setup, setup.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+            cursor.execute(
+                f"""
+                CREATE TABLE {BENCH_SCHEMA}.media (
+                    id UUID PRIMARY KEY, user_id UUID, project_id UUID, filename TEXT,
+                    original_s3_key TEXT, audio_s3_key TEXT, duration INTEGER, status TEXT,
+                    error TEXT, updated_at TIMESTAMP
+                );
+                CREATE TABLE {BENCH_SCHEMA}.transcripts (
+                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(), media_id UUID UNIQUE, text TEXT,
+                    segments JSONB, language TEXT, confidence DOUBLE PRECISION,
+                    created_at TIMESTAMP DEFAULT NOW()
+                );
+                """
+            )
+        setup.close()
+        
+        os.environ['PGOPTIONS'] = f"-c search_path={BENCH_SCHEMA}"
+        from database_service import DatabaseService
+        self.service = DatabaseService()
+    
+    def create_media(self, s3_key: str, duration: float) -> str:
+        media_id = str(uuid.uuid4())
+        with self.service._transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO media VALUES (%s, %s, %s, %s, %s, %s, %s, 'transcribing', NULL, NOW())",
+                (media_id, str(uuid.uuid4()), str(uuid.uuid4()), os.path.basename(s3_key), s3_key, s3_key, int(duration))
+            )
+        return media_id
+    
+    def get_media(self, media_id: str) -> Optional[Dict]:
+        return self.service.get_media(media_id)
+    
+    def complete_transcript(self, *args, **kwargs) -> str:
+        return self.service.complete_transcript(*args, **kwargs)
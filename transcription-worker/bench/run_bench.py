@@ -0,0 +1,283 @@
+"""
+Transcription pipeline benchmark
+
+Runs each stage of process_job in isolation against local stand-ins and
+prints per-stage throughput, real-time factor, peak RSS and p50/p95 latency
+as JSON, so runs can be diffed across commits.
+
+Usage (from transcription-worker/):
+    python -m bench.run_bench --model tiny --out bench-results.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+import numpy as np
+
+from bench.fixtures import SAMPLE_RATE, build_fixtures, write_wav
+
+STAGES = ['download', 'decode', 'transcribe', 'db', 'codec', 'postprocess']
+FFMPEG_STAGES = {'decode'}  # Skipped (and listed in meta.skipped_stages) when ffmpeg isn't on PATH
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the transcription pipeline stage by stage')
+    parser.add_argument('--model', default='tiny', help='Whisper model for the transcribe stage')
+    parser.add_argument('--backend', default=None, help='WHISPER_BACKEND override')
+    parser.add_argument('--lengths', default='5,30,120', help='Fixture lengths in seconds (comma-separated)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per fixture and stage')
+    parser.add_argument('--stages', default=','.join(STAGES), help='Stages to run (comma-separated)')
+    parser.add_argument('--s3', choices=['fs', 'minio'], default='fs', help='Download source')
+    parser.add_argument('--db', choices=['sqlite', 'postgres'], default='sqlite', help='Database for the db stage')
+    parser.add_argument('--out', default=None, help='Write JSON here instead of stdout')
+    return parser.parse_args()
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / 1024 if sys.platform != 'darwin' else peak / (1024 * 1024)
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return 'unknown'
+
+def synthetic_transcript(audio_seconds: float) -> Dict:
+    """Deterministic transcript with one segment per 2 seconds of audio"""
+    segments = [
+        {'start': float(t), 'end': float(t + 2), 'text': f"segment {i} lorem ipsum dolor sit amet", 'confidence': 0.9}
+        for i, t in enumerate(range(0, max(int(audio_seconds), 2), 2))
+    ]
+    return {
+        'text': ' '.join(segment['text'] for segment in segments),
+        'segments': segments,
+        'language': 'en',
+        'confidence': 0.9
+    }
+
+class StageRecorder:
+    def __init__(self):
+        self.samples: Dict[str, List[Dict]] = {}
+    
+    def run(self, stage: str, fn: Callable[[], Dict]) -> None:
+        """Time one call of fn, which returns units processed ({'audio_seconds', 'bytes', ...})"""
+        start = time.perf_counter()
+        units = fn() or {}
+        elapsed = time.perf_counter() - start
+        self.samples.setdefault(stage, []).append({'seconds': elapsed, **units})
+    
+    def summary(self) -> Dict:
+        report = {}
+        for stage, samples in self.samples.items():
+            latencies = np.array([s['seconds'] for s in samples])
+            total_time = float(latencies.sum())
+            entry = {
+                'runs': len(samples),
+                'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 2),
+                'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 2),
+                'mean_ms': round(float(latencies.mean()) * 1000, 2)
+            }
+            audio_seconds = sum(s.get('audio_seconds', 0.0) for s in samples)
+            if audio_seconds:
+                entry['audio_seconds_per_second'] = round(audio_seconds / total_time, 2)
+                entry['real_time_factor'] = round(total_time / audio_seconds, 4)
+            total_bytes = sum(s.get('bytes', 0) for s in samples)
+            if total_bytes:
+                entry['mb_per_second'] = round(total_bytes / total_time / (1024 * 1024), 2)
+            rows = sum(s.get('rows', 0) for s in samples)
+            if rows:
+                entry['rows_per_second'] = round(rows / total_time, 1)
+            entry['peak_rss_mb'] = round(max(s['peak_rss_mb'] for s in samples), 1)
+            report[stage] = entry
+        return report
+
+def main():
+    args = parse_args()
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    skipped = []
+    if shutil.which('ffmpeg') is None:
+        skipped = [stage for stage in stages if stage in FFMPEG_STAGES]
+        stages = [stage for stage in stages if stage not in FFMPEG_STAGES]
+        if skipped:
+            print(f"ffmpeg not found, skipping: {', '.join(skipped)}", file=sys.stderr)
+    lengths = [float(x) for x in args.lengths.split(',')]
+    
+    # Settings must be in the environment before worker modules import config
+    os.environ['WHISPER_MODEL'] = args.model
+    if args.backend:
+        os.environ['WHISPER_BACKEND'] = args.backend
+    
+    import config
+    from audio_utils import decode_file
+    from bench.fakes import FilesystemS3, MinioS3, PostgresDatabase, SQLiteDatabase
+    
+    workdir = tempfile.mkdtemp(prefix='syncsearch-bench-')
+    fixtures = build_fixtures(lengths)
+    s3 = MinioS3() if args.s3 == 'minio' else FilesystemS3(os.path.join(workdir, 's3'))
+    
+    paths = {}
+    for name, audio in fixtures.items():
+        path = os.path.join(workdir, 'fixtures', f"{name}.wav")
+        write_wav(path, audio)
+        s3.upload(f"bench/{name}.wav", path)
+        paths[name] = path
+    
+    recorder = StageRecorder()
+    
+    def record(stage, fn):
+        def wrapped():
+            units = fn()
+            units['peak_rss_mb'] = peak_rss_mb()
+            return units
+        recorder.run(stage, wrapped)
+    
+    if 'download' in stages:
+        for name in fixtures:
+            for i in range(args.repeat):
+                target = os.path.join(workdir, 'downloads', f"{name}-{i}.wav")
+                def download(name=name, target=target):
+                    s3.download_file(f"bench/{name}.wav", target)
+                    size = os.path.getsize(target)
+                    os.remove(target)
+                    return {'bytes': size}
+                record('download', download)
+    
+    if 'decode' in stages:
+        for name, audio in fixtures.items():
+            for _ in range(args.repeat):
+                def decode(name=name):
+                    pcm = decode_file(paths[name])
+                    return {'audio_seconds': len(pcm) / SAMPLE_RATE}
+                record('decode', decode)
+    
+    if 'transcribe' in stages:
+        from whisper_service import WhisperService
+        
+        load_start = time.perf_counter()
+        whisper_service = WhisperService()
+        model_load_seconds = time.perf_counter() - load_start
+        
+        for name, audio in fixtures.items():
+            for _ in range(args.repeat):
+                def transcribe(audio=audio):
+                    whisper_service.transcribe(audio)
+                    return {'audio_seconds': len(audio) / SAMPLE_RATE}
+                record('transcribe', transcribe)
+    
+    if 'db' in stages:
+        db = PostgresDatabase() if args.db == 'postgres' else SQLiteDatabase()
+        for name, audio in fixtures.items():
+            seconds = len(audio) / SAMPLE_RATE
+            transcript = synthetic_transcript(seconds)
+            for _ in range(args.repeat):
+                media_id = db.create_media(f"bench/{name}.wav", seconds)
+                def save(media_id=media_id, transcript=transcript):
+                    db.get_media(media_id)
+                    db.complete_transcript(
+                        media_id=media_id,
+                        text=transcript['text'],
+                        segments=transcript['segments'],
+                        language=transcript['language'],
+                        confidence=transcript['confidence']
+                    )
+                    return {'rows': len(transcript['segments'])}
+                record('db', save)
+    
+    codec_bytes = {}
+    if 'codec' in stages:
+        import segment_codec
+        
+        for name, audio in fixtures.items():
+            segments = [
+                # Whisper-like token IDs so the varint column is exercised
+                {**segment, 'tokens': [(i * 7919 + k * 104729) % 51865 for k in range(12)]}
+                for i, segment in enumerate(synthetic_transcript(len(audio) / SAMPLE_RATE)['segments'])
+            ]
+            sizes = {}
+            for _ in range(args.repeat):
+                def encode_json(segments=segments, sizes=sizes):
+                    sizes['json'] = len(json.dumps(segments).encode('utf-8'))
+                    return {'rows': len(segments)}
+                def encode_packed(segments=segments, sizes=sizes):
+                    sizes['packed'] = len(segment_codec.encode(segments))
+                    return {'rows': len(segments)}
+                record('codec_json', encode_json)
+                record('codec_packed', encode_packed)
+            sizes['ratio'] = round(sizes['json'] / sizes['packed'], 1)
+            codec_bytes[name] = sizes
+    
+    if 'postprocess' in stages:
+        from transcript_postprocessor import postprocess
+        
+        for name, audio in fixtures.items():
+            transcript = synthetic_transcript(len(audio) / SAMPLE_RATE)
+            # Raw backend segments with word timings, every fifth one too short to stand alone
+            raw = {**transcript, 'segments': [
+                {
+                    'start': segment['start'],
+                    'end': segment['start'] + (0.2 if i % 5 == 4 else 1.9),
+                    'text': ' ' + segment['text'],
+                    'tokens': list(range(12)),
+                    'avg_logprob': -0.25,
+                    'no_speech_prob': 0.05,
+                    'words': [
+                        {
+                            'word': ' ' + word,
+                            'start': segment['start'] + k * 0.3,
+                            'end': segment['start'] + k * 0.3 + 0.25,
+                            'probability': 0.9
+                        }
+                        for k, word in enumerate(segment['text'].split())
+                    ]
+                }
+                for i, segment in enumerate(transcript['segments'])
+            ]}
+            for _ in range(args.repeat):
+                def run_postprocess(raw=raw):
+                    postprocess(raw)
+                    return {'rows': len(raw['segments'])}
+                record('postprocess', run_postprocess)
+    
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'model': args.model,
+            'backend': config.WHISPER_BACKEND,
+            'lengths': lengths,
+            'repeat': args.repeat,
+            's3': args.s3,
+            'db': args.db
+        },
+        'stages': recorder.summary(),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+    if skipped:
+        report['meta']['skipped_stages'] = skipped
+    if 'transcribe' in stages:
+        report['meta']['model_load_seconds'] = round(model_load_seconds, 2)
+    if codec_bytes:
+        report['codec_bytes'] = codec_bytes
+    
+    shutil.rmtree(workdir, ignore_errors=True)
+    
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
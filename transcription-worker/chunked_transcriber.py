@@ -0,0 +1,170 @@
+"""
+Long-form transcription
+Splits long audio on silence, transcribes chunks in parallel and merges them
+"""
+import os
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from logger import logger
+from audio_utils import SAMPLE_RATE, split_on_silence
+from transcript_postprocessor import media_confidence, remap_times
+from whisper_service import LANGUAGE_AUTO, resolve_language
+import config
+
+# Per-child Whisper model, created once by the pool initializer
+_child_whisper = None
+
+def _init_chunk_child(num_threads: int):
+    """Load a Whisper model inside a freshly spawned chunk worker"""
+    global _child_whisper
+    
+    os.environ['OMP_NUM_THREADS'] = str(num_threads)
+    os.environ['MKL_NUM_THREADS'] = str(num_threads)
+    
+    from whisper_service import WhisperService
+    _child_whisper = WhisperService(num_threads=num_threads)
+
+def _transcribe_chunk(audio: np.ndarray, model_name: Optional[str] = None, language: Optional[str] = None) -> Dict:
+    """Transcribe one chunk in the child"""
+    return _child_whisper.transcribe(audio, model_name, language)
+
+def merge_chunk_results(chunks: List[Dict]) -> Dict:
+    """
+    Merge per-chunk transcripts into one media-level transcript
+    
+    Args:
+        chunks: Dicts with 'start_sample' and 'result' (chunk-relative), in order
+        
+    Returns:
+        Transcript dict with segment times on the global timeline
+    """
+    segments = []
+    texts = []
+    languages = Counter()
+    
+    for chunk in chunks:
+        offset = chunk['start_sample'] / SAMPLE_RATE
+        result = chunk['result']
+        
+        shift = lambda times: times + offset
+        segments.extend(remap_times(result['segments'], shift, shift))
+        
+        if result['text']:
+            texts.append(result['text'])
+        
+        # Weight language by how much speech each chunk had
+        languages[result['language']] += len(result['segments'])
+    
+    return {
+        'text': ' '.join(texts),
+        'segments': segments,
+        'language': languages.most_common(1)[0][0] if languages else config.WHISPER_LANGUAGE,
+        'confidence': media_confidence(segments)
+    }
+
+class ChunkedTranscriber:
+    def __init__(self, whisper_service, db_service):
+        """
+        Initialize long-form transcriber
+        
+        Args:
+            whisper_service: In-process model, used when CHUNK_WORKERS is 1
+            db_service: Database service used for chunk checkpoints
+        """
+        self.whisper_service = whisper_service
+        self.db_service = db_service
+        self.executor = None  # Chunk worker pool, spawned on first long job
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Spawn the chunk worker pool on first use and keep it warm"""
+        if self.executor is None:
+            logger.info(f"🚀 Starting {config.CHUNK_WORKERS} chunk workers...")
+            self.executor = ProcessPoolExecutor(
+                max_workers=config.CHUNK_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_chunk_child,
+                initargs=(config.CHUNK_THREADS_PER_WORKER,)
+            )
+        return self.executor
+    
+    def transcribe(
+        self,
+        media_id: str,
+        audio: np.ndarray,
+        model_name: Optional[str] = None,
+        on_progress: Optional[Callable[[int], None]] = None,
+        language: Optional[str] = None
+    ) -> Dict:
+        """
+        Transcribe long audio chunk by chunk, resuming from checkpoints
+        
+        Args:
+            media_id: Media UUID (checkpoint key)
+            audio: float32 PCM at 16 kHz
+            model_name: Whisper model to use (None = config.WHISPER_MODEL)
+            on_progress: Called with percent of chunks done after each chunk (at most 99)
+            language: Spoken language (None = config.WHISPER_LANGUAGE, LANGUAGE_AUTO = detect per chunk)
+            
+        Returns:
+            Same dict shape as WhisperService.transcribe
+        """
+        bounds = split_on_silence(
+            audio,
+            max_chunk=config.CHUNK_MAX_DURATION,
+            silence_db=config.VAD_SILENCE_DB,
+            min_silence=config.VAD_MIN_SILENCE
+        )
+        
+        # Reuse checkpoints only if the split, model and language are identical to the previous attempt
+        checkpoint_model = model_name or config.WHISPER_MODEL
+        checkpoint_language = resolve_language(language) or LANGUAGE_AUTO
+        checkpoints = self.db_service.get_chunk_checkpoints(media_id, checkpoint_model, checkpoint_language)
+        done = {}
+        for index, (start, end) in enumerate(bounds):
+            checkpoint = checkpoints.get(index)
+            if checkpoint and (checkpoint['start_sample'], checkpoint['end_sample']) == (start, end):
+                done[index] = checkpoint['result']
+        
+        pending = [index for index in range(len(bounds)) if index not in done]
+        logger.info(
+            f"🧩 Long-form job: {len(bounds)} chunks "
+            f"({len(done)} checkpointed, {len(pending)} to transcribe)"
+        )
+        
+        def record(index: int, result: Dict):
+            start, end = bounds[index]
+            self.db_service.save_chunk_checkpoint(
+                media_id, index, start, end, result, checkpoint_model, checkpoint_language
+            )
+            done[index] = result
+            logger.info(f"   ✔ Chunk {index + 1}/{len(bounds)} done ({len(done)}/{len(bounds)})")
+            if on_progress:
+                # Capped below 100: only complete_transcript marks the media done
+                on_progress(min(99, int(len(done) / len(bounds) * 100)))
+        
+        if config.CHUNK_WORKERS > 1 and len(pending) > 1:
+            executor = self._get_executor()
+            futures = {
+                executor.submit(_transcribe_chunk, audio[bounds[i][0]:bounds[i][1]], model_name, language): i
+                for i in pending
+            }
+            # Checkpoint as chunks finish so a later failure keeps earlier work
+            for future in as_completed(futures):
+                record(futures[future], future.result())
+        else:
+            for index in pending:
+                start, end = bounds[index]
+                record(index, self.whisper_service.transcribe(audio[start:end], model_name, language))
+        
+        return merge_chunk_results([
+            {'start_sample': bounds[index][0], 'result': done[index]}
+            for index in range(len(bounds))
+        ])
+    
+    def shutdown(self):
+        """Stop chunk workers"""
+        if self.executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
@@ -1,40 +1,275 @@
 """
 Database service for updating transcription results
 """
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
 import psycopg2
-from psycopg2.extras import Json
-from typing import Optional, List, Dict
+from psycopg2.extras import Json, execute_values
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+from typing import Optional, Iterator, List, Dict, Tuple
 from logger import logger
+import segment_codec
+import metrics
 import config
 
+# Tables owned by the worker (the API's TypeORM sync leaves unknown tables alone).
+# Columns the worker writes on API tables (media.progress, transcripts.model,
+# transcripts.segments_packed) are declared on the API's entities and added by its
+# TranscriptionWorkerColumns migration: never ALTER API-owned tables from here.
+SCHEMA_STATEMENTS = [
+    # Per-chunk results of long-form jobs, so retries resume instead of restarting
+    """
+    CREATE TABLE IF NOT EXISTS transcript_chunks (
+        media_id UUID NOT NULL,
+        chunk_index INTEGER NOT NULL,
+        start_sample BIGINT NOT NULL,
+        end_sample BIGINT NOT NULL,
+        result JSONB NOT NULL,
+        model TEXT,
+        language TEXT,
+        created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (media_id, chunk_index)
+    )
+    """,
+    # Checkpoints are only reused by the model and language that decoded them
+    "ALTER TABLE transcript_chunks ADD COLUMN IF NOT EXISTS model TEXT",
+    "ALTER TABLE transcript_chunks ADD COLUMN IF NOT EXISTS language TEXT",
+    # Content-addressed transcripts (audio identity + model + language)
+    """
+    CREATE TABLE IF NOT EXISTS transcript_cache (
+        cache_key TEXT PRIMARY KEY,
+        text TEXT NOT NULL,
+        segments JSONB NOT NULL,
+        language TEXT,
+        confidence DOUBLE PRECISION,
+        size_bytes BIGINT NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        last_used_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_transcript_cache_last_used ON transcript_cache (last_used_at)",
+    # One row per segment so phrase search is an index lookup, not a JSONB scan
+    f"""
+    CREATE TABLE IF NOT EXISTS transcript_segments (
+        media_id UUID NOT NULL,
+        idx INTEGER NOT NULL,
+        start_time DOUBLE PRECISION NOT NULL,
+        end_time DOUBLE PRECISION NOT NULL,
+        text TEXT NOT NULL,
+        tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('{config.SEARCH_TEXT_CONFIG}'::regconfig, text)) STORED,
+        PRIMARY KEY (media_id, idx)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_transcript_segments_tsv ON transcript_segments USING GIN (tsv)",
+    # Per-project model quality (fast, balanced, high); projects without a row use DEFAULT_PROJECT_QUALITY
+    """
+    CREATE TABLE IF NOT EXISTS project_transcription_settings (
+        project_id UUID PRIMARY KEY,
+        quality TEXT NOT NULL DEFAULT 'balanced',
+        updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+    """,
+    # Language detected once per media by the prefilter (retries and upgrades reuse it)
+    """
+    CREATE TABLE IF NOT EXISTS media_language (
+        media_id UUID PRIMARY KEY,
+        language TEXT NOT NULL,
+        probability REAL NOT NULL,
+        detected_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+    """,
+    # Job starts that haven't finished (a row surviving a start means the worker died mid-job)
+    """
+    CREATE TABLE IF NOT EXISTS job_attempts (
+        media_id UUID NOT NULL,
+        operation TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (media_id, operation)
+    )
+    """,
+    # Per-item outcome of backfill runs (backfill.py), so an interrupted run resumes where it stopped
+    """
+    CREATE TABLE IF NOT EXISTS backfill_items (
+        run_id TEXT NOT NULL,
+        media_id UUID NOT NULL,
+        status TEXT NOT NULL,
+        error TEXT,
+        updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (run_id, media_id)
+    )
+    """,
+]
+
+# Media statuses owned by the live pipeline (uploading, processing, or queued for/in transcription)
+IN_FLIGHT_STATUSES = ('uploading', 'processing', 'transcribing')
+
+SEGMENT_PAGE_SIZE = 1000  # Rows per multi-row INSERT statement
+
+SCHEMA_LOCK_ID = 0x53594e43  # Advisory lock serializing SCHEMA_STATEMENTS across replicas
+
+def segment_columns(segments: List[Dict]) -> Tuple[Optional[str], Optional[bytes]]:
+    """
+    Values for transcripts.segments / transcripts.segments_packed
+
+    Args:
+        segments: List of transcript segments with timestamps
+
+    Returns:
+        (JSON text or None, packed bytes or None) per TRANSCRIPT_STORAGE_FORMAT
+    """
+    storage = config.TRANSCRIPT_STORAGE_FORMAT
+    segments_json = json.dumps(segments) if storage in ('json', 'both') else None
+    segments_packed = segment_codec.encode(segments) if storage in ('packed', 'both') else None
+    return segments_json, segments_packed
+
 class DatabaseService:
     def __init__(self):
-        """Initialize database connection"""
-        self.connection = None
+        """Initialize database connection pool"""
+        self.pool = None
+        self._last_used = {}  # id(connection) → last checkin time
+        self._lock = threading.Lock()
+        # getconn() raises PoolError as soon as the pool is exhausted; callers wait here instead
+        self._slots = threading.BoundedSemaphore(config.DATABASE_POOL_MAX)
         self.connect()
     
     def connect(self):
         """Connect to PostgreSQL database"""
         try:
-            self.connection = psycopg2.connect(
+            self.pool = ThreadedConnectionPool(
+                config.DATABASE_POOL_MIN,
+                config.DATABASE_POOL_MAX,
                 host=config.DATABASE_HOST,
                 port=config.DATABASE_PORT,
                 database=config.DATABASE_NAME,
                 user=config.DATABASE_USER,
-                password=config.DATABASE_PASSWORD
+                password=config.DATABASE_PASSWORD,
+                # Let the OS notice dead peers instead of hanging on a half-open socket
+                keepalives=1,
+                keepalives_idle=30,
+                keepalives_interval=10,
+                keepalives_count=3
             )
-            self.connection.autocommit = False
-            logger.info("✅ Database connected")
+            logger.info(f"✅ Database connected (pool: {config.DATABASE_POOL_MIN}-{config.DATABASE_POOL_MAX})")
+            self.ensure_schema()
         except Exception as e:
             logger.error(f"❌ Database connection failed: {str(e)}")
             raise
     
     def disconnect(self):
-        """Close database connection"""
-        if self.connection:
-            self.connection.close()
+        """Close all pooled connections"""
+        if self.pool:
+            self.pool.closeall()
             logger.info("✅ Database disconnected")
     
+    def _discard(self, conn):
+        """Drop a broken connection from the pool"""
+        with self._lock:
+            self._last_used.pop(id(conn), None)
+        try:
+            self.pool.putconn(conn, close=True)
+        except Exception:
+            pass
+    
+    def _is_healthy(self, conn) -> bool:
+        """
+        Check a pooled connection before handing it out
+        
+        Connections used recently are trusted; idle ones get a cheap ping so a
+        Postgres restart is detected here rather than in the middle of a job.
+        """
+        if conn.closed:
+            return False
+        
+        with self._lock:
+            last_used = self._last_used.get(id(conn), 0.0)
+        if time.monotonic() - last_used < config.DATABASE_HEALTHCHECK_INTERVAL:
+            return True
+        
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def _checkout(self):
+        """
+        Get a healthy connection, reconnecting as needed
+        
+        Waits up to DATABASE_CHECKOUT_TIMEOUT for a free connection when
+        every one is in use (job threads, prefetch, progress writes and the
+        lane router share the pool). Hand it back with _checkin().
+        """
+        if not self._slots.acquire(timeout=config.DATABASE_CHECKOUT_TIMEOUT):
+            raise PoolError(
+                f"No database connection free after {config.DATABASE_CHECKOUT_TIMEOUT}s "
+                f"(DATABASE_POOL_MAX={config.DATABASE_POOL_MAX})"
+            )
+        try:
+            for _ in range(config.DATABASE_POOL_MAX + 1):
+                conn = self.pool.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                logger.warning("⚠️  Discarding stale database connection, reconnecting...")
+                self._discard(conn)
+            raise psycopg2.OperationalError("No healthy database connection available")
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def _checkin(self, conn, discard: bool = False):
+        """Return a checked-out connection (closing it if it broke) and free its slot"""
+        try:
+            if discard:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._last_used[id(conn)] = time.monotonic()
+                self.pool.putconn(conn)
+        finally:
+            self._slots.release()
+    
+    @contextmanager
+    def _transaction(self):
+        """
+        Run one transaction on a pooled connection
+        
+        Commits on success and rolls back on error. Connections that fail at
+        the connection level are closed instead of being returned to the pool.
+        """
+        conn = self._checkout()
+        broken = False
+        try:
+            with conn.cursor() as cursor:
+                yield cursor
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._checkin(conn, discard=broken)
+    
+    def ensure_schema(self):
+        """Create worker-owned tables if they don't exist yet (one replica at a time)"""
+        try:
+            with self._transaction() as cursor:
+                # Concurrent CREATE TABLE IF NOT EXISTS can still collide on the type name
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+                for statement in SCHEMA_STATEMENTS:
+                    cursor.execute(statement)
+        except Exception as e:
+            logger.error(f"❌ Failed to ensure schema: {str(e)}")
+            raise
+    
     def update_media_status(self, media_id: str, status: str, error: Optional[str] = None):
         """
         Update media status
@@ -45,28 +280,119 @@ class DatabaseService:
             error: Optional error message
         """
         try:
-            cursor = self.connection.cursor()
-            
-            if error:
-                cursor.execute(
-                    "UPDATE media SET status = %s, error = %s, updated_at = NOW() WHERE id = %s",
-                    (status, error, media_id)
-                )
-            else:
-                cursor.execute(
-                    "UPDATE media SET status = %s, updated_at = NOW() WHERE id = %s",
-                    (status, media_id)
-                )
+            with metrics.DB_WRITE_SECONDS.labels('update_media_status').time(), self._transaction() as cursor:
+                self._update_media_status(cursor, media_id, status, error)
             
-            self.connection.commit()
             logger.info(f"📝 Updated media {media_id} status: {status}")
             
         except Exception as e:
-            self.connection.rollback()
             logger.error(f"❌ Failed to update media status: {str(e)}")
             raise
-        finally:
-            cursor.close()
+    
+    def _update_media_status(self, cursor, media_id: str, status: str, error: Optional[str] = None):
+        """Status UPDATE on an open transaction"""
+        if error:
+            cursor.execute(
+                "UPDATE media SET status = %s, error = %s, updated_at = NOW() WHERE id = %s",
+                (status, error, media_id)
+            )
+        else:
+            cursor.execute(
+                "UPDATE media SET status = %s, updated_at = NOW() WHERE id = %s",
+                (status, media_id)
+            )
+    
+    def _lock_media(self, cursor, media_id: str):
+        """Transaction-scoped advisory lock serializing transcript writes for one media (live jobs vs backfill)"""
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (media_id,))
+    
+    def _insert_transcript(
+        self,
+        cursor,
+        media_id: str,
+        text: str,
+        segments: List[Dict],
+        language: str,
+        confidence: float,
+        model: Optional[str] = None
+    ) -> str:
+        """Transcript INSERT on an open transaction"""
+        segments_json, segments_packed = segment_columns(segments)
+        cursor.execute(
+            """
+            INSERT INTO transcripts (media_id, text, segments, segments_packed, language, confidence, model)
+            VALUES (%s, %s, %s::jsonb, %s, %s, %s, %s)
+            RETURNING id
+            """,
+            (
+                media_id, text, segments_json,
+                psycopg2.Binary(segments_packed) if segments_packed is not None else None,
+                language, confidence, model or config.WHISPER_MODEL
+            )
+        )
+        return str(cursor.fetchone()[0])
+    
+    def _replace_segments(self, cursor, media_id: str, segments: List[Dict]):
+        """Bulk-write a transcript's segments into transcript_segments"""
+        cursor.execute("DELETE FROM transcript_segments WHERE media_id = %s", (media_id,))
+        execute_values(
+            cursor,
+            "INSERT INTO transcript_segments (media_id, idx, start_time, end_time, text) VALUES %s",
+            [
+                (media_id, idx, segment['start'], segment['end'], segment['text'])
+                for idx, segment in enumerate(segments)
+            ],
+            page_size=SEGMENT_PAGE_SIZE
+        )
+    
+    def append_segments(self, media_id: str, first_index: int, segments: List[Dict], progress: int):
+        """
+        Write a batch of partial segments and the media's progress in one commit
+        
+        Rows are upserted by (media_id, idx), so a retried job simply
+        overwrites its earlier partial rows; complete_transcript later
+        replaces the whole set.
+        
+        Args:
+            media_id: Media UUID
+            first_index: Transcript index of segments[0]
+            segments: Newly decoded segments
+            progress: Percent of the audio transcribed so far
+        """
+        try:
+            with metrics.DB_WRITE_SECONDS.labels('append_segments').time(), self._transaction() as cursor:
+                execute_values(
+                    cursor,
+                    """
+                    INSERT INTO transcript_segments (media_id, idx, start_time, end_time, text) VALUES %s
+                    ON CONFLICT (media_id, idx) DO UPDATE
+                    SET start_time = EXCLUDED.start_time, end_time = EXCLUDED.end_time, text = EXCLUDED.text
+                    """,
+                    [
+                        (media_id, first_index + offset, segment['start'], segment['end'], segment['text'])
+                        for offset, segment in enumerate(segments)
+                    ],
+                    page_size=SEGMENT_PAGE_SIZE
+                )
+                cursor.execute("UPDATE media SET progress = %s WHERE id = %s", (progress, media_id))
+        except Exception as e:
+            logger.error(f"❌ Failed to append segments: {str(e)}")
+            raise
+    
+    def update_media_progress(self, media_id: str, progress: int):
+        """
+        Record how much of a media has been transcribed
+        
+        Args:
+            media_id: Media UUID
+            progress: Percent (0-100)
+        """
+        try:
+            with metrics.DB_WRITE_SECONDS.labels('update_media_progress').time(), self._transaction() as cursor:
+                cursor.execute("UPDATE media SET progress = %s WHERE id = %s", (progress, media_id))
+        except Exception as e:
+            logger.error(f"❌ Failed to update media progress: {str(e)}")
+            raise
     
     def save_transcript(
         self,
@@ -90,30 +416,254 @@ class DatabaseService:
             Transcript UUID
         """
         try:
-            cursor = self.connection.cursor()
+            with metrics.DB_WRITE_SECONDS.labels('save_transcript').time(), self._transaction() as cursor:
+                transcript_id = self._insert_transcript(
+                    cursor, media_id, text, segments, language, confidence
+                )
+                self._replace_segments(cursor, media_id, segments)
             
-            # Insert transcript
-            cursor.execute(
-                """
-                INSERT INTO transcripts (media_id, text, segments, language, confidence)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id
-                """,
-                (media_id, text, Json(segments), language, confidence)
-            )
+            logger.info(f"💾 Saved transcript {transcript_id} for media {media_id}")
+            return transcript_id
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to save transcript: {str(e)}")
+            raise
+    
+    def complete_transcript(
+        self,
+        media_id: str,
+        text: str,
+        segments: List[Dict],
+        language: str,
+        confidence: float,
+        clear_chunks: bool = False,
+        model: Optional[str] = None
+    ) -> str:
+        """
+        Save transcript and mark media complete in a single commit
+        
+        Args:
+            media_id: Media UUID
+            text: Full transcript text
+            segments: List of transcript segments with timestamps
+            language: Detected language
+            confidence: Average confidence score
+            clear_chunks: Also drop long-form chunk checkpoints
+            model: Whisper model that produced the transcript (None = config.WHISPER_MODEL)
             
-            transcript_id = cursor.fetchone()[0]
-            self.connection.commit()
+        Returns:
+            Transcript UUID
+        """
+        try:
+            with metrics.DB_WRITE_SECONDS.labels('complete_transcript').time(), self._transaction() as cursor:
+                self._lock_media(cursor, media_id)
+                transcript_id = self._insert_transcript(
+                    cursor, media_id, text, segments, language, confidence, model
+                )
+                self._replace_segments(cursor, media_id, segments)
+                self._update_media_status(cursor, media_id, 'complete')
+                cursor.execute("UPDATE media SET progress = 100 WHERE id = %s", (media_id,))
+                if clear_chunks:
+                    cursor.execute("DELETE FROM transcript_chunks WHERE media_id = %s", (media_id,))
             
-            logger.info(f"💾 Saved transcript {transcript_id} for media {media_id}")
-            return str(transcript_id)
+            logger.info(f"💾 Saved transcript {transcript_id} for media {media_id} (status: complete)")
+            return transcript_id
             
         except Exception as e:
-            self.connection.rollback()
             logger.error(f"❌ Failed to save transcript: {str(e)}")
             raise
-        finally:
-            cursor.close()
+    
+    def upgrade_transcript(
+        self,
+        media_id: str,
+        text: str,
+        segments: List[Dict],
+        language: str,
+        confidence: float,
+        model: str,
+        clear_chunks: bool = False
+    ) -> bool:
+        """
+        Replace a stored transcript with one from a better model
+        
+        Media status is left alone; the media is already complete.
+        
+        Args:
+            media_id: Media UUID
+            text: Full transcript text
+            segments: List of transcript segments with timestamps
+            language: Detected language
+            confidence: Average confidence score
+            model: Whisper model that produced the new transcript
+            clear_chunks: Also drop long-form chunk checkpoints
+            
+        Returns:
+            False if there was no transcript to upgrade (or it already came from `model`)
+        """
+        try:
+            segments_json, segments_packed = segment_columns(segments)
+            with metrics.DB_WRITE_SECONDS.labels('upgrade_transcript').time(), self._transaction() as cursor:
+                self._lock_media(cursor, media_id)
+                cursor.execute(
+                    """
+                    UPDATE transcripts
+                    SET text = %s, segments = %s::jsonb, segments_packed = %s,
+                        language = %s, confidence = %s, model = %s
+                    WHERE media_id = %s AND model IS DISTINCT FROM %s
+                    """,
+                    (
+                        text, segments_json,
+                        psycopg2.Binary(segments_packed) if segments_packed is not None else None,
+                        language, confidence, model, media_id, model
+                    )
+                )
+                upgraded = cursor.rowcount > 0
+                if upgraded:
+                    self._replace_segments(cursor, media_id, segments)
+                if clear_chunks:
+                    cursor.execute("DELETE FROM transcript_chunks WHERE media_id = %s", (media_id,))
+            
+            if upgraded:
+                logger.info(f"💾 Upgraded transcript for media {media_id} (model: {model})")
+            return upgraded
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to upgrade transcript: {str(e)}")
+            raise
+    
+    def start_job_attempt(self, media_id: str, operation: str) -> int:
+        """
+        Record that a job is starting
+        
+        The row is removed by finish_job_attempt when the job settles
+        normally, so a count above 1 means earlier starts died with the
+        worker (OOM kill, segfault) before they could finish.
+        
+        Args:
+            media_id: Media UUID
+            operation: Job operation ('transcribe', 'upgrade')
+            
+        Returns:
+            Starts recorded for this job, including this one
+        """
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO job_attempts (media_id, operation, attempts) VALUES (%s, %s, 1)
+                    ON CONFLICT (media_id, operation) DO UPDATE
+                    SET attempts = job_attempts.attempts + 1, updated_at = NOW()
+                    RETURNING attempts
+                    """,
+                    (media_id, operation)
+                )
+                return cursor.fetchone()[0]
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to record job attempt: {str(e)}")
+            raise
+    
+    def finish_job_attempt(self, media_id: str, operation: str):
+        """Forget a job's starts once it has settled (succeeded, failed or deferred)"""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    "DELETE FROM job_attempts WHERE media_id = %s AND operation = %s",
+                    (media_id, operation)
+                )
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to clear job attempts: {str(e)}")
+            raise
+
+    def release_job_attempts(self, jobs: List[Tuple[str, str]]):
+        """
+        Take back the starts of jobs a graceful shutdown may cut short
+
+        Called before waiting on running jobs, so a worker that is killed
+        once the stop grace period runs out (rolling deploys) leaves no
+        crash behind. A job that still settles clears its row as usual.
+
+        Args:
+            jobs: (media_id, operation) of the running jobs
+        """
+        if not jobs:
+            return
+        try:
+            with self._transaction() as cursor:
+                cursor.executemany(
+                    """
+                    UPDATE job_attempts SET attempts = attempts - 1, updated_at = NOW()
+                    WHERE media_id = %s AND operation = %s AND attempts > 0
+                    """,
+                    jobs
+                )
+
+        except Exception as e:
+            logger.error(f"❌ Failed to release job attempts: {str(e)}")
+            raise
+
+    def get_media_language(self, media_id: str) -> Optional[Tuple[str, float]]:
+        """
+        Language detected earlier for a media
+        
+        Args:
+            media_id: Media UUID
+            
+        Returns:
+            (language code, probability), or None if it was never detected
+        """
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    "SELECT language, probability FROM media_language WHERE media_id = %s",
+                    (media_id,)
+                )
+                row = cursor.fetchone()
+                return (row[0], row[1]) if row else None
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get media language: {str(e)}")
+            raise
+    
+    def save_media_language(self, media_id: str, language: str, probability: float):
+        """Store a media's detected language"""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO media_language (media_id, language, probability) VALUES (%s, %s, %s)
+                    ON CONFLICT (media_id) DO UPDATE
+                    SET language = EXCLUDED.language, probability = EXCLUDED.probability, detected_at = NOW()
+                    """,
+                    (media_id, language, probability)
+                )
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to save media language: {str(e)}")
+            raise
+    
+    def get_project_quality(self, project_id: str) -> Optional[str]:
+        """
+        Get a project's model quality setting
+        
+        Args:
+            project_id: Project UUID
+            
+        Returns:
+            'fast', 'balanced' or 'high', or None if the project has no setting
+        """
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    "SELECT quality FROM project_transcription_settings WHERE project_id = %s",
+                    (project_id,)
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            logger.error(f"❌ Failed to get project quality: {str(e)}")
+            raise
     
     def get_media(self, media_id: str) -> Optional[Dict]:
         """
@@ -126,18 +676,18 @@ class DatabaseService:
             Media dict or None
         """
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(
-                """
-                SELECT id, user_id, project_id, filename, original_s3_key, 
-                       audio_s3_key, duration, status
-                FROM media
-                WHERE id = %s
-                """,
-                (media_id,)
-            )
+            with self._transaction() as cursor:
+                cursor.execute(
+                    """
+                    SELECT id, user_id, project_id, filename, original_s3_key, 
+                           audio_s3_key, duration, status
+                    FROM media
+                    WHERE id = %s
+                    """,
+                    (media_id,)
+                )
+                row = cursor.fetchone()
             
-            row = cursor.fetchone()
             if row:
                 return {
                     'id': str(row[0]),
@@ -154,5 +704,483 @@ class DatabaseService:
         except Exception as e:
             logger.error(f"❌ Failed to get media: {str(e)}")
             raise
+
+    def get_transcript_segments(self, media_id: str) -> Optional[List[Dict]]:
+        """
+        Get a transcript's segments, whichever format they were stored in
+
+        Args:
+            media_id: Media UUID
+
+        Returns:
+            List of segments, or None if the media has no transcript
+        """
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    "SELECT segments, segments_packed FROM transcripts WHERE media_id = %s",
+                    (media_id,)
+                )
+                row = cursor.fetchone()
+
+            if row is None:
+                return None
+            if row[1] is not None:
+                return segment_codec.decode(bytes(row[1]))
+            return row[0] or []
+
+        except Exception as e:
+            logger.error(f"❌ Failed to get transcript segments: {str(e)}")
+            raise
+
+    def search_segments(self, query: str, project_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """
+        Full-text search over transcript segments
+        
+        Args:
+            query: Search text (web-search syntax, "quoted phrases" supported)
+            project_id: Optional project to restrict results to
+            limit: Maximum results
+            
+        Returns:
+            List of {'media_id', 'start', 'end', 'text', 'rank'} by rank
+        """
+        try:
+            project_filter = "AND m.project_id = %(project_id)s" if project_id else ""
+            with self._transaction() as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT s.media_id, s.start_time, s.end_time, s.text, ts_rank(s.tsv, q) AS rank
+                    FROM transcript_segments s
+                    JOIN media m ON m.id = s.media_id,
+                         websearch_to_tsquery(%(config)s::regconfig, %(query)s) q
+                    WHERE s.tsv @@ q {project_filter}
+                    ORDER BY rank DESC
+                    LIMIT %(limit)s
+                    """,
+                    {
+                        'config': config.SEARCH_TEXT_CONFIG,
+                        'query': query,
+                        'project_id': project_id,
+                        'limit': limit
+                    }
+                )
+                rows = cursor.fetchall()
+            
+            return [
+                {'media_id': str(row[0]), 'start': row[1], 'end': row[2], 'text': row[3], 'rank': row[4]}
+                for row in rows
+            ]
+            
+        except Exception as e:
+            logger.error(f"❌ Segment search failed: {str(e)}")
+            raise
+    
+    def get_chunk_checkpoints(self, media_id: str, model: str, language: str) -> Dict[int, Dict]:
+        """
+        Get finished chunks of a long-form job
+        
+        Args:
+            media_id: Media UUID
+            model: Model the job decodes with (chunks from other models are ignored)
+            language: Language the job decodes with (likewise)
+            
+        Returns:
+            Dict of chunk_index → {'start_sample', 'end_sample', 'result'}
+        """
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    """
+                    SELECT chunk_index, start_sample, end_sample, result
+                    FROM transcript_chunks
+                    WHERE media_id = %s AND model = %s AND language = %s
+                    """,
+                    (media_id, model, language)
+                )
+                rows = cursor.fetchall()
+            
+            return {
+                row[0]: {'start_sample': row[1], 'end_sample': row[2], 'result': row[3]}
+                for row in rows
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get chunk checkpoints: {str(e)}")
+            raise
+    
+    def save_chunk_checkpoint(
+        self,
+        media_id: str,
+        chunk_index: int,
+        start_sample: int,
+        end_sample: int,
+        result: Dict,
+        model: str,
+        language: str
+    ):
+        """
+        Record a finished chunk of a long-form job
+        
+        Args:
+            media_id: Media UUID
+            chunk_index: Position of the chunk in the audio
+            start_sample: First sample of the chunk
+            end_sample: Sample after the last one in the chunk
+            result: Chunk transcription (chunk-relative timestamps)
+            model: Model that decoded the chunk
+            language: Language it was decoded with
+        """
+        try:
+            with metrics.DB_WRITE_SECONDS.labels('save_chunk_checkpoint').time(), self._transaction() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO transcript_chunks (media_id, chunk_index, start_sample, end_sample, result, model, language)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (media_id, chunk_index) DO UPDATE
+                    SET start_sample = EXCLUDED.start_sample,
+                        end_sample = EXCLUDED.end_sample,
+                        result = EXCLUDED.result,
+                        model = EXCLUDED.model,
+                        language = EXCLUDED.language,
+                        created_at = NOW()
+                    """,
+                    (media_id, chunk_index, start_sample, end_sample, Json(result), model, language)
+                )
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to save chunk checkpoint: {str(e)}")
+            raise
+    
+    def get_cached_transcript(self, cache_key: str) -> Optional[Dict]:
+        """
+        Look up a cached transcript and mark it as recently used
+        
+        Args:
+            cache_key: Content-addressed cache key
+            
+        Returns:
+            Transcript dict or None
+        """
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    """
+                    UPDATE transcript_cache
+                    SET hits = hits + 1, last_used_at = NOW()
+                    WHERE cache_key = %s
+                    RETURNING text, segments, language, confidence
+                    """,
+                    (cache_key,)
+                )
+                row = cursor.fetchone()
+            
+            if row:
+                return {
+                    'text': row[0],
+                    'segments': row[1],
+                    'language': row[2],
+                    'confidence': row[3]
+                }
+            return None
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to read transcript cache: {str(e)}")
+            raise
+    
+    def put_cached_transcript(self, cache_key: str, result: Dict):
+        """
+        Store a transcript in the cache (first writer wins)
+        
+        Args:
+            cache_key: Content-addressed cache key
+            result: Transcript dict from WhisperService.transcribe
+        """
+        try:
+            segments = json.dumps(result['segments'])
+            size_bytes = len(segments) + len(result['text'].encode('utf-8'))
+            
+            with self._transaction() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO transcript_cache (cache_key, text, segments, language, confidence, size_bytes)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (cache_key) DO NOTHING
+                    """,
+                    (cache_key, result['text'], segments, result['language'], result['confidence'], size_bytes)
+                )
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to write transcript cache: {str(e)}")
+            raise
+    
+    def evict_transcript_cache(self, max_age_days: int, max_bytes: int) -> int:
+        """
+        Drop expired cache entries, then least-recently-used ones over budget
+        
+        Args:
+            max_age_days: Entries created longer ago than this are removed
+            max_bytes: Total size budget for the remaining entries
+            
+        Returns:
+            Number of entries removed
+        """
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    "DELETE FROM transcript_cache WHERE created_at < NOW() - make_interval(days => %s)",
+                    (max_age_days,)
+                )
+                removed = cursor.rowcount
+                
+                # Keep the most recently used entries that fit in the budget
+                cursor.execute(
+                    """
+                    DELETE FROM transcript_cache
+                    WHERE cache_key IN (
+                        SELECT cache_key FROM (
+                            SELECT cache_key,
+                                   SUM(size_bytes) OVER (ORDER BY last_used_at DESC, cache_key) AS running_bytes
+                            FROM transcript_cache
+                        ) ranked
+                        WHERE running_bytes > %s
+                    )
+                    """,
+                    (max_bytes,)
+                )
+                removed += cursor.rowcount
+            
+            return removed
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to evict transcript cache: {str(e)}")
+            raise
+
+    def iter_backfill_media(
+        self,
+        run_id: str,
+        project_id: Optional[str] = None,
+        statuses: Optional[List[str]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        page_size: int = 1000
+    ) -> Iterator[Dict]:
+        """
+        Stream the media a backfill run still has to transcribe
+
+        Uses a named (server-side) WITH HOLD cursor: the result set is
+        materialized when the selecting transaction commits, so rows arrive
+        page_size at a time without holding a snapshot open for the whole
+        run. Media owned by the live pipeline (IN_FLIGHT_STATUSES), without
+        audio, or already done/skipped in this run are left out. A session
+        advisory lock on the run ID stops two processes running the same run.
+
+        Args:
+            run_id: Backfill run name (the resume key)
+            project_id: Only this project
+            statuses: Only media in these statuses (default: complete, failed)
+            since: Only media created at or after this timestamp
+            until: Only media created before this timestamp
+            page_size: Rows per round trip
+
+        Yields:
+            Media dicts (id, project_id, user_id, audio_s3_key, duration, status)
+        """
+        conditions = ["m.audio_s3_key IS NOT NULL", "m.status::text <> ALL(%s)"]
+        params: List = [list(IN_FLIGHT_STATUSES)]
+        conditions.append("m.status::text = ANY(%s)")
+        params.append(statuses or ['complete', 'failed'])
+        if project_id:
+            conditions.append("m.project_id = %s")
+            params.append(project_id)
+        if since:
+            conditions.append("m.created_at >= %s")
+            params.append(since)
+        if until:
+            conditions.append("m.created_at < %s")
+            params.append(until)
+        conditions.append(
+            "NOT EXISTS (SELECT 1 FROM backfill_items b "
+            "WHERE b.run_id = %s AND b.media_id = m.id AND b.status IN ('done', 'skipped'))"
+        )
+        params.append(run_id)
+
+        conn = self._checkout()
+        cursor = None
+        locked = False
+        try:
+            # Autocommit: the DECLARE commits (materializing the result) and FETCHes open no transaction
+            conn.autocommit = True
+            with conn.cursor() as lock_cursor:
+                lock_cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (f"backfill:{run_id}",))
+                locked = lock_cursor.fetchone()[0]
+            if not locked:
+                raise RuntimeError(f"Backfill run '{run_id}' is already running")
+
+            cursor = conn.cursor(name=f"backfill_{os.getpid()}", withhold=True)
+            cursor.itersize = page_size
+            cursor.execute(
+                f"""
+                SELECT m.id, m.project_id, m.user_id, m.audio_s3_key, m.duration, m.status
+                FROM media m
+                WHERE {' AND '.join(conditions)}
+                ORDER BY m.id
+                """,
+                params
+            )
+
+            for row in cursor:
+                yield {
+                    'id': str(row[0]),
+                    'project_id': str(row[1]),
+                    'user_id': str(row[2]) if row[2] else None,
+                    'audio_s3_key': row[3],
+                    'duration': row[4],
+                    'status': row[5]
+                }
+
+        except Exception as e:
+            logger.error(f"❌ Failed to select backfill media: {str(e)}")
+            raise
+
         finally:
-            cursor.close()
+            broken = False
+            try:
+                if cursor is not None:
+                    cursor.close()
+                if locked:
+                    with conn.cursor() as unlock_cursor:
+                        unlock_cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", (f"backfill:{run_id}",))
+                conn.autocommit = False
+            except psycopg2.Error:
+                broken = True
+            self._checkin(conn, discard=broken)
+
+    def save_backfill_batch(self, run_id: str, results: List[Dict], failures: List[Dict]) -> Dict[str, int]:
+        """
+        Bulk-write a batch of backfill transcripts in one commit
+
+        Each media is written only if this transaction gets its advisory lock
+        (no live job is saving it right now) and its status is still outside
+        IN_FLIGHT_STATUSES (it wasn't re-queued since it was selected).
+        Anything else is recorded as skipped: the live pipeline owns it.
+        Transcripts are updated in place or inserted, segment rows replaced,
+        media marked complete, and every item's outcome checkpointed.
+
+        Args:
+            run_id: Backfill run name
+            results: Dicts with media_id, text, segments, language, confidence, model
+            failures: Dicts with media_id and error
+
+        Returns:
+            Counts: done, skipped, failed
+        """
+        try:
+            with metrics.DB_WRITE_SECONDS.labels('backfill_batch').time(), self._transaction() as cursor:
+                writable = set()
+                if results:
+                    cursor.execute(
+                        """
+                        SELECT m.id
+                        FROM media m
+                        WHERE m.id = ANY(%s::uuid[])
+                          AND m.status::text <> ALL(%s)
+                          AND pg_try_advisory_xact_lock(hashtext(m.id::text))
+                        FOR UPDATE OF m SKIP LOCKED
+                        """,
+                        ([r['media_id'] for r in results], list(IN_FLIGHT_STATUSES))
+                    )
+                    writable = {str(row[0]) for row in cursor.fetchall()}
+
+                rows = []
+                for r in results:
+                    if r['media_id'] not in writable:
+                        continue
+                    segments_json, segments_packed = segment_columns(r['segments'])
+                    rows.append((
+                        r['media_id'], r['text'], segments_json,
+                        psycopg2.Binary(segments_packed) if segments_packed is not None else None,
+                        r['language'], r['confidence'], r['model']
+                    ))
+                media_ids = [row[0] for row in rows]
+
+                if rows:
+                    template = "(%s::uuid, %s, %s::jsonb, %s::bytea, %s, %s::float8, %s)"
+                    execute_values(
+                        cursor,
+                        """
+                        UPDATE transcripts t
+                        SET text = v.text, segments = v.segments, segments_packed = v.segments_packed,
+                            language = v.language, confidence = v.confidence, model = v.model
+                        FROM (VALUES %s) AS v (media_id, text, segments, segments_packed, language, confidence, model)
+                        WHERE t.media_id = v.media_id
+                        """,
+                        rows, template=template, page_size=SEGMENT_PAGE_SIZE
+                    )
+                    execute_values(
+                        cursor,
+                        """
+                        INSERT INTO transcripts (media_id, text, segments, segments_packed, language, confidence, model)
+                        SELECT v.* FROM (VALUES %s) AS v (media_id, text, segments, segments_packed, language, confidence, model)
+                        WHERE NOT EXISTS (SELECT 1 FROM transcripts t WHERE t.media_id = v.media_id)
+                        """,
+                        rows, template=template, page_size=SEGMENT_PAGE_SIZE
+                    )
+
+                    cursor.execute("DELETE FROM transcript_segments WHERE media_id = ANY(%s::uuid[])", (media_ids,))
+                    execute_values(
+                        cursor,
+                        "INSERT INTO transcript_segments (media_id, idx, start_time, end_time, text) VALUES %s",
+                        (
+                            (r['media_id'], idx, segment['start'], segment['end'], segment['text'])
+                            for r in results if r['media_id'] in writable
+                            for idx, segment in enumerate(r['segments'])
+                        ),
+                        page_size=SEGMENT_PAGE_SIZE
+                    )
+
+                    cursor.execute(
+                        """
+                        UPDATE media SET status = 'complete', progress = 100, updated_at = NOW()
+                        WHERE id = ANY(%s::uuid[])
+                        """,
+                        (media_ids,)
+                    )
+
+                outcomes = [(run_id, media_id, 'done', None) for media_id in media_ids]
+                outcomes += [(run_id, r['media_id'], 'skipped', None) for r in results if r['media_id'] not in writable]
+                outcomes += [(run_id, f['media_id'], 'failed', f['error'][:1000]) for f in failures]
+                if outcomes:
+                    execute_values(
+                        cursor,
+                        """
+                        INSERT INTO backfill_items (run_id, media_id, status, error) VALUES %s
+                        ON CONFLICT (run_id, media_id) DO UPDATE
+                        SET status = EXCLUDED.status, error = EXCLUDED.error, updated_at = NOW()
+                        """,
+                        outcomes
+                    )
+
+            counts = {'done': len(media_ids), 'skipped': len(results) - len(media_ids), 'failed': len(failures)}
+            logger.info(
+                f"💾 Backfill batch: {counts['done']} saved, {counts['skipped']} skipped, {counts['failed']} failed"
+            )
+            return counts
+
+        except Exception as e:
+            logger.error(f"❌ Failed to save backfill batch: {str(e)}")
+            raise
+
+    def get_backfill_counts(self, run_id: str) -> Dict[str, int]:
+        """Items per status recorded for a backfill run"""
+        try:
+            with self._transaction() as cursor:
+                cursor.execute(
+                    "SELECT status, COUNT(*) FROM backfill_items WHERE run_id = %s GROUP BY status",
+                    (run_id,)
+                )
+                return {status: count for status, count in cursor.fetchall()}
+
+        except Exception as e:
+            logger.error(f"❌ Failed to get backfill progress: {str(e)}")
+            raise
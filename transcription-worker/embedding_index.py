@@ -0,0 +1,232 @@
+"""
+Semantic segment search
+Per-project float16 embedding index stored in memory-mapped files
+
+Layout of {EMBEDDINGS_DIR}/{project_id}/:
+    vectors.f16   raw (n, dim) float16 rows, L2-normalized
+    rows.bin      raw (n,) records of ROW_DTYPE: media slot, start, end
+    media.json    {"dim": int, "rows": int, "media": [media_id | null, ...]}
+
+Rows are append-only. Re-indexing a media nulls its old slot in media.json
+(a tombstone) and appends fresh rows, so readers never see a partial rewrite.
+media.json is the commit record: it is replaced atomically after both data
+files are synced, and only its first "rows" rows are ever read. Bytes past
+that (a writer that died mid-append) are truncated by the next writer.
+"""
+import os
+import json
+import fcntl
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from logger import logger
+import config
+
+ROW_DTYPE = np.dtype([('media', '<i4'), ('start', '<f4'), ('end', '<f4')])
+SEARCH_BLOCK_ROWS = 65536  # Rows scored per block, keeps query memory flat
+
+class EmbeddingService:
+    def __init__(self):
+        """Load a small CPU sentence-embedding model"""
+        from sentence_transformers import SentenceTransformer
+        
+        logger.info(f"🔄 Loading embedding model '{config.EMBEDDING_MODEL}'...")
+        self.model = SentenceTransformer(config.EMBEDDING_MODEL, device='cpu')
+        logger.info(f"✅ Embedding model loaded (dim: {self.model.get_sentence_embedding_dimension()})")
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts
+        
+        Returns:
+            (len(texts), dim) float32 L2-normalized vectors
+        """
+        return self.model.encode(
+            texts,
+            batch_size=config.EMBEDDING_BATCH_SIZE,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ).astype(np.float32)
+
+class EmbeddingIndex:
+    def __init__(self, embedder: EmbeddingService, root: Optional[str] = None):
+        """
+        Initialize index rooted at EMBEDDINGS_DIR
+        
+        Args:
+            embedder: Model used for segments and queries
+            root: Override index directory
+        """
+        self.embedder = embedder
+        self.root = root or config.EMBEDDINGS_DIR
+    
+    def _project_dir(self, project_id: str) -> str:
+        return os.path.join(self.root, project_id)
+    
+    @contextmanager
+    def _locked(self, project_id: str, exclusive: bool):
+        """Cross-process lock on a project's index files"""
+        project_dir = self._project_dir(project_id)
+        os.makedirs(project_dir, exist_ok=True)
+        with open(os.path.join(project_dir, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield project_dir
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _read_meta(self, project_dir: str) -> Dict:
+        path = os.path.join(project_dir, 'media.json')
+        if not os.path.exists(path):
+            return {'dim': None, 'media': []}
+        with open(path) as f:
+            return json.load(f)
+    
+    def _write_meta(self, project_dir: str, meta: Dict):
+        """Atomically replace media.json (commits the rows it counts)"""
+        path = os.path.join(project_dir, 'media.json')
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    
+    def _committed_rows(self, project_dir: str, meta: Dict) -> int:
+        """Rows committed by media.json (indexes written before "rows" existed: rows in both files)"""
+        if 'rows' in meta:
+            return meta['rows']
+        if meta['dim'] is None:
+            return 0
+        return min(
+            os.path.getsize(os.path.join(project_dir, 'vectors.f16')) // (meta['dim'] * 2),
+            os.path.getsize(os.path.join(project_dir, 'rows.bin')) // ROW_DTYPE.itemsize
+        )
+    
+    def _append(self, path: str, data: bytes, committed_bytes: int):
+        """Drop uncommitted bytes from an interrupted append, then append and sync"""
+        with open(path, 'ab') as f:
+            if f.tell() > committed_bytes:
+                logger.warning(f"⚠️  Truncating {f.tell() - committed_bytes} uncommitted bytes from {path}")
+                f.truncate(committed_bytes)
+                f.seek(committed_bytes)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def add_media(self, project_id: str, media_id: str, segments: List[Dict]) -> int:
+        """
+        Embed a media's segments and append them to the project index
+        
+        Args:
+            project_id: Project UUID
+            media_id: Media UUID
+            segments: Transcript segments with 'start', 'end', 'text'
+            
+        Returns:
+            Number of rows added
+        """
+        segments = [segment for segment in segments if segment['text']]
+        if not segments:
+            return 0
+        
+        vectors = self.embedder.embed([segment['text'] for segment in segments])
+        
+        rows = np.empty(len(segments), dtype=ROW_DTYPE)
+        rows['start'] = [segment['start'] for segment in segments]
+        rows['end'] = [segment['end'] for segment in segments]
+        
+        with self._locked(project_id, exclusive=True) as project_dir:
+            meta = self._read_meta(project_dir)
+            committed = self._committed_rows(project_dir, meta)
+            if meta['dim'] is None:
+                meta['dim'] = int(vectors.shape[1])
+            elif meta['dim'] != vectors.shape[1]:
+                raise ValueError(
+                    f"Embedding dim {vectors.shape[1]} does not match index dim {meta['dim']}"
+                )
+            
+            # Tombstone any previous version of this media
+            meta['media'] = [None if m == media_id else m for m in meta['media']]
+            rows['media'] = len(meta['media'])
+            meta['media'].append(media_id)
+            meta['rows'] = committed + len(segments)
+            
+            self._append(
+                os.path.join(project_dir, 'vectors.f16'),
+                vectors.astype(np.float16).tobytes(),
+                committed * meta['dim'] * 2
+            )
+            self._append(os.path.join(project_dir, 'rows.bin'), rows.tobytes(), committed * ROW_DTYPE.itemsize)
+            self._write_meta(project_dir, meta)
+        
+        logger.info(f"🧭 Indexed {len(segments)} segment embeddings for media {media_id}")
+        return len(segments)
+    
+    def search_vector(self, project_id: str, query: np.ndarray, k: int = 10) -> List[Tuple[str, float, float, float]]:
+        """
+        Top-k cosine search over a project's memory-mapped vectors
+        
+        Args:
+            project_id: Project UUID
+            query: (dim,) L2-normalized query vector
+            k: Number of results
+            
+        Returns:
+            List of (media_id, start, end, score), best first
+        """
+        with self._locked(project_id, exclusive=False) as project_dir:
+            meta = self._read_meta(project_dir)
+            if not meta['media']:
+                return []
+            
+            dim = meta['dim']
+            vectors_path = os.path.join(project_dir, 'vectors.f16')
+            rows_path = os.path.join(project_dir, 'rows.bin')
+            n = self._committed_rows(project_dir, meta)
+            if n == 0:
+                return []
+            
+            vectors = np.memmap(vectors_path, dtype=np.float16, mode='r', shape=(n, dim))
+            rows = np.memmap(rows_path, dtype=ROW_DTYPE, mode='r', shape=(n,))
+            live = np.array([m is not None for m in meta['media']], dtype=bool)
+            query = query.astype(np.float32)
+            
+            best_scores = np.empty(0, dtype=np.float32)
+            best_index = np.empty(0, dtype=np.int64)
+            for start in range(0, n, SEARCH_BLOCK_ROWS):
+                end = min(start + SEARCH_BLOCK_ROWS, n)
+                scores = vectors[start:end].astype(np.float32) @ query
+                scores[~live[rows['media'][start:end]]] = -np.inf
+                
+                # Merge this block's candidates with the running top-k
+                scores = np.concatenate((best_scores, scores))
+                index = np.concatenate((best_index, np.arange(start, end)))
+                if len(scores) > k:
+                    keep = np.argpartition(-scores, k)[:k]
+                    scores, index = scores[keep], index[keep]
+                best_scores, best_index = scores, index
+            
+            order = np.argsort(-best_scores)
+            results = []
+            for i in order:
+                if not np.isfinite(best_scores[i]):
+                    continue
+                row = rows[best_index[i]]
+                results.append((
+                    meta['media'][row['media']],
+                    round(float(row['start']), 3),
+                    round(float(row['end']), 3),
+                    float(best_scores[i])
+                ))
+            return results
+    
+    def query(self, project_id: str, text: str, k: int = 10) -> List[Tuple[str, float, float, float]]:
+        """
+        Find the moments in a project that best match a text query
+        
+        Returns:
+            List of (media_id, start, end, score), best first
+        """
+        return self.search_vector(project_id, self.embedder.embed([text])[0], k)
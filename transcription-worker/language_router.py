@@ -0,0 +1,104 @@
+"""
+Language prefilter: detect a media's language once, then route it to an English-only or multilingual model
+"""
+import os
+from typing import Callable, Optional, Tuple, Union
+import numpy as np
+from logger import logger
+from audio_utils import SAMPLE_RATE, decode_file
+from whisper_service import LANGUAGE_AUTO
+import metrics
+import config
+
+ENGLISH_ONLY_SIZES = ('tiny', 'base', 'small', 'medium')  # Sizes that ship a .en checkpoint
+
+def english_model(model_name: str) -> str:
+    """English-only variant of a model ('small' → 'small.en'), or the model itself if there is none"""
+    if model_name in ENGLISH_ONLY_SIZES:
+        return f"{model_name}.en"
+    return model_name
+
+def multilingual_model(model_name: str) -> str:
+    """Multilingual variant of a model ('small.en' → 'small')"""
+    if model_name.endswith('.en') and os.sep not in model_name:
+        return model_name[:-len('.en')]
+    return model_name
+
+def route(model_name: str, language: str, probability: float) -> Tuple[str, str]:
+    """
+    Model and language to transcribe a media with
+
+    English goes to the English-only variant (faster and more accurate at
+    the same size), other languages to the multilingual one with the
+    language forced. An uncertain detection goes to the multilingual
+    model, which detects again itself. Like every Whisper detection that
+    only looks at the first 30 s window; the job's model is usually larger
+    than LANGUAGE_DETECT_MODEL, which is what makes the second try worth it.
+
+    Args:
+        model_name: Model chosen for the job (before routing)
+        language: Detected language code
+        probability: Detection probability
+
+    Returns:
+        (model name, language or LANGUAGE_AUTO)
+    """
+    if probability < config.LANGUAGE_MIN_PROBABILITY:
+        return multilingual_model(model_name), LANGUAGE_AUTO
+    if language == 'en':
+        return english_model(model_name), language
+    return multilingual_model(model_name), language
+
+class LanguageRouter:
+    def __init__(self, whisper_service, db_service):
+        """
+        Initialize router
+
+        Args:
+            whisper_service: Loads the detection model through its model LRU
+            db_service: Stores detections in media_language
+        """
+        self.whisper_service = whisper_service
+        self.db_service = db_service
+        logger.info(f"✅ Language routing enabled (detection: {config.LANGUAGE_DETECT_MODEL})")
+
+    def cached(self, media_id: str) -> Optional[Tuple[str, float]]:
+        """Language detected by an earlier attempt at this media, if any"""
+        detected = self.db_service.get_media_language(media_id)
+        if detected:
+            metrics.LANGUAGE_DETECTIONS_TOTAL.labels('cached', detected[0]).inc()
+        return detected
+
+    def detect(
+        self,
+        media_id: str,
+        audio: Union[str, np.ndarray],
+        run: Optional[Callable] = None
+    ) -> Tuple[str, float]:
+        """
+        Detect a media's language from its first LANGUAGE_DETECT_SECONDS and store it
+
+        Args:
+            media_id: Media UUID
+            audio: Downloaded audio file path or decoded PCM
+            run: Runs the model call where inference must happen (e.g.
+                MicroBatcher.run); decoding stays on the calling thread
+
+        Returns:
+            (language code, probability)
+        """
+        if isinstance(audio, np.ndarray):
+            pcm = audio[:int(config.LANGUAGE_DETECT_SECONDS * SAMPLE_RATE)]
+        else:
+            pcm = decode_file(audio, max_seconds=config.LANGUAGE_DETECT_SECONDS)
+
+        detect = lambda: self.whisper_service.detect_language(pcm)
+        language, probability = run(detect) if run else detect()
+        metrics.LANGUAGE_DETECTIONS_TOTAL.labels('detected', language).inc()
+
+        # Best effort: without the row a retry just detects again
+        try:
+            self.db_service.save_media_language(media_id, language, probability)
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to save detected language: {str(e)}")
+        return language, probability
@@ -1,27 +1,62 @@
 """
 Transcription Worker Entry Point
 """
+import argparse
 import signal
 import sys
-from worker import TranscriptionWorker
 from logger import logger
+from readiness import mark_not_ready
+import config
 
 def signal_handler(sig, frame):
-    """Handle SIGINT (Ctrl+C) gracefully"""
+    """Handle SIGINT (Ctrl+C) and SIGTERM (container stop) gracefully"""
     logger.info("")
-    logger.info("🛑 Received SIGINT signal")
-    sys.exit(0)
+    logger.info(f"🛑 Received {signal.Signals(sig).name} signal")
+    # Unwinds into the worker's stop(): running jobs finish and are not counted as crashes
+    raise KeyboardInterrupt
+
+def parse_args():
+    """Parse command line flags"""
+    parser = argparse.ArgumentParser(description='SyncSearch Transcription Worker')
+    parser.add_argument(
+        '--runtime',
+        choices=['sync', 'async'],
+        default=config.WORKER_RUNTIME,
+        help='sync: pika/boto3/psycopg2 worker; async: aio-pika/aiobotocore/asyncpg worker'
+    )
+    return parser.parse_args()
 
 def main():
     """Main entry point"""
-    # Register signal handler
-    signal.signal(signal.SIGINT, signal_handler)
+    args = parse_args()
     
     try:
-        # Create and start worker
-        worker = TranscriptionWorker()
+        if args.runtime == 'async':
+            # asyncio.run turns Ctrl+C into task cancellation, which the worker handles
+            import asyncio
+            from async_worker import AsyncTranscriptionWorker
+            asyncio.run(AsyncTranscriptionWorker().start())
+            return
+        
+        # Register signal handlers
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+        
+        # Clear a ready file left behind by a crashed predecessor
+        mark_not_ready()
+        
+        # Create and start worker (supervisor + children in pool mode).
+        # Imported here so the supervisor never loads the single-process stack.
+        if config.WORKER_POOL_SIZE > 1:
+            from worker_pool import TranscriptionPool
+            worker = TranscriptionPool()
+        else:
+            from worker import TranscriptionWorker
+            worker = TranscriptionWorker()
         worker.start()
         
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         logger.error(f"💥 Fatal error: {str(e)}")
         sys.exit(1)
@@ -0,0 +1,228 @@
+"""
+Memory admission control: estimate a job's peak memory and only run what fits
+"""
+import os
+import json
+import fcntl
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from logger import logger
+from whisper_service import model_memory_mb
+import metrics
+import config
+
+PLAN_FULL = 'full'  # Whole-file inference
+PLAN_CHUNKED = 'chunked'  # Long-form path: only CHUNK_MAX_DURATION of mel per worker at a time
+PLAN_DEFER = 'defer'  # Doesn't fit now, would on an idle worker: redeliver later
+PLAN_REJECT = 'reject'  # Wouldn't fit even on an idle worker
+
+PCM_MB_PER_SECOND = 16000 * 4 / (1024 * 1024)  # float32 mono at 16 kHz
+UNLIMITED = 1 << 60  # cgroup v1 reports "no limit" as a huge number
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def _stat_value(path: str, key: str) -> Optional[int]:
+    """A field of a cgroup memory.stat file"""
+    stat = _read(path)
+    if stat is None:
+        return None
+    for line in stat.splitlines():
+        name, _, value = line.partition(' ')
+        if name == key:
+            return int(value)
+    return None
+
+def _proc_status_kb(key: str) -> Optional[int]:
+    """A kB field of /proc/self/status (VmRSS, VmHWM)"""
+    status = _read('/proc/self/status')
+    if status is None:
+        return None
+    for line in status.splitlines():
+        if line.startswith(key + ':'):
+            return int(line.split()[1])
+    return None
+
+def _pid_alive(pid: int) -> bool:
+    """Process still exists (reservations of dead workers are stale)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def memory_limit_mb() -> float:
+    """MEMORY_LIMIT_MB, else the container's cgroup limit, else the host's RAM"""
+    if config.MEMORY_LIMIT_MB:
+        return float(config.MEMORY_LIMIT_MB)
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        value = _read(path)
+        if value and value != 'max' and int(value) < UNLIMITED:
+            return int(value) / (1024 * 1024)
+    meminfo = _read('/proc/meminfo') or ''
+    for line in meminfo.splitlines():
+        if line.startswith('MemTotal:'):
+            return int(line.split()[1]) / 1024
+    return float('inf')
+
+def memory_usage_mb() -> float:
+    """
+    Memory in use that counts toward an OOM kill
+
+    Anonymous memory of the whole cgroup (every worker process in the
+    container, without reclaimable page cache), else this process's RSS.
+    """
+    anon = _stat_value('/sys/fs/cgroup/memory.stat', 'anon')
+    if anon is None:
+        anon = _stat_value('/sys/fs/cgroup/memory/memory.stat', 'total_rss')
+    if anon is not None:
+        return anon / (1024 * 1024)
+    return current_rss_mb()
+
+def current_rss_mb() -> float:
+    """Resident set size of this process"""
+    return (_proc_status_kb('VmRSS') or 0) / 1024
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process since start or the last reset_peak_rss()"""
+    return (_proc_status_kb('VmHWM') or 0) / 1024
+
+def reset_peak_rss() -> None:
+    """Reset VmHWM so the next peak_rss_mb() covers one job (Linux 4.0+; no-op elsewhere)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def estimate_job_mb(duration: float, model_name: str, model_loaded: bool, chunked: bool) -> float:
+    """
+    Estimated peak memory a job adds to the worker
+
+    Whole-file inference holds the waveform, its STFT and the log-mel
+    spectrogram at once (about MEMORY_MB_PER_AUDIO_SECOND). The chunked
+    path holds the waveform (plus a copy per chunk handed to workers) and
+    one chunk's spectrogram per chunk worker.
+
+    Args:
+        duration: Media duration in seconds
+        model_name: Whisper model the job runs with
+        model_loaded: Model is already resident (its memory is in the baseline)
+        chunked: Estimate for the long-form path
+
+    Returns:
+        Megabytes
+    """
+    model = 0 if model_loaded else model_memory_mb(model_name)
+    if chunked:
+        work = duration * PCM_MB_PER_SECOND * 2
+        work += min(duration, config.CHUNK_MAX_DURATION) * config.MEMORY_MB_PER_AUDIO_SECOND * max(1, config.CHUNK_WORKERS)
+    else:
+        work = duration * config.MEMORY_MB_PER_AUDIO_SECOND
+    return model + work + config.MEMORY_JOB_OVERHEAD_MB
+
+class MemoryGuard:
+    """
+    Admits jobs against the memory budget
+
+    The budget is the memory limit minus MEMORY_HEADROOM_MB. A job is
+    admitted if its estimate fits in what's left after current usage and
+    the reservations of jobs already admitted in this container (usage
+    that those jobs have already allocated is counted twice, which errs on
+    the safe side). The reservation is held until release().
+
+    Reservations live in MEMORY_RESERVATIONS_FILE under an flock, so pool
+    children (which all see the same cgroup usage) account for each
+    other's jobs; entries of processes that died are dropped.
+    """
+
+    def __init__(self):
+        """Initialize guard (call once the default model is loaded, so the baseline includes it)"""
+        self.budget_mb = memory_limit_mb() - config.MEMORY_HEADROOM_MB
+        self.baseline_mb = memory_usage_mb()
+        self.path = config.MEMORY_RESERVATIONS_FILE
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        logger.info(f"🧮 Memory budget {self.budget_mb:.0f} MB (baseline {self.baseline_mb:.0f} MB in use)")
+
+    @contextmanager
+    def _reservations(self) -> Iterator[Dict[str, float]]:
+        """
+        Locked read-modify-write of the shared reservations ('<pid>:<key>' → MB)
+
+        Yields the live reservations; changes to the dict are written back.
+        """
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    stored = json.loads(f.read() or '{}')
+                except ValueError:
+                    stored = {}
+                reservations = {
+                    owner: mb for owner, mb in stored.items() if _pid_alive(int(owner.split(':', 1)[0]))
+                }
+                yield reservations
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(reservations))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _owner(key: str) -> str:
+        return f"{os.getpid()}:{key}"
+
+    def reserved(self) -> Dict[str, float]:
+        """Current reservations of every process ('<pid>:<key>' → MB)"""
+        with self._reservations() as reservations:
+            return dict(reservations)
+
+    def admit(self, key: str, duration: Optional[float], model_name: str, model_loaded: bool, can_chunk: bool):
+        """
+        Decide how (and whether) to run a job, reserving its memory if it runs
+
+        Args:
+            key: Job identity for release()
+            duration: Media duration in seconds (None = unknown, always admitted)
+            model_name: Whisper model the job runs with
+            model_loaded: Model is already resident
+            can_chunk: The long-form path is available
+
+        Returns:
+            (PLAN_* constant, estimated MB)
+        """
+        if duration is None:
+            return PLAN_FULL, 0.0
+
+        full_mb = estimate_job_mb(duration, model_name, model_loaded, chunked=False)
+        chunked_mb = estimate_job_mb(duration, model_name, model_loaded, chunked=True) if can_chunk else None
+
+        with self._reservations() as reservations:
+            usage_mb = memory_usage_mb()
+            metrics.MEMORY_USAGE_BYTES.set(usage_mb * 1024 * 1024)
+            available = self.budget_mb - usage_mb - sum(reservations.values())
+
+            if full_mb <= available:
+                plan, estimate = PLAN_FULL, full_mb
+            elif chunked_mb is not None and chunked_mb <= available:
+                plan, estimate = PLAN_CHUNKED, chunked_mb
+            else:
+                smallest = min(full_mb, chunked_mb) if chunked_mb is not None else full_mb
+                plan = PLAN_DEFER if smallest <= self.budget_mb - self.baseline_mb else PLAN_REJECT
+                return plan, smallest
+
+            reservations[self._owner(key)] = estimate
+            return plan, estimate
+
+    def release(self, key: str):
+        """Drop a job's reservation"""
+        with self._reservations() as reservations:
+            reservations.pop(self._owner(key), None)
@@ -0,0 +1,112 @@
+"""
+Prometheus metrics for the transcription pipeline
+Exposed on http://<host>:METRICS_PORT/metrics when METRICS_ENABLED is set
+"""
+import os
+import shutil
+import config
+
+# Pool and chunk children are separate processes, so their samples must go
+# through prometheus_client's multiprocess mode. The env var has to be set
+# before prometheus_client is imported, and is inherited by spawned children.
+if config.METRICS_ENABLED and 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    if config.WORKER_POOL_SIZE > 1 or (config.LONG_FORM_ENABLED and config.CHUNK_WORKERS > 1):
+        # First process to get here owns the directory: start from a clean slate
+        shutil.rmtree(config.METRICS_MULTIPROC_DIR, ignore_errors=True)
+        os.makedirs(config.METRICS_MULTIPROC_DIR, exist_ok=True)
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = config.METRICS_MULTIPROC_DIR
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, start_http_server
+from prometheus_client import multiprocess
+from logger import logger
+
+QUEUE_WAIT_SECONDS = Histogram(
+    'transcription_queue_wait_seconds',
+    'Time between job publish and delivery to the worker',
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 1800, 3600)
+)
+S3_DOWNLOAD_SECONDS = Histogram(
+    'transcription_s3_download_seconds',
+    'S3 audio download duration',
+    ['mode'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+S3_DOWNLOAD_BYTES = Histogram(
+    'transcription_s3_download_bytes',
+    'S3 audio object size',
+    ['mode'],
+    buckets=tuple(2 ** n for n in range(16, 31, 2))  # 64 KiB … 1 GiB
+)
+DECODE_SECONDS = Histogram(
+    'transcription_decode_seconds',
+    'ffmpeg decode to PCM duration',
+    ['source'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+INFERENCE_SECONDS = Histogram(
+    'transcription_inference_seconds',
+    'Whisper inference duration',
+    ['backend', 'model'],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+)
+REAL_TIME_FACTOR = Histogram(
+    'transcription_real_time_factor',
+    'Inference seconds per second of audio',
+    ['backend', 'model'],
+    buckets=(0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4)
+)
+DB_WRITE_SECONDS = Histogram(
+    'transcription_db_write_seconds',
+    'Database write latency',
+    ['operation'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+JOBS_TOTAL = Counter(
+    'transcription_jobs_total',
+    'Jobs settled by the consumer',
+    ['outcome']  # completed, retried, deferred, requeued, dead_lettered
+)
+MEMORY_USAGE_BYTES = Gauge(
+    'transcription_memory_usage_bytes',
+    'Container anonymous memory (or process RSS) at the last admission check',
+    multiprocess_mode='livemax'
+)
+JOB_PEAK_RSS_BYTES = Histogram(
+    'transcription_job_peak_rss_bytes',
+    'Peak process RSS while running one job',
+    buckets=tuple(2 ** n for n in range(28, 36))  # 256 MiB … 32 GiB
+)
+AUDIO_CACHE_LOOKUPS_TOTAL = Counter(
+    'transcription_audio_cache_lookups_total',
+    'Host audio cache lookups',
+    ['result']  # hit, miss
+)
+TRIMMED_AUDIO_SECONDS = Counter(
+    'transcription_trimmed_audio_seconds',
+    'Audio seconds seen by the silence trimmer',
+    ['part']  # kept, removed
+)
+LANGUAGE_DETECTIONS_TOTAL = Counter(
+    'transcription_language_detections_total',
+    'Language prefilter results',
+    ['source', 'language']  # source: detected, cached
+)
+CACHE_LOOKUPS_TOTAL = Counter(
+    'transcription_cache_lookups_total',
+    'Transcript cache lookups',
+    ['result']  # hit, miss
+)
+
+def start_metrics_server():
+    """Serve /metrics if METRICS_ENABLED (aggregating children in multiprocess mode)"""
+    if not config.METRICS_ENABLED:
+        return
+    
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(config.METRICS_PORT, registry=registry)
+    else:
+        start_http_server(config.METRICS_PORT)
+    
+    logger.info(f"📈 Metrics available on :{config.METRICS_PORT}/metrics")
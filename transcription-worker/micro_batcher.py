@@ -0,0 +1,116 @@
+"""
+Micro-batching of short clips into batched Whisper forward passes
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from logger import logger
+from whisper_service import WhisperService
+import config
+
+class MicroBatcher:
+    """
+    Single inference thread that coalesces concurrent short-clip requests
+
+    Job threads call `transcribe(pcm)` and block; the inference thread
+    collects up to `max_batch` clips (waiting at most `max_wait_ms` after the
+    first one) and transcribes them in one `WhisperService.transcribe_batch`
+    call. Anything else that needs the model goes through `run(fn)`, which
+    executes on the same thread, so the model is never used concurrently.
+    """
+
+    def __init__(self, whisper_service: WhisperService, max_batch: int = None, max_wait_ms: int = None):
+        """
+        Initialize batcher and start its inference thread
+
+        Args:
+            whisper_service: Loaded model shared by all jobs in this process
+            max_batch: Clips per forward pass (defaults to config.MICRO_BATCH_SIZE)
+            max_wait_ms: How long to hold a partial batch (defaults to config.MICRO_BATCH_WAIT_MS)
+        """
+        self.whisper_service = whisper_service
+        self.max_batch = max_batch or config.MICRO_BATCH_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else config.MICRO_BATCH_WAIT_MS) / 1000
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name='inference', daemon=True)
+        self._thread.start()
+        logger.info(f"✅ Micro-batching enabled (up to {self.max_batch} clips, {self.max_wait * 1000:.0f} ms wait)")
+
+    def transcribe(self, pcm: np.ndarray, model_name: Optional[str] = None, language: Optional[str] = None) -> Dict:
+        """Transcribe a short clip as part of the next batch (blocks until done)"""
+        future = Future()
+        self._requests.put(('clip', (pcm, model_name, language), future))
+        return future.result()
+
+    def run(self, fn: Callable[[], Any]) -> Any:
+        """Run `fn` on the inference thread between batches (blocks until done)"""
+        future = Future()
+        self._requests.put(('call', fn, future))
+        return future.result()
+
+    def _collect(self, first) -> Tuple[List, List]:
+        """Gather clips for one batch; calls that arrive meanwhile run afterwards"""
+        clips, calls = [first], []
+        deadline = time.monotonic() + self.max_wait
+        while len(clips) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._requests.put(None)  # Re-post shutdown for the main loop
+                break
+            (clips if request[0] == 'clip' else calls).append(request)
+        return clips, calls
+
+    def _run_batch(self, clips: List):
+        """Transcribe a batch (one forward pass per model and language) and resolve each caller's future"""
+        by_model = {}
+        for request in clips:
+            by_model.setdefault(request[1][1:], []).append(request)
+
+        for (model_name, language), group in by_model.items():
+            try:
+                results = self.whisper_service.transcribe_batch(
+                    [pcm for _, (pcm, _, _), _ in group], model_name, language
+                )
+            except Exception as e:
+                for _, _, future in group:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(group, results):
+                future.set_result(result)
+
+    def _run_call(self, request):
+        """Execute a run() request"""
+        _, fn, future = request
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+
+    def _loop(self):
+        """Inference thread"""
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            if request[0] == 'call':
+                self._run_call(request)
+                continue
+
+            clips, calls = self._collect(request)
+            self._run_batch(clips)
+            for call in calls:
+                self._run_call(call)
+
+    def shutdown(self):
+        """Stop the inference thread after the requests queued so far"""
+        self._requests.put(None)
+        self._thread.join()
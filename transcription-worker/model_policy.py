@@ -0,0 +1,53 @@
+"""
+Per-job Whisper model selection from media duration, backlog and project quality
+"""
+from typing import Dict, Optional, Tuple
+import config
+
+QUALITY_FAST = 'fast'  # Always the fast model
+QUALITY_BALANCED = 'balanced'  # Default model unless the job is long or the queue is backed up
+QUALITY_HIGH = 'high'  # Always the default model, whatever the load
+QUALITIES = (QUALITY_FAST, QUALITY_BALANCED, QUALITY_HIGH)
+
+def choose_model(
+    duration: Optional[float],
+    queue_depth: Optional[int],
+    quality: Optional[str]
+) -> Tuple[str, bool]:
+    """
+    Pick the Whisper model for a job
+
+    Args:
+        duration: Media duration in seconds (None if unknown)
+        queue_depth: Jobs waiting when this one was delivered (None if unknown)
+        quality: Project quality setting (None = DEFAULT_PROJECT_QUALITY)
+
+    Returns:
+        (model name, whether to queue a re-transcription with the default model)
+    """
+    if not config.ADAPTIVE_MODELS_ENABLED or config.WHISPER_FAST_MODEL == config.WHISPER_MODEL:
+        return config.WHISPER_MODEL, False
+
+    quality = quality if quality in QUALITIES else config.DEFAULT_PROJECT_QUALITY
+    if quality == QUALITY_HIGH:
+        return config.WHISPER_MODEL, False
+    if quality == QUALITY_FAST:
+        return config.WHISPER_FAST_MODEL, False
+
+    backlogged = queue_depth is not None and queue_depth >= config.MODEL_BACKLOG_THRESHOLD
+    long_media = duration is not None and duration >= config.MODEL_FAST_MIN_DURATION
+    if backlogged or long_media:
+        # Serve something now; the upgrade runs once the backlog clears
+        return config.WHISPER_FAST_MODEL, config.MODEL_UPGRADE_ENABLED
+    return config.WHISPER_MODEL, False
+
+def upgrade_job(job: Dict) -> Dict:
+    """Follow-up job that re-transcribes a media with the default model"""
+    return {
+        'mediaId': job['mediaId'],
+        'userId': job.get('userId'),
+        'projectId': job.get('projectId'),
+        's3Key': job['s3Key'],
+        'operation': 'upgrade',
+        'model': config.WHISPER_MODEL
+    }
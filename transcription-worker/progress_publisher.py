@@ -0,0 +1,100 @@
+"""
+Publishes transcription progress events to a RabbitMQ fanout exchange
+"""
+import json
+import time
+import threading
+import pika
+from typing import Dict, List, Optional
+from logger import logger
+import config
+
+class ProgressPublisher:
+    """
+    Fire-and-forget progress events for the API to relay to clients
+
+    Uses its own connection so job threads (and pool children, which have
+    no consumer connection) can publish without touching the consumer's
+    channel. Events are transient: a lost event only delays a progress bar,
+    so failures are logged and never fail the job.
+    """
+
+    def __init__(self):
+        """Initialize publisher (connects on first publish)"""
+        self.connection = None
+        self.channel = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open the connection and declare the progress exchange"""
+        self.connection = pika.BlockingConnection(pika.URLParameters(config.RABBITMQ_URL))
+        self.channel = self.connection.channel()
+        self.channel.exchange_declare(
+            exchange=config.PROGRESS_EXCHANGE,
+            exchange_type='fanout',
+            durable=True
+        )
+        logger.info(f"✅ Progress publisher connected (exchange: {config.PROGRESS_EXCHANGE})")
+
+    def publish(
+        self,
+        media: Dict,
+        progress: int,
+        status: str = 'transcribing',
+        segments: Optional[List[Dict]] = None,
+        first_index: int = 0
+    ):
+        """
+        Publish a progress event
+
+        Args:
+            media: Media record (id, project_id, user_id)
+            progress: Percent of the audio transcribed (0-100)
+            status: Media status the event reports
+            segments: Segments transcribed since the previous event
+            first_index: Index of segments[0] in the transcript
+        """
+        event = {
+            'mediaId': media['id'],
+            'projectId': media.get('project_id'),
+            'userId': media.get('user_id'),
+            'status': status,
+            'progress': progress,
+            'segmentIndex': first_index,
+            'segments': [
+                {'start': segment['start'], 'end': segment['end'], 'text': segment['text']}
+                for segment in segments or []
+            ],
+            'timestamp': int(time.time() * 1000)
+        }
+        body = json.dumps(event, default=str)
+
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self.connection is None or self.connection.is_closed:
+                        self._connect()
+                    # Service heartbeats that arrived since the last event
+                    self.connection.process_data_events(time_limit=0)
+                    self.channel.basic_publish(
+                        exchange=config.PROGRESS_EXCHANGE,
+                        routing_key='',
+                        body=body,
+                        properties=pika.BasicProperties(content_type='application/json')
+                    )
+                    return
+                except Exception as e:
+                    # Stale connection (missed heartbeats): reconnect once, then give up
+                    self.connection = None
+                    if attempt:
+                        logger.warning(f"⚠️  Failed to publish progress: {str(e)}")
+
+    def close(self):
+        """Close the publisher connection"""
+        with self._lock:
+            try:
+                if self.connection and self.connection.is_open:
+                    self.connection.close()
+            except Exception as e:
+                logger.warning(f"⚠️  Progress publisher close error: {str(e)}")
+            self.connection = None
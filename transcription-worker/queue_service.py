@@ -4,15 +4,66 @@ RabbitMQ service for consuming transcription jobs
 import pika
 import json
 import time
-from typing import Callable, Dict
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 from logger import logger
+import metrics
 import config
 
+class JobDeferred(Exception):
+    """Job can't run within the memory budget yet: redeliver after MEMORY_DEFER_DELAY without using a retry"""
+
+class JobPoisoned(Exception):
+    """Job must not run again (it keeps crashing workers, or can never fit): dead-letter it now"""
+
+class JobInterrupted(Exception):
+    """The process running the job died (a pool child crashed): hand the message back to the broker"""
+
+def retry_delay_ms(retry_count: int) -> int:
+    """Exponential backoff delay before retry number retry_count + 1"""
+    delay = config.RETRY_DELAY * (config.RETRY_BACKOFF ** retry_count)
+    return int(min(delay, config.RETRY_MAX_DELAY) * 1000)
+
+def retry_queue_name(delay_ms: int, target: Optional[str] = None) -> str:
+    """Holding queue for retries with a given delay (into `target`, default the transcription queue)"""
+    return f"{target or config.RABBITMQ_QUEUE}.retry.{delay_ms}"
+
+def lane_queue_name(lane: str) -> str:
+    """Queue holding routed jobs for a scheduling lane"""
+    return f"{config.RABBITMQ_QUEUE}.{lane}"
+
+def retry_queue_arguments(delay_ms: int, target: Optional[str] = None) -> Dict:
+    """
+    Retry queue arguments: messages sit out their TTL with no consumer, then
+    are dead-lettered back onto `target` (default the transcription queue)
+    """
+    return {
+        'x-message-ttl': delay_ms,
+        'x-dead-letter-exchange': '',
+        'x-dead-letter-routing-key': target or config.RABBITMQ_QUEUE
+    }
+
+def upgrade_queue_name() -> str:
+    """Queue of re-transcriptions waiting for the backlog to clear"""
+    return f"{config.RABBITMQ_QUEUE}.upgrade"
+
 class QueueService:
-    def __init__(self):
-        """Initialize RabbitMQ connection"""
+    def __init__(self, prefetch_count: Optional[int] = None):
+        """
+        Initialize RabbitMQ connection
+        
+        Args:
+            prefetch_count: Unacked jobs in flight (defaults to config.RABBITMQ_PREFETCH)
+        """
         self.connection = None
         self.channel = None
+        self.prefetch_count = prefetch_count or config.RABBITMQ_PREFETCH
+        self.executor = None  # Runs blocking handlers off the connection thread
+        self.route_executor = None  # Runs lane routing lookups off the connection thread
+        self._declared_queues = set()  # Retry/upgrade queues declared on this channel
+        self._lanes = []  # Lane queues counted in queue_depth
+        self._depth = (0.0, None)  # (read at, jobs waiting) cache for queue_depth
     
     def connect(self):
         """Connect to RabbitMQ"""
@@ -25,7 +76,7 @@ class QueueService:
             self.channel = self.connection.channel()
             
             # Set prefetch count (QoS)
-            self.channel.basic_qos(prefetch_count=config.RABBITMQ_PREFETCH)
+            self.channel.basic_qos(prefetch_count=self.prefetch_count)
             
             # Ensure queue exists with same configuration as API service
             self.channel.queue_declare(
@@ -39,7 +90,7 @@ class QueueService:
             
             logger.info("✅ RabbitMQ connected")
             logger.info(f"   Queue: {config.RABBITMQ_QUEUE}")
-            logger.info(f"   Prefetch: {config.RABBITMQ_PREFETCH}")
+            logger.info(f"   Prefetch: {self.prefetch_count}")
             
         except Exception as e:
             logger.error(f"❌ RabbitMQ connection failed: {str(e)}")
@@ -48,6 +99,10 @@ class QueueService:
     def disconnect(self):
         """Disconnect from RabbitMQ"""
         try:
+            if self.executor:
+                self.executor.shutdown(wait=True, cancel_futures=True)
+            if self.route_executor:
+                self.route_executor.shutdown(wait=True, cancel_futures=True)
             if self.channel:
                 self.channel.close()
             if self.connection:
@@ -56,71 +111,346 @@ class QueueService:
         except Exception as e:
             logger.error(f"❌ RabbitMQ disconnect error: {str(e)}")
     
+    def declare_lanes(self, lanes):
+        """
+        Declare one durable queue per scheduling lane
+        
+        Lane queues carry no TTL: long jobs may legitimately wait behind
+        each other for longer than the ingress queue would keep them.
+        """
+        for lane in lanes:
+            self.channel.queue_declare(
+                queue=lane_queue_name(lane),
+                durable=True,
+                arguments={'x-dead-letter-exchange': f'{config.RABBITMQ_EXCHANGE}.dlx'}
+            )
+            logger.info(f"   Lane queue: {lane_queue_name(lane)}")
+        self._lanes = list(lanes)
+    
+    def queue_depth(self, max_age: Optional[float] = None) -> Optional[int]:
+        """
+        Jobs waiting in the transcription queue (and lane queues)
+        
+        Read with passive queue.declare and reused for QUEUE_DEPTH_TTL
+        seconds. Must run on the connection thread.
+        
+        Returns:
+            Ready message count, or None if it couldn't be read
+        """
+        max_age = config.QUEUE_DEPTH_TTL if max_age is None else max_age
+        read_at, depth = self._depth
+        if depth is not None and time.monotonic() - read_at < max_age:
+            return depth
+        try:
+            depth = sum(
+                self.channel.queue_declare(queue=queue, passive=True).method.message_count
+                for queue in [config.RABBITMQ_QUEUE] + [lane_queue_name(lane) for lane in self._lanes]
+            )
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to read queue depth: {str(e)}")
+            return None
+        self._depth = (time.monotonic(), depth)
+        return depth
+    
+    def _declare_once(self, ch, queue: str, arguments: Optional[Dict] = None):
+        """Declare a durable worker-side queue the first time it's used on this channel"""
+        if queue not in self._declared_queues:
+            ch.queue_declare(queue=queue, durable=True, arguments=arguments)
+            self._declared_queues.add(queue)
+    
+    def _publish(self, ch, queue: str, body: bytes, headers: Optional[Dict] = None):
+        """Publish a persistent message straight to a queue"""
+        ch.basic_publish(
+            exchange='',
+            routing_key=queue,
+            body=body,
+            properties=pika.BasicProperties(
+                delivery_mode=2,  # Persistent
+                headers=headers,
+                timestamp=int(time.time() * 1000)
+            )
+        )
+    
+    def _feed_upgrade(self, ch, method, properties, body):
+        """
+        Move a queued re-transcription onto the transcription queue once the backlog clears
+        
+        While the queue is still backed up the upgrade is parked for
+        MODEL_UPGRADE_DEFER seconds and looked at again.
+        """
+        depth = self.queue_depth(max_age=0)
+        if depth is not None and depth < config.MODEL_BACKLOG_THRESHOLD:
+            self._publish(ch, config.RABBITMQ_QUEUE, body)
+            logger.info(f"⬆️  Released model upgrade (queue depth {depth})")
+        else:
+            delay_ms = config.MODEL_UPGRADE_DEFER * 1000
+            queue = retry_queue_name(delay_ms, upgrade_queue_name())
+            self._declare_once(ch, queue, retry_queue_arguments(delay_ms, upgrade_queue_name()))
+            self._publish(ch, queue, body)
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+    
+    def _parse(self, properties, body, observe: bool = True) -> Tuple[Dict, int]:
+        """Decode job body and read retry count from headers"""
+        job = json.loads(body)
+        logger.info(f"📥 Received job: {job.get('mediaId')} ({job.get('operation')})")
+        
+        retry_count = 0
+        if properties.headers:
+            retry_count = properties.headers.get('x-retry-count', 0)
+        
+        # Publishers stamp Date.now() (ms); the AMQP spec uses seconds
+        if observe and properties.timestamp:
+            published = properties.timestamp / 1000 if properties.timestamp > 1e11 else properties.timestamp
+            metrics.QUEUE_WAIT_SECONDS.observe(max(0.0, time.time() - published))
+        
+        return job, retry_count
+    
+    def _settle(
+        self, ch, method, properties, body, job: Optional[Dict], retry_count: int,
+        error: Optional[Exception], follow_up: Optional[Dict] = None
+    ):
+        """
+        Ack a finished job, or retry / dead-letter a failed one
+        
+        A handler may return a follow-up job (a model upgrade); it's queued
+        before the original is acked. Must run on the connection thread.
+        """
+        if error is None:
+            if follow_up:
+                self._declare_once(ch, upgrade_queue_name())
+                self._publish(ch, upgrade_queue_name(), json.dumps(follow_up))
+                logger.info(f"⬆️  Queued model upgrade for {follow_up.get('mediaId')}")
+            
+            # Acknowledge message (success)
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            metrics.JOBS_TOTAL.labels('completed').inc()
+            logger.info(f"✅ Job completed: {job.get('mediaId')}")
+            return
+        
+        headers = properties.headers or {}
+        defer_count = headers.get('x-defer-count', 0)
+        if isinstance(error, JobDeferred) and defer_count < config.MEMORY_MAX_DEFERRALS:
+            # Back of the line until memory frees up; the retry budget is untouched
+            delay_ms = config.MEMORY_DEFER_DELAY * 1000
+            logger.warning(f"⏳ Deferring job for {delay_ms / 1000:g}s: {str(error)}")
+            queue = retry_queue_name(delay_ms)
+            self._declare_once(ch, queue, retry_queue_arguments(delay_ms))
+            ch.basic_publish(
+                exchange='',
+                routing_key=queue,
+                body=body,
+                properties=pika.BasicProperties(
+                    delivery_mode=2,  # Persistent
+                    headers={**headers, 'x-defer-count': defer_count + 1},
+                    timestamp=properties.timestamp
+                )
+            )
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            metrics.JOBS_TOTAL.labels('deferred').inc()
+            return
+        
+        if isinstance(error, JobInterrupted) and config.JOB_CRASH_LIMIT > 0:
+            # Redelivered like after a single-process crash: the next attempt
+            # counts it in job_attempts and poisons the job at JOB_CRASH_LIMIT
+            logger.warning(f"♻️  Job interrupted, returning it to the queue: {str(error)}")
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            metrics.JOBS_TOTAL.labels('requeued').inc()
+            return
+        
+        logger.error(f"❌ Job failed: {str(error)}")
+        
+        # Retry logic (never for poisoned jobs: another attempt would do the same damage)
+        if retry_count < config.MAX_RETRIES and not isinstance(error, JobPoisoned):
+            delay_ms = retry_delay_ms(retry_count)
+            logger.warning(
+                f"🔄 Retrying job in {delay_ms / 1000:g}s (attempt {retry_count + 1}/{config.MAX_RETRIES})"
+            )
+            
+            # Park in a TTL queue instead of sleeping: the broker delivers it
+            # back to the transcription queue once the delay has passed
+            queue = retry_queue_name(delay_ms)
+            self._declare_once(ch, queue, retry_queue_arguments(delay_ms))
+            
+            # Requeue with incremented retry count
+            new_headers = properties.headers or {}
+            new_headers['x-retry-count'] = retry_count + 1
+            
+            ch.basic_publish(
+                exchange='',
+                routing_key=queue,
+                body=body,
+                properties=pika.BasicProperties(
+                    delivery_mode=2,  # Persistent
+                    headers=new_headers,
+                    timestamp=properties.timestamp
+                )
+            )
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            metrics.JOBS_TOTAL.labels('retried').inc()
+        else:
+            # Max retries reached - send to dead-letter queue
+            logger.error(f"💀 {'Poisoned job' if isinstance(error, JobPoisoned) else 'Max retries reached'}, sending to DLQ")
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            metrics.JOBS_TOTAL.labels('dead_lettered').inc()
+    
+    def _start_consuming(self, consumers: List[Tuple[str, int, Callable]]):
+        """
+        Register (queue, prefetch, callback) consumers and block
+        
+        basic.qos is per consumer (global=False), so each queue gets its
+        own in-flight limit on the shared channel.
+        """
+        if config.MODEL_UPGRADE_ENABLED:
+            self._declare_once(self.channel, upgrade_queue_name())
+            consumers = consumers + [(upgrade_queue_name(), 1, self._feed_upgrade)]
+        
+        for queue, prefetch, callback in consumers:
+            logger.info(f"🎧 Listening for jobs on queue: {queue} (prefetch {prefetch})")
+            self.channel.basic_qos(prefetch_count=prefetch)
+            self.channel.basic_consume(
+                queue=queue,
+                on_message_callback=callback,
+                auto_ack=False
+            )
+        
+        try:
+            self.channel.start_consuming()
+        except KeyboardInterrupt:
+            logger.info("🛑 Stopping consumer...")
+            self.channel.stop_consuming()
+            # The worker's stop() still has to drain and release running jobs
+            raise
+    
     def consume(self, handler: Callable[[Dict], None]):
         """
         Start consuming jobs from queue
         
+        The handler runs on a worker thread so the connection thread keeps
+        servicing heartbeats during long transcriptions.
+        
         Args:
             handler: Callback function to process each job
         """
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='job')
+        self.consume_concurrent(lambda job: self.executor.submit(handler, job))
+    
+    def consume_concurrent(self, submit: Callable[[Dict], Future]):
+        """
+        Start consuming jobs, handing each one off without blocking the consumer
+        
+        Up to `prefetch_count` jobs are in flight at once. Each job is acked
+        (or retried) on the connection thread once its future resolves.
+        
+        Args:
+            submit: Schedules a job and returns a Future for its completion
+        """
+        self._start_consuming([
+            (config.RABBITMQ_QUEUE, self.prefetch_count, self._dispatcher(submit))
+        ])
+    
+    def consume_lanes(self, route: Callable[[Dict], str], submit: Callable[[Dict, str], Future], prefetch: Dict[str, int]):
+        """
+        Route ingress jobs onto lane queues and consume each lane separately
+        
+        The transcription queue becomes an ingress: each job is assigned a
+        lane by `route` and republished onto that lane's queue. Each lane is
+        consumed with its own prefetch, so a backlog of long jobs never holds
+        the unacked window that short jobs need. Retries dead-letter back to
+        the ingress and are routed again.
+        
+        Args:
+            route: Returns the lane name for a job
+            submit: Schedules a job on a lane and returns a Future for its completion
+            prefetch: Unacked jobs allowed per lane
+        """
+        self.declare_lanes(prefetch)
+        
+        # `route` may hit the database; one thread keeps ingress order
+        self.route_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='route')
+        
+        def publish(ch, method, properties, body, job, retry_count, lane):
+            """Republish an ingress message onto its lane (on the connection thread)"""
+            try:
+                ch.basic_publish(
+                    exchange='',
+                    routing_key=lane_queue_name(lane),
+                    body=body,
+                    properties=pika.BasicProperties(
+                        delivery_mode=2,  # Persistent
+                        headers=properties.headers,
+                        timestamp=properties.timestamp
+                    )
+                )
+            except Exception as e:
+                self._settle(ch, method, properties, body, job, retry_count, e)
+                return
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            logger.info(f"🔀 Routed {job.get('mediaId')} to {lane} lane")
+        
+        def on_routed(ch, method, properties, body, job, retry_count, future: Future):
+            """Hop back onto the connection thread to publish (or settle a routing failure)"""
+            if future.cancelled():
+                return  # Shutting down: the broker redelivers unacked messages
+            error = future.exception()
+            if error is None:
+                callback = functools.partial(publish, ch, method, properties, body, job, retry_count, future.result())
+            else:
+                callback = functools.partial(self._settle, ch, method, properties, body, job, retry_count, error)
+            self.connection.add_callback_threadsafe(callback)
+        
+        def router(ch, method, properties, body):
+            """Route an ingress message without blocking the connection thread"""
+            job, retry_count = None, 0
+            try:
+                job, retry_count = self._parse(properties, body, observe=False)
+                future = self.route_executor.submit(route, job)
+            except Exception as e:
+                self._settle(ch, method, properties, body, job, retry_count, e)
+                return
+            future.add_done_callback(
+                functools.partial(on_routed, ch, method, properties, body, job, retry_count)
+            )
+        
+        consumers = [(config.RABBITMQ_QUEUE, self.prefetch_count, router)]
+        for lane, count in prefetch.items():
+            consumers.append((
+                lane_queue_name(lane),
+                count,
+                self._dispatcher(functools.partial(lambda lane, job: submit(job, lane), lane))
+            ))
+        self._start_consuming(consumers)
+    
+    def _dispatcher(self, submit: Callable[[Dict], Future]) -> Callable:
+        """Build a message callback that hands jobs to `submit` and settles on completion"""
+        def on_done(ch, method, properties, body, job, retry_count, future: Future):
+            """Hop back onto the connection thread to settle the message"""
+            if future.cancelled():
+                # Never ran (shutting down): hand it back untouched
+                self.connection.add_callback_threadsafe(
+                    functools.partial(ch.basic_nack, delivery_tag=method.delivery_tag, requeue=True)
+                )
+                return
+            error = future.exception()
+            follow_up = future.result() if error is None else None
+            self.connection.add_callback_threadsafe(
+                functools.partial(self._settle, ch, method, properties, body, job, retry_count, error, follow_up)
+            )
+        
         def callback(ch, method, properties, body):
-            """Process incoming message"""
+            """Dispatch incoming message"""
+            job, retry_count = None, 0
             try:
-                # Parse job
-                job = json.loads(body)
-                logger.info(f"📥 Received job: {job.get('mediaId')} ({job.get('operation')})")
-                
-                # Get retry count from headers
-                retry_count = 0
-                if properties.headers:
-                    retry_count = properties.headers.get('x-retry-count', 0)
-                
-                # Process job
-                handler(job)
-                
-                # Acknowledge message (success)
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-                logger.info(f"✅ Job completed: {job.get('mediaId')}")
-                
+                job, retry_count = self._parse(properties, body)
+                if config.ADAPTIVE_MODELS_ENABLED:
+                    # Stamp the backlog for the model policy (pool children can't ask the broker)
+                    job['queueDepth'] = self.queue_depth()
+                future = submit(job)
             except Exception as e:
-                logger.error(f"❌ Job failed: {str(e)}")
-                
-                # Retry logic
-                if retry_count < config.MAX_RETRIES:
-                    logger.warning(f"🔄 Retrying job (attempt {retry_count + 1}/{config.MAX_RETRIES})")
-                    
-                    # Wait before retry
-                    time.sleep(config.RETRY_DELAY)
-                    
-                    # Requeue with incremented retry count
-                    new_headers = properties.headers or {}
-                    new_headers['x-retry-count'] = retry_count + 1
-                    
-                    ch.basic_publish(
-                        exchange='',
-                        routing_key=config.RABBITMQ_QUEUE,
-                        body=body,
-                        properties=pika.BasicProperties(
-                            delivery_mode=2,  # Persistent
-                            headers=new_headers
-                        )
-                    )
-                    ch.basic_ack(delivery_tag=method.delivery_tag)
-                else:
-                    # Max retries reached - send to dead-letter queue
-                    logger.error(f"💀 Max retries reached, sending to DLQ")
-                    ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-        
-        # Start consuming
-        logger.info(f"🎧 Listening for jobs on queue: {config.RABBITMQ_QUEUE}")
-        self.channel.basic_consume(
-            queue=config.RABBITMQ_QUEUE,
-            on_message_callback=callback,
-            auto_ack=False
-        )
+                self._settle(ch, method, properties, body, job, retry_count, e)
+                return
+            
+            future.add_done_callback(
+                functools.partial(on_done, ch, method, properties, body, job, retry_count)
+            )
         
-        try:
-            self.channel.start_consuming()
-        except KeyboardInterrupt:
-            logger.info("🛑 Stopping consumer...")
-            self.channel.stop_consuming()
+        return callback
@@ -0,0 +1,36 @@
+"""
+Readiness signalling for container health checks
+
+The worker touches READY_FILE once the model is loaded and warmed up and
+the queue is connected, and removes it on shutdown. The Dockerfile
+HEALTHCHECK only tests for the file, so a replica reports healthy exactly
+when it can take jobs.
+"""
+import os
+import time
+from logger import logger
+import config
+
+def mark_ready() -> None:
+    """Write READY_FILE (atomic rename, so checks never see a partial file)"""
+    if not config.READY_FILE:
+        return
+    try:
+        tmp_path = f"{config.READY_FILE}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(f"{os.getpid()} {time.time():.0f}\n")
+        os.replace(tmp_path, config.READY_FILE)
+        logger.info(f"🟢 Ready ({config.READY_FILE})")
+    except Exception as e:
+        logger.warning(f"⚠️  Failed to write ready file: {str(e)}")
+
+def mark_not_ready() -> None:
+    """Remove READY_FILE (also clears a stale file left by a crashed process)"""
+    if not config.READY_FILE:
+        return
+    try:
+        os.remove(config.READY_FILE)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"⚠️  Failed to remove ready file: {str(e)}")
@@ -2,11 +2,20 @@
 S3 Service for downloading audio files
 """
 import os
+import time
 import boto3
+import numpy as np
+from typing import Optional, Tuple
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
 from logger import logger
+from audio_utils import decode_stream, duration_of
+from audio_cache import AudioCache
+import metrics
 import config
 
+STREAM_CHUNK_SIZE = 1024 * 1024  # bytes per read from the S3 body
+
 class S3Service:
     def __init__(self):
         """Initialize S3 client"""
@@ -19,7 +28,20 @@ class S3Service:
             config=Config(signature_version='s3v4')
         )
         self.bucket = config.S3_BUCKET
+        
+        # Large objects are fetched as concurrent ranged GETs
+        self.transfer_config = TransferConfig(
+            multipart_threshold=config.S3_MULTIPART_CHUNK_SIZE,
+            multipart_chunksize=config.S3_MULTIPART_CHUNK_SIZE,
+            max_concurrency=config.S3_MULTIPART_CONCURRENCY,
+            use_threads=True
+        )
         logger.info(f"✅ S3 client initialized (endpoint: {config.S3_ENDPOINT})")
+        
+        # Optional: audio shared on disk with the other worker processes on this host
+        self.audio_cache = None
+        if config.AUDIO_CACHE_DIR:
+            self.audio_cache = AudioCache(config.AUDIO_CACHE_DIR, config.AUDIO_CACHE_MAX_MB * 1024 * 1024)
     
     def download_file(self, s3_key: str, local_path: str) -> None:
         """
@@ -30,21 +52,103 @@ class S3Service:
             local_path: Local file path to save to
         """
         try:
-            logger.info(f"📥 Downloading from S3: {s3_key} → {local_path}")
+            if self.audio_cache:
+                head = self._head(s3_key)
+                if head:
+                    etag, size = head
+                    if self.audio_cache.fetch(etag, size, local_path, lambda path: self._download(s3_key, path)):
+                        logger.info(f"♻️  Audio cache hit: {s3_key} → {local_path}")
+                    return
             
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            self._download(s3_key, local_path)
             
-            # Download file
-            self.s3_client.download_file(self.bucket, s3_key, local_path)
+        except Exception as e:
+            logger.error(f"❌ Failed to download from S3: {str(e)}")
+            raise
+    
+    def _download(self, s3_key: str, local_path: str) -> None:
+        """Download an object to a local path (no cache)"""
+        logger.info(f"📥 Downloading from S3: {s3_key} → {local_path}")
+        
+        # Ensure directory exists
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        
+        # Download file
+        start_time = time.time()
+        self.s3_client.download_file(
+            self.bucket, s3_key, local_path, Config=self.transfer_config
+        )
+        
+        file_size = os.path.getsize(local_path)
+        metrics.S3_DOWNLOAD_SECONDS.labels('file').observe(time.time() - start_time)
+        metrics.S3_DOWNLOAD_BYTES.labels('file').observe(file_size)
+        logger.info(f"✅ Downloaded {file_size} bytes from S3")
+    
+    def _head(self, s3_key: str) -> Optional[Tuple[str, int]]:
+        """(ETag-size version key, size) of an object, or None if S3 reports no ETag"""
+        response = self.s3_client.head_object(Bucket=self.bucket, Key=s3_key)
+        etag = response.get('ETag', '').strip('"')
+        if not etag:
+            return None
+        return f"{etag}-{response['ContentLength']}", response['ContentLength']
+    
+    def download_pcm(self, s3_key: str) -> np.ndarray:
+        """
+        Stream an S3 object through ffmpeg straight into memory
+        
+        Args:
+            s3_key: S3 object key
             
-            file_size = os.path.getsize(local_path)
-            logger.info(f"✅ Downloaded {file_size} bytes from S3")
+        Returns:
+            float32 mono PCM at 16 kHz, ready for Whisper
+        """
+        try:
+            if self.audio_cache:
+                audio = self._decode_cached(s3_key)
+                if audio is not None:
+                    return audio
+            
+            logger.info(f"📥 Streaming from S3: {s3_key} → memory")
+            
+            # Download and decode overlap, so this is observed as both
+            start_time = time.time()
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=s3_key)
+            audio = decode_stream(response['Body'].iter_chunks(chunk_size=STREAM_CHUNK_SIZE))
+            metrics.S3_DOWNLOAD_SECONDS.labels('stream').observe(time.time() - start_time)
+            metrics.S3_DOWNLOAD_BYTES.labels('stream').observe(response['ContentLength'])
+            
+            logger.info(
+                f"✅ Decoded {response['ContentLength']} bytes from S3 "
+                f"({duration_of(audio):.1f}s of audio)"
+            )
+            return audio
             
         except Exception as e:
-            logger.error(f"❌ Failed to download from S3: {str(e)}")
+            logger.error(f"❌ Failed to stream from S3: {str(e)}")
             raise
     
+    def _decode_cached(self, s3_key: str) -> Optional[np.ndarray]:
+        """
+        Decode an object from the host audio cache (filling it on a miss)
+        
+        Returns:
+            PCM, or None if S3 reports no ETag or the entry was evicted under us
+        """
+        head = self._head(s3_key)
+        if not head:
+            return None
+        etag, size = head
+        entry = self.audio_cache.entry(etag, size, lambda path: self._download(s3_key, path))
+        try:
+            # An open handle keeps the data readable even if the entry is evicted meanwhile
+            f = open(entry, 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            audio = decode_stream(iter(lambda: f.read(STREAM_CHUNK_SIZE), b''))
+        logger.info(f"✅ Decoded {size} bytes from the audio cache ({duration_of(audio):.1f}s of audio)")
+        return audio
+    
     def file_exists(self, s3_key: str) -> bool:
         """
         Check if a file exists in S3
@@ -60,3 +164,20 @@ class S3Service:
             return True
         except:
             return False
+    
+    def get_etag(self, s3_key: str) -> Optional[str]:
+        """
+        Get an object's ETag (content fingerprint) without downloading it
+        
+        Args:
+            s3_key: S3 object key
+            
+        Returns:
+            ETag without quotes, or None if unavailable
+        """
+        try:
+            head = self._head(s3_key)
+            return head[0] if head else None
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to read ETag for {s3_key}: {str(e)}")
+            return None
@@ -0,0 +1,138 @@
+"""
+Duration-aware scheduling of transcription jobs across priority lanes
+"""
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+from logger import logger
+import config
+
+LANE_SHORT = 'short'
+LANE_LONG = 'long'
+LANES = (LANE_SHORT, LANE_LONG)
+
+def choose_lane(media: Optional[Dict]) -> str:
+    """
+    Pick a lane from the media record's duration
+
+    Media with an unknown duration go to the long lane so they can never
+    crowd out the slots reserved for short clips. Missing media go to the
+    short lane: they fail fast.
+    """
+    if not media:
+        return LANE_SHORT
+    duration = media.get('duration')
+    if duration is None:
+        return LANE_LONG
+    return LANE_SHORT if float(duration) <= config.SHORT_JOB_MAX_DURATION else LANE_LONG
+
+def long_slot_limit(slots: int) -> int:
+    """Slots long jobs may occupy, leaving SHORT_RESERVED_SLOTS for short jobs"""
+    return max(1, slots - config.SHORT_RESERVED_SLOTS)
+
+class LaneScheduler:
+    """
+    Runs jobs on a fixed number of slots, short lane first
+
+    Each slot is a thread that calls `runner(job)` and blocks until it
+    returns; in pool mode the runner waits on a child process. Free slots
+    always take a queued short job before a long one, and at most
+    `long_slots` slots run long jobs at once, so short clips keep moving
+    while long recordings are being transcribed.
+    """
+
+    def __init__(self, runner: Callable[[Dict], Optional[Dict]], slots: int, long_slots: Optional[int] = None):
+        """
+        Initialize scheduler
+
+        Args:
+            runner: Processes one job, raising on failure (its return value resolves the job's future)
+            slots: Jobs run concurrently
+            long_slots: Concurrent long jobs (defaults to long_slot_limit(slots))
+        """
+        self.runner = runner
+        self.slots = slots
+        self.long_slots = long_slots or long_slot_limit(slots)
+        self._queues = {lane: deque() for lane in LANES}
+        self._running_long = 0
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._threads = [
+            threading.Thread(target=self._loop, name=f'slot-{i}', daemon=True)
+            for i in range(slots)
+        ]
+
+    def start(self):
+        """Start slot threads"""
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"✅ Lane scheduler started ({self.slots} slots, {self.long_slots} for long jobs)")
+
+    def submit(self, job: Dict, lane: str) -> Future:
+        """
+        Queue a job on a lane
+
+        Args:
+            job: Job payload
+            lane: LANE_SHORT or LANE_LONG
+
+        Returns:
+            Future resolved when the job finishes
+        """
+        future = Future()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Scheduler is shut down")
+            self._queues[lane].append((job, future))
+            self._cond.notify()
+        return future
+
+    def _take(self):
+        """Block until a job may run; returns (job, lane, future) or None on shutdown"""
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                if self._queues[LANE_SHORT]:
+                    job, future = self._queues[LANE_SHORT].popleft()
+                    return job, LANE_SHORT, future
+                if self._queues[LANE_LONG] and self._running_long < self.long_slots:
+                    job, future = self._queues[LANE_LONG].popleft()
+                    self._running_long += 1
+                    return job, LANE_LONG, future
+                self._cond.wait()
+
+    def _loop(self):
+        """Slot thread: run jobs until shutdown"""
+        while True:
+            item = self._take()
+            if item is None:
+                return
+            job, lane, future = item
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = self.runner(job)
+                    except BaseException as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+            finally:
+                if lane == LANE_LONG:
+                    with self._cond:
+                        self._running_long -= 1
+                        self._cond.notify_all()
+
+    def shutdown(self, wait: bool = True):
+        """Stop slot threads, cancelling jobs that have not started"""
+        with self._cond:
+            self._stopped = True
+            for queue in self._queues.values():
+                while queue:
+                    queue.popleft()[1].cancel()
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                if thread.is_alive():
+                    thread.join()
@@ -0,0 +1,278 @@
+"""
+Compact binary encoding for transcript segments
+
+Segments are stored column-wise instead of as a JSON array of objects:
+timestamps become integer milliseconds, text is one UTF-8 blob indexed by
+an offsets table, token IDs are LEB128 varints, and the payload is
+compressed with zstd (or zlib when `zstandard` isn't installed).
+
+Layout (all integers little-endian):
+
+    header (12 bytes, never compressed)
+        magic       4s   b'SSEG'
+        version     u8   1
+        codec       u8   0 = none, 1 = zlib, 2 = zstd (applies to the payload)
+        fields      u16  bit 0 confidence, bit 1 tokens, bit 2 stats, bit 3 words
+        count       u32  number of segments (n)
+
+    payload
+        start_ms        n x u32
+        end_ms          n x u32
+        confidence      n x u16     (fields bit 0) confidence * 65535, rounded
+        text_offsets    (n+1) x u32 byte offsets into the text blob
+        token_offsets   (n+1) x u32 (fields bit 1) byte offsets into the token blob
+        text            UTF-8, segment i = text[text_offsets[i]:text_offsets[i+1]]
+        tokens          (fields bit 1) LEB128 varints, segment i's bytes between
+                        token_offsets[i] and token_offsets[i+1]
+        avg_logprob     (fields bit 2) n x f32
+        no_speech_prob  (fields bit 2) n x u16  probability * 65535, rounded
+        word_offsets    (fields bit 3) (n+1) x u32 segment i's words are
+                        word_offsets[i] to word_offsets[i+1] (w words in all)
+        word_start_ms   (fields bit 3) w x u32
+        word_end_ms     (fields bit 3) w x u32
+        word_prob       (fields bit 3) w x u16
+        word_text_offsets (fields bit 3) (w+1) x u32
+        word_text       (fields bit 3) UTF-8
+
+Sections are only ever appended, so an older decoder reads a newer blob's
+sections it knows and ignores the rest.
+
+Decoding returns segment dicts with float-second start/end, text, and the
+optional confidence / tokens / avg_logprob / no_speech_prob / words (the
+post-processor's parallel arrays). Timestamps round-trip to the
+millisecond and probabilities to 1/65535.
+"""
+import struct
+import zlib
+from typing import Dict, List, Tuple
+import numpy as np
+
+MAGIC = b'SSEG'
+VERSION = 1
+HEADER = struct.Struct('<4sBBHI')
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+FIELD_CONFIDENCE = 1 << 0
+FIELD_TOKENS = 1 << 1
+FIELD_STATS = 1 << 2
+FIELD_WORDS = 1 << 3
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency
+    zstandard = None
+
+def _compress(payload: bytes):
+    """Compress with zstd if available, else zlib; returns (codec, data)"""
+    if zstandard is not None:
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=3).compress(payload)
+    return CODEC_ZLIB, zlib.compress(payload, 1)
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_NONE:
+        return data
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Packed segments use zstd but the 'zstandard' package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown segment codec: {codec}")
+
+def encode_varints(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """LEB128-encode non-negative integers (vectorized); returns (bytes, bytes per value)"""
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = np.ones(len(values), dtype=np.int64)
+    for bits in (7, 14, 21, 28, 35, 42, 49, 56, 63):
+        sizes += values >= (np.uint64(1) << np.uint64(bits))
+
+    out = np.zeros(int(sizes.sum()), dtype=np.uint8)
+    positions = np.cumsum(sizes) - sizes
+    for k in range(int(sizes.max()) if len(sizes) else 0):
+        mask = sizes > k
+        byte = (values[mask] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (sizes[mask] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[positions[mask] + k] = (byte | more).astype(np.uint8)
+    return out, sizes
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """Decode a buffer of LEB128 varints (vectorized)"""
+    data = np.asarray(data, dtype=np.uint8)
+    if not len(data):
+        return np.zeros(0, dtype=np.int64)
+    last = np.flatnonzero((data & 0x80) == 0)
+    starts = np.concatenate(([0], last[:-1] + 1))
+    group = np.repeat(np.arange(len(starts)), last - starts + 1)
+    shift = (np.arange(len(data)) - starts[group]).astype(np.uint64) * np.uint64(7)
+    parts = (data & 0x7F).astype(np.uint64) << shift
+    return np.add.reduceat(parts, starts).astype(np.int64)
+
+def _ms(seconds) -> np.ndarray:
+    return np.rint(np.asarray(seconds, dtype=np.float64) * 1000).astype('<u4')
+
+def _unit(values) -> np.ndarray:
+    """Probabilities 0-1 as u16"""
+    return np.rint(np.clip(np.asarray(values, dtype=np.float64), 0.0, 1.0) * 65535).astype('<u2')
+
+def _text_section(texts: List[str]) -> Tuple[bytes, bytes]:
+    """(offsets, blob) for a list of strings"""
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum([len(text) for text in encoded])
+    return offsets.tobytes(), b''.join(encoded)
+
+def encode(segments: List[Dict]) -> bytes:
+    """
+    Pack segments into the binary layout above
+
+    Args:
+        segments: Dicts with start, end (seconds), text, and optionally
+            confidence, tokens and avg_logprob + no_speech_prob (present on
+            every segment or ignored) and words (any segment)
+
+    Returns:
+        Packed bytes (header + compressed payload)
+    """
+    count = len(segments)
+    fields = 0
+    if count and all('confidence' in segment for segment in segments):
+        fields |= FIELD_CONFIDENCE
+    if count and all(segment.get('tokens') is not None for segment in segments):
+        fields |= FIELD_TOKENS
+    if count and all('avg_logprob' in segment and 'no_speech_prob' in segment for segment in segments):
+        fields |= FIELD_STATS
+    if any(segment.get('words') for segment in segments):
+        fields |= FIELD_WORDS
+
+    parts = [
+        _ms([segment['start'] for segment in segments]).tobytes(),
+        _ms([segment['end'] for segment in segments]).tobytes()
+    ]
+
+    if fields & FIELD_CONFIDENCE:
+        parts.append(_unit([segment['confidence'] for segment in segments]).tobytes())
+
+    text_offsets, text_blob = _text_section([segment['text'] for segment in segments])
+    parts.append(text_offsets)
+
+    if fields & FIELD_TOKENS:
+        lengths = [len(segment['tokens']) for segment in segments]
+        token_bytes, sizes = encode_varints(np.concatenate([segment['tokens'] for segment in segments] + [[]]))
+        # Byte length of each segment's varints = sum of its values' sizes
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        size_sums = np.concatenate(([0], np.cumsum(sizes)))
+        token_offsets = size_sums[bounds].astype('<u4')
+        parts.append(token_offsets.tobytes())
+
+    parts.append(text_blob)
+    if fields & FIELD_TOKENS:
+        parts.append(token_bytes.tobytes())
+
+    if fields & FIELD_STATS:
+        parts.append(np.array([segment['avg_logprob'] for segment in segments], dtype='<f4').tobytes())
+        parts.append(_unit([segment['no_speech_prob'] for segment in segments]).tobytes())
+
+    if fields & FIELD_WORDS:
+        words = [segment.get('words') or {'text': [], 'start': [], 'end': [], 'probability': []} for segment in segments]
+        word_offsets = np.zeros(count + 1, dtype='<u4')
+        word_offsets[1:] = np.cumsum([len(w['text']) for w in words])
+        word_text_offsets, word_text = _text_section([text for w in words for text in w['text']])
+        parts += [
+            word_offsets.tobytes(),
+            _ms([t for w in words for t in w['start']]).tobytes(),
+            _ms([t for w in words for t in w['end']]).tobytes(),
+            _unit([p for w in words for p in w['probability']]).tobytes(),
+            word_text_offsets,
+            word_text
+        ]
+
+    codec, payload = _compress(b''.join(parts))
+    return HEADER.pack(MAGIC, VERSION, codec, fields, count) + payload
+
+def decode(data: bytes) -> List[Dict]:
+    """
+    Unpack bytes produced by encode()
+
+    Returns:
+        Segment dicts: start, end (float seconds), text, plus confidence /
+        tokens / avg_logprob / no_speech_prob / words when they were encoded
+    """
+    magic, version, codec, fields, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a packed segment blob")
+    if version != VERSION:
+        raise ValueError(f"Unsupported packed segment version: {version}")
+
+    payload = memoryview(_decompress(codec, bytes(data[HEADER.size:])))
+    offset = 0
+
+    def take(dtype: str, n: int) -> np.ndarray:
+        nonlocal offset
+        array = np.frombuffer(payload, dtype=dtype, count=n, offset=offset)
+        offset += array.nbytes
+        return array
+
+    start = take('<u4', count) / 1000.0
+    end = take('<u4', count) / 1000.0
+    confidence = take('<u2', count) / 65535.0 if fields & FIELD_CONFIDENCE else None
+    text_offsets = take('<u4', count + 1)
+    token_offsets = take('<u4', count + 1) if fields & FIELD_TOKENS else None
+
+    text_blob = bytes(payload[offset:offset + int(text_offsets[-1])])
+    offset += int(text_offsets[-1])
+
+    tokens, token_bounds = None, None
+    if token_offsets is not None:
+        token_blob = np.frombuffer(payload, dtype=np.uint8, count=int(token_offsets[-1]), offset=offset)
+        tokens = decode_varints(token_blob)
+        # Varints end where the high bit is clear: count them per segment to find value bounds
+        ends = np.concatenate(([0], np.cumsum((token_blob & 0x80) == 0)))
+        token_bounds = ends[token_offsets.astype(np.int64)]
+        offset += int(token_offsets[-1])
+
+    avg_logprob, no_speech = None, None
+    if fields & FIELD_STATS:
+        avg_logprob = take('<f4', count)
+        no_speech = take('<u2', count) / 65535.0
+
+    word_offsets = None
+    if fields & FIELD_WORDS:
+        word_offsets = take('<u4', count + 1).astype(np.int64)
+        total = int(word_offsets[-1])
+        word_start = (take('<u4', total) / 1000.0).tolist()
+        word_end = (take('<u4', total) / 1000.0).tolist()
+        word_prob = np.round(take('<u2', total) / 65535.0, 3).tolist()
+        word_text_offsets = take('<u4', total + 1)
+        word_blob = bytes(payload[offset:offset + int(word_text_offsets[-1])])
+        word_text = [
+            word_blob[a:b].decode('utf-8')
+            for a, b in zip(word_text_offsets[:-1].tolist(), word_text_offsets[1:].tolist())
+        ]
+
+    segments = []
+    for i in range(count):
+        segment = {
+            'start': float(start[i]),
+            'end': float(end[i]),
+            'text': text_blob[text_offsets[i]:text_offsets[i + 1]].decode('utf-8')
+        }
+        if confidence is not None:
+            segment['confidence'] = round(float(confidence[i]), 4)
+        if tokens is not None:
+            segment['tokens'] = tokens[token_bounds[i]:token_bounds[i + 1]].tolist()
+        if avg_logprob is not None:
+            segment['avg_logprob'] = round(float(avg_logprob[i]), 4)
+            segment['no_speech_prob'] = round(float(no_speech[i]), 4)
+        if word_offsets is not None and word_offsets[i + 1] > word_offsets[i]:
+            a, b = int(word_offsets[i]), int(word_offsets[i + 1])
+            segment['words'] = {
+                'text': word_text[a:b],
+                'start': word_start[a:b],
+                'end': word_end[a:b],
+                'probability': word_prob[a:b]
+            }
+        segments.append(segment)
+    return segments
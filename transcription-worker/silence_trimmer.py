@@ -0,0 +1,135 @@
+"""
+Speech-aware preprocessing: cut long non-speech runs out of the audio before inference
+"""
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from logger import logger
+from audio_utils import SAMPLE_RATE, frame_levels, frame_zero_crossings, silence_runs
+from transcript_postprocessor import remap_times
+import metrics
+import config
+
+FRAME_MS = 30
+UNVOICED_RANGE_DB = 15.0  # How far below SILENCE_TRIM_DB a high-ZCR frame still counts as speech
+
+class OffsetMap:
+    """
+    Maps times in trimmed audio back to the original media timeline
+
+    The trimmed audio is the kept regions laid end to end; region i starts
+    at trimmed_starts[i] in the trimmed audio and original_starts[i] in the
+    original, and lasts lengths[i] seconds.
+    """
+
+    def __init__(self, regions: List[Tuple[int, int]], original_samples: int):
+        """
+        Initialize map
+
+        Args:
+            regions: Kept (start_sample, end_sample) ranges of the original audio, in order
+            original_samples: Length of the original audio in samples
+        """
+        bounds = np.array(regions, dtype=np.int64).reshape(-1, 2)
+        lengths = bounds[:, 1] - bounds[:, 0]
+        self.original_starts = bounds[:, 0] / SAMPLE_RATE
+        self.lengths = lengths / SAMPLE_RATE
+        self.trimmed_starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) / SAMPLE_RATE
+        self.original_duration = original_samples / SAMPLE_RATE
+
+    def to_original(self, times: np.ndarray, ends: bool = False) -> np.ndarray:
+        """
+        Map trimmed-audio times to original times
+
+        Args:
+            times: Seconds in the trimmed audio
+            ends: Times are segment ends (a time on a region boundary maps to
+                the end of the earlier region, not the start of the next)
+
+        Returns:
+            Seconds in the original audio
+        """
+        times = np.asarray(times, dtype=np.float64)
+        side = 'left' if ends else 'right'
+        idx = np.clip(np.searchsorted(self.trimmed_starts, times, side=side) - 1, 0, len(self.trimmed_starts) - 1)
+        within = np.clip(times - self.trimmed_starts[idx], 0.0, self.lengths[idx])
+        return self.original_starts[idx] + within
+
+    def remap_segments(self, segments: List[Dict]) -> List[Dict]:
+        """Copies of segments with start/end (and word timings) on the original timeline"""
+        return remap_times(segments, self.to_original, lambda times: self.to_original(times, ends=True))
+
+    def remap_result(self, result: Dict) -> Dict:
+        """Copy of a transcript dict with its segments on the original timeline"""
+        return {**result, 'segments': self.remap_segments(result['segments'])}
+
+def speech_frames(audio: np.ndarray, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """
+    Energy/zero-crossing VAD
+
+    A frame is speech if it is louder than SILENCE_TRIM_DB, or if it is
+    within UNVOICED_RANGE_DB below that and crosses zero at least
+    SILENCE_TRIM_ZCR of the time (quiet unvoiced consonants like "s" and
+    "f" are noisy, while hum and room tone are not).
+
+    Returns:
+        Boolean mask, one per frame (trailing partial frame dropped)
+    """
+    levels = frame_levels(audio, frame_ms)
+    zcr = frame_zero_crossings(audio, frame_ms)
+    unvoiced = (levels >= config.SILENCE_TRIM_DB - UNVOICED_RANGE_DB) & (zcr >= config.SILENCE_TRIM_ZCR)
+    return (levels >= config.SILENCE_TRIM_DB) | unvoiced
+
+def trim_silence(audio: np.ndarray) -> Tuple[np.ndarray, Optional[OffsetMap]]:
+    """
+    Remove non-speech runs of at least SILENCE_TRIM_MIN_GAP seconds
+
+    SILENCE_TRIM_PADDING seconds of each run are kept next to the speech on
+    either side, so words aren't clipped and Whisper still sees a pause.
+    Audio with no detected speech is cut to its first second rather than
+    dropped, so the backends always get input.
+
+    Args:
+        audio: float32 PCM at SAMPLE_RATE
+
+    Returns:
+        (trimmed audio, offset map), or (audio, None) if nothing was cut
+    """
+    total = len(audio)
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    mask = speech_frames(audio)
+    n_frames = len(mask)
+    if not n_frames:
+        return audio, None
+
+    if not mask.any():
+        regions = [(0, min(total, SAMPLE_RATE))]
+    else:
+        runs = silence_runs(~mask)
+        min_frames = max(1, int(config.SILENCE_TRIM_MIN_GAP * 1000 / FRAME_MS))
+        runs = runs[(runs[:, 1] - runs[:, 0]) >= min_frames]
+        if not len(runs):
+            return audio, None
+
+        padding = int(config.SILENCE_TRIM_PADDING * SAMPLE_RATE)
+        # Leading/trailing runs are cut to the audio edge; inner runs keep padding on both sides
+        cut_starts = np.where(runs[:, 0] == 0, 0, runs[:, 0] * frame + padding)
+        cut_ends = np.where(runs[:, 1] == n_frames, total, runs[:, 1] * frame - padding)
+        valid = cut_ends > cut_starts
+        cut_starts, cut_ends = cut_starts[valid], cut_ends[valid]
+        if not len(cut_starts):
+            return audio, None
+
+        keep_starts = np.concatenate(([0], cut_ends))
+        keep_ends = np.concatenate((cut_starts, [total]))
+        keep = keep_ends > keep_starts
+        regions = list(zip(keep_starts[keep].tolist(), keep_ends[keep].tolist()))
+
+    trimmed = np.concatenate([audio[start:end] for start, end in regions])
+    removed = (total - len(trimmed)) / SAMPLE_RATE
+    metrics.TRIMMED_AUDIO_SECONDS.labels('kept').inc(len(trimmed) / SAMPLE_RATE)
+    metrics.TRIMMED_AUDIO_SECONDS.labels('removed').inc(removed)
+    logger.info(
+        f"✂️  Trimmed {removed:.1f}s of non-speech from {total / SAMPLE_RATE:.1f}s "
+        f"({removed / (total / SAMPLE_RATE) * 100:.0f}%, {len(regions)} regions kept)"
+    )
+    return trimmed, OffsetMap(regions, total)
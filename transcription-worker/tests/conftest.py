@@ -0,0 +1,7 @@
+"""
+Shared pytest setup: worker modules are imported from the parent directory
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
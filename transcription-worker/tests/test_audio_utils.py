@@ -0,0 +1,54 @@
+"""
+split_on_silence: chunk bounds for long-form jobs
+"""
+import numpy as np
+from audio_utils import SAMPLE_RATE, split_on_silence
+
+def tone(seconds: float) -> np.ndarray:
+    """Loud 440 Hz sine"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+def assert_covers(chunks, total):
+    """Chunks are contiguous and cover [0, total)"""
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == total
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+
+def test_short_audio_is_one_chunk():
+    audio = tone(5)
+    assert split_on_silence(audio, max_chunk=10) == [(0, len(audio))]
+
+def test_cuts_inside_silence():
+    audio = np.concatenate([tone(6), silence(1), tone(6)])
+    chunks = split_on_silence(audio, max_chunk=10)
+    assert len(chunks) == 2
+    assert_covers(chunks, len(audio))
+    cut = chunks[0][1] / SAMPLE_RATE
+    assert 6 <= cut <= 7
+
+def test_hard_cut_without_silence():
+    audio = tone(25)
+    chunks = split_on_silence(audio, max_chunk=10)
+    assert chunks == [(0, 10 * SAMPLE_RATE), (10 * SAMPLE_RATE, 20 * SAMPLE_RATE), (20 * SAMPLE_RATE, len(audio))]
+
+def test_short_silence_is_not_a_cut_point():
+    audio = np.concatenate([tone(6), silence(0.2), tone(6)])
+    chunks = split_on_silence(audio, max_chunk=10, min_silence=0.5)
+    assert chunks[0] == (0, 10 * SAMPLE_RATE)
+
+def test_chunks_never_exceed_max_chunk():
+    rng = np.random.default_rng(0)
+    parts = [tone(rng.uniform(1, 8)) if i % 2 == 0 else silence(rng.uniform(0.1, 2)) for i in range(30)]
+    audio = np.concatenate(parts)
+    chunks = split_on_silence(audio, max_chunk=12)
+    assert_covers(chunks, len(audio))
+    assert all(end - start <= 12 * SAMPLE_RATE for start, end in chunks)
+
+def test_split_is_deterministic():
+    audio = np.concatenate([tone(7), silence(1), tone(9), silence(0.8), tone(5)])
+    assert split_on_silence(audio, max_chunk=10) == split_on_silence(audio.copy(), max_chunk=10)
@@ -0,0 +1,76 @@
+"""
+DatabaseService checkouts: callers wait for a free connection instead of hitting PoolError
+"""
+import threading
+import pytest
+from psycopg2.pool import PoolError
+from database_service import DatabaseService
+import config
+
+class FakeConnection:
+    closed = False
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def cursor(self):
+        return FakeCursor()
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class FakePool:
+    """Raises like ThreadedConnectionPool when more than `size` connections are out"""
+
+    def __init__(self, size):
+        self.size = size
+        self.out = 0
+
+    def getconn(self):
+        if self.out >= self.size:
+            raise PoolError("connection pool exhausted")
+        self.out += 1
+        return FakeConnection()
+
+    def putconn(self, conn, close=False):
+        self.out -= 1
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(config, 'DATABASE_POOL_MAX', 2)
+    monkeypatch.setattr(config, 'DATABASE_CHECKOUT_TIMEOUT', 0.2)
+    # Every connection counts as recently used, so no health ping
+    monkeypatch.setattr(config, 'DATABASE_HEALTHCHECK_INTERVAL', float('inf'))
+    monkeypatch.setattr(DatabaseService, 'connect', lambda self: setattr(self, 'pool', FakePool(2)))
+    return DatabaseService()
+
+def test_checkout_waits_for_a_free_connection(db):
+    held = [db._checkout(), db._checkout()]
+    threading.Timer(0.05, lambda: db._checkin(held.pop())).start()
+    conn = db._checkout()
+    db._checkin(conn)
+    db._checkin(held.pop())
+    assert db.pool.out == 0
+
+def test_checkout_times_out_when_pool_stays_exhausted(db):
+    held = [db._checkout(), db._checkout()]
+    with pytest.raises(PoolError, match='DATABASE_POOL_MAX=2'):
+        db._checkout()
+    for conn in held:
+        db._checkin(conn)
+
+def test_transactions_return_their_slot_on_error(db):
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            with db._transaction():
+                raise ValueError("boom")
+    with db._transaction():
+        pass
+    assert db.pool.out == 0
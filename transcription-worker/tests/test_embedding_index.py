@@ -0,0 +1,68 @@
+"""
+EmbeddingIndex: append, search, re-index and recovery from an interrupted append
+"""
+import os
+import numpy as np
+import pytest
+from embedding_index import EmbeddingIndex, ROW_DTYPE
+
+WORDS = ['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot']
+
+class FakeEmbedder:
+    """One-hot vector per known word"""
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), len(WORDS)), dtype=np.float32)
+        for i, text in enumerate(texts):
+            vectors[i, WORDS.index(text.split()[0])] = 1.0
+        return vectors
+
+def segments(*texts):
+    return [{'start': float(i), 'end': float(i) + 0.5, 'text': text} for i, text in enumerate(texts)]
+
+@pytest.fixture
+def index(tmp_path):
+    return EmbeddingIndex(FakeEmbedder(), root=str(tmp_path))
+
+def test_search_finds_best_match(index):
+    index.add_media('p', 'm1', segments('alpha', 'bravo'))
+    index.add_media('p', 'm2', segments('charlie', 'delta'))
+    results = index.query('p', 'delta', k=1)
+    assert results == [('m2', 1.0, 1.5, 1.0)]
+
+def test_search_unknown_project_is_empty(index):
+    assert index.query('missing', 'alpha') == []
+
+def test_empty_segments_are_skipped(index):
+    assert index.add_media('p', 'm1', segments('', '')) == 0
+    assert index.query('p', 'alpha') == []
+
+def test_reindex_tombstones_old_rows(index):
+    index.add_media('p', 'm1', segments('alpha'))
+    index.add_media('p', 'm1', segments('bravo'))
+    results = index.query('p', 'alpha', k=5)
+    assert [(media_id, score) for media_id, _, _, score in results] == [('m1', 0.0)]
+
+def test_uncommitted_rows_are_ignored_and_truncated(index, tmp_path):
+    index.add_media('p', 'm1', segments('alpha'))
+    project_dir = tmp_path / 'p'
+    
+    # A writer died after appending rows but before committing media.json
+    orphan = np.zeros(1, dtype=ROW_DTYPE)
+    orphan['media'] = 1
+    with open(project_dir / 'vectors.f16', 'ab') as f:
+        f.write(np.eye(len(WORDS), dtype=np.float16)[1].tobytes())
+    with open(project_dir / 'rows.bin', 'ab') as f:
+        f.write(orphan.tobytes())
+    
+    assert [r[0] for r in index.query('p', 'bravo', k=5)] == ['m1']
+    
+    index.add_media('p', 'm2', segments('charlie'))
+    assert os.path.getsize(project_dir / 'rows.bin') == 2 * ROW_DTYPE.itemsize
+    assert os.path.getsize(project_dir / 'vectors.f16') == 2 * len(WORDS) * 2
+    assert index.query('p', 'charlie', k=1)[0][0] == 'm2'
+
+def test_dim_mismatch_is_rejected(index):
+    index.add_media('p', 'm1', segments('alpha'))
+    index.embedder.embed = lambda texts: np.ones((len(texts), 3), dtype=np.float32)
+    with pytest.raises(ValueError):
+        index.add_media('p', 'm2', segments('alpha'))
@@ -0,0 +1,103 @@
+"""
+MemoryGuard: per-job memory estimates and admission plans
+"""
+import os
+import json
+import pytest
+import memory_guard
+from memory_guard import PLAN_CHUNKED, PLAN_DEFER, PLAN_FULL, PLAN_REJECT, MemoryGuard, estimate_job_mb
+from whisper_service import model_memory_mb
+import config
+
+@pytest.fixture(autouse=True)
+def guard_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, 'MEMORY_RESERVATIONS_FILE', str(tmp_path / 'reservations.json'))
+    monkeypatch.setattr(config, 'MEMORY_LIMIT_MB', 10000)
+    monkeypatch.setattr(config, 'MEMORY_HEADROOM_MB', 1000)
+    monkeypatch.setattr(config, 'MEMORY_MB_PER_AUDIO_SECOND', 1.0)
+    monkeypatch.setattr(config, 'MEMORY_JOB_OVERHEAD_MB', 100)
+    monkeypatch.setattr(config, 'CHUNK_MAX_DURATION', 600.0)
+    monkeypatch.setattr(config, 'CHUNK_WORKERS', 2)
+
+@pytest.fixture
+def usage(monkeypatch):
+    """Settable container memory usage in MB (starts at 2000)"""
+    current = {'mb': 2000.0}
+    monkeypatch.setattr(memory_guard, 'memory_usage_mb', lambda: current['mb'])
+    return current
+
+def test_estimate_full_scales_with_duration():
+    assert estimate_job_mb(1000, 'small', model_loaded=True, chunked=False) == 1000 + 100
+
+def test_estimate_adds_model_that_is_not_loaded():
+    loaded = estimate_job_mb(60, 'small', model_loaded=True, chunked=False)
+    assert estimate_job_mb(60, 'small', model_loaded=False, chunked=False) == loaded + model_memory_mb('small')
+
+def test_estimate_chunked_caps_spectrogram_at_one_chunk_per_worker():
+    pcm = 7200 * memory_guard.PCM_MB_PER_SECOND * 2
+    expected = pcm + 600 * 1.0 * 2 + 100
+    assert estimate_job_mb(7200, 'small', model_loaded=True, chunked=True) == pytest.approx(expected)
+    assert expected < estimate_job_mb(7200, 'small', model_loaded=True, chunked=False)
+
+def test_memory_limit_setting_wins():
+    assert memory_guard.memory_limit_mb() == 10000.0
+
+def test_budget_is_limit_minus_headroom(usage):
+    guard = MemoryGuard()
+    assert guard.budget_mb == 9000
+    assert guard.baseline_mb == 2000
+
+def test_unknown_duration_is_admitted_without_reservation(usage):
+    guard = MemoryGuard()
+    assert guard.admit('a', None, 'small', True, can_chunk=True) == (PLAN_FULL, 0.0)
+    assert guard.reserved() == {}
+
+def test_fitting_job_runs_whole_and_reserves(usage):
+    guard = MemoryGuard()
+    assert guard.admit('a', 1000, 'small', True, can_chunk=True) == (PLAN_FULL, 1100)
+    assert guard.reserved() == {f'{os.getpid()}:a': 1100}
+
+def test_reservations_count_against_later_jobs(usage):
+    guard = MemoryGuard()
+    guard.admit('a', 5000, 'small', True, can_chunk=False)
+    # 9000 budget - 2000 in use - 5100 reserved leaves 1900
+    assert guard.admit('b', 2000, 'small', True, can_chunk=False) == (PLAN_DEFER, 2100)
+    guard.release('a')
+    assert guard.admit('b', 2000, 'small', True, can_chunk=False) == (PLAN_FULL, 2100)
+
+def test_too_long_for_whole_file_falls_back_to_chunked(usage):
+    guard = MemoryGuard()
+    plan, estimate = guard.admit('a', 10000, 'small', True, can_chunk=True)
+    assert plan == PLAN_CHUNKED
+    assert estimate == pytest.approx(estimate_job_mb(10000, 'small', True, chunked=True))
+
+def test_defer_when_it_would_fit_on_an_idle_worker(usage):
+    guard = MemoryGuard()
+    usage['mb'] = 8000
+    assert guard.admit('a', 3000, 'small', True, can_chunk=False)[0] == PLAN_DEFER
+    assert guard.reserved() == {}
+
+def test_reject_when_it_never_fits(usage):
+    guard = MemoryGuard()
+    # 7000 MB over an idle baseline of 2000 exceeds the 9000 MB budget
+    assert guard.admit('a', 7000, 'small', True, can_chunk=False) == (PLAN_REJECT, 7100)
+
+def test_release_of_unknown_key_is_a_no_op(usage):
+    guard = MemoryGuard()
+    guard.release('missing')
+    assert guard.reserved() == {}
+
+def test_reservations_are_shared_between_processes(usage):
+    # A sibling pool child (here: the parent process) already reserved 5100 MB
+    with open(config.MEMORY_RESERVATIONS_FILE, 'w') as f:
+        json.dump({f'{os.getppid()}:other': 5100}, f)
+    guard = MemoryGuard()
+    assert guard.admit('b', 2000, 'small', True, can_chunk=False) == (PLAN_DEFER, 2100)
+
+def test_reservations_of_dead_processes_are_dropped(usage, monkeypatch):
+    monkeypatch.setattr(memory_guard, '_pid_alive', lambda pid: pid == os.getpid())
+    with open(config.MEMORY_RESERVATIONS_FILE, 'w') as f:
+        json.dump({'999999:crashed': 5100}, f)
+    guard = MemoryGuard()
+    assert guard.admit('b', 2000, 'small', True, can_chunk=False) == (PLAN_FULL, 2100)
+    assert guard.reserved() == {f'{os.getpid()}:b': 2100}
@@ -0,0 +1,56 @@
+"""
+choose_model: per-job model from duration, backlog and project quality
+"""
+import pytest
+from model_policy import QUALITY_BALANCED, QUALITY_FAST, QUALITY_HIGH, choose_model, upgrade_job
+import config
+
+@pytest.fixture(autouse=True)
+def policy_settings(monkeypatch):
+    monkeypatch.setattr(config, 'ADAPTIVE_MODELS_ENABLED', True)
+    monkeypatch.setattr(config, 'MODEL_UPGRADE_ENABLED', True)
+    monkeypatch.setattr(config, 'WHISPER_MODEL', 'small')
+    monkeypatch.setattr(config, 'WHISPER_FAST_MODEL', 'tiny')
+    monkeypatch.setattr(config, 'MODEL_BACKLOG_THRESHOLD', 50)
+    monkeypatch.setattr(config, 'MODEL_FAST_MIN_DURATION', 3600.0)
+    monkeypatch.setattr(config, 'DEFAULT_PROJECT_QUALITY', QUALITY_BALANCED)
+
+def test_disabled_always_uses_default_model(monkeypatch):
+    monkeypatch.setattr(config, 'ADAPTIVE_MODELS_ENABLED', False)
+    assert choose_model(7200, 1000, QUALITY_FAST) == ('small', False)
+
+def test_same_fast_and_default_model_never_upgrades(monkeypatch):
+    monkeypatch.setattr(config, 'WHISPER_FAST_MODEL', 'small')
+    assert choose_model(7200, 1000, None) == ('small', False)
+
+@pytest.mark.parametrize('quality, expected', [
+    (QUALITY_HIGH, ('small', False)),
+    (QUALITY_FAST, ('tiny', False)),
+])
+def test_project_quality_overrides_load(quality, expected):
+    assert choose_model(7200, 1000, quality) == expected
+
+@pytest.mark.parametrize('duration, queue_depth, expected', [
+    (60, 0, ('small', False)),
+    (None, None, ('small', False)),
+    (60, 49, ('small', False)),
+    (60, 50, ('tiny', True)),
+    (3600, 0, ('tiny', True)),
+    (None, 500, ('tiny', True)),
+])
+def test_balanced_falls_back_under_load(duration, queue_depth, expected):
+    assert choose_model(duration, queue_depth, QUALITY_BALANCED) == expected
+
+def test_unknown_quality_uses_project_default(monkeypatch):
+    monkeypatch.setattr(config, 'DEFAULT_PROJECT_QUALITY', QUALITY_HIGH)
+    assert choose_model(7200, 1000, 'bogus') == ('small', False)
+
+def test_no_upgrade_when_upgrades_are_off(monkeypatch):
+    monkeypatch.setattr(config, 'MODEL_UPGRADE_ENABLED', False)
+    assert choose_model(7200, 0, None) == ('tiny', False)
+
+def test_upgrade_job_targets_default_model():
+    job = {'mediaId': 'm', 'userId': 'u', 'projectId': 'p', 's3Key': 'k', 'operation': 'transcribe'}
+    assert upgrade_job(job) == {
+        'mediaId': 'm', 'userId': 'u', 'projectId': 'p', 's3Key': 'k', 'operation': 'upgrade', 'model': 'small'
+    }
@@ -0,0 +1,66 @@
+"""
+Lane choice and lane scheduling
+"""
+import threading
+import pytest
+from scheduler import LANE_LONG, LANE_SHORT, LaneScheduler, choose_lane, long_slot_limit
+import config
+
+@pytest.fixture(autouse=True)
+def lane_settings(monkeypatch):
+    monkeypatch.setattr(config, 'SHORT_JOB_MAX_DURATION', 300.0)
+    monkeypatch.setattr(config, 'SHORT_RESERVED_SLOTS', 1)
+
+@pytest.mark.parametrize('media, lane', [
+    ({'duration': 12.5}, LANE_SHORT),
+    ({'duration': 300}, LANE_SHORT),
+    ({'duration': '300.5'}, LANE_LONG),
+    ({'duration': 7200}, LANE_LONG),
+    ({'duration': None}, LANE_LONG),
+    (None, LANE_SHORT),
+])
+def test_choose_lane(media, lane):
+    assert choose_lane(media) == lane
+
+def test_long_slot_limit_keeps_one_slot():
+    assert long_slot_limit(4) == 3
+    assert long_slot_limit(1) == 1
+
+def test_short_jobs_run_before_queued_long_jobs():
+    gate = threading.Event()
+    order = []
+    
+    def runner(job):
+        if job == 'blocker':
+            gate.wait(5)
+        order.append(job)
+        return job
+    
+    scheduler = LaneScheduler(runner, slots=1, long_slots=1)
+    scheduler.start()
+    try:
+        blocker = scheduler.submit('blocker', LANE_SHORT)
+        futures = [scheduler.submit('long-1', LANE_LONG), scheduler.submit('short-1', LANE_SHORT)]
+        gate.set()
+        for future in [blocker, *futures]:
+            future.result(timeout=5)
+    finally:
+        scheduler.shutdown()
+    assert order == ['blocker', 'short-1', 'long-1']
+
+def test_shutdown_cancels_queued_jobs():
+    started, gate = threading.Event(), threading.Event()
+    
+    def runner(job):
+        started.set()
+        return gate.wait(5)
+    
+    scheduler = LaneScheduler(runner, slots=1)
+    scheduler.start()
+    running = scheduler.submit('running', LANE_LONG)
+    started.wait(5)
+    queued = scheduler.submit('queued', LANE_SHORT)
+    scheduler.shutdown(wait=False)
+    gate.set()
+    assert queued.cancelled()
+    assert running.result(timeout=5) is True
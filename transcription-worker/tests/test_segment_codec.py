@@ -0,0 +1,71 @@
+"""
+segment_codec: round trips, optional fields and header versioning
+"""
+import numpy as np
+import pytest
+import segment_codec
+from segment_codec import HEADER, MAGIC, VERSION, decode, decode_varints, encode, encode_varints
+
+FULL = [
+    {
+        'start': 0.0, 'end': 1.234, 'text': 'Hello there', 'confidence': 0.8123,
+        'tokens': [50364, 2425, 456, 0, 127, 128, 16383, 16384],
+        'avg_logprob': -0.2079, 'no_speech_prob': 0.0123,
+        'words': {'text': [' Hello', ' there'], 'start': [0.0, 0.6], 'end': [0.5, 1.234], 'probability': [0.9, 0.75]}
+    },
+    {
+        'start': 1.5, 'end': 3.25, 'text': 'héllo wörld 🎙️', 'confidence': 0.5,
+        'tokens': [], 'avg_logprob': -0.6931, 'no_speech_prob': 0.5
+    },
+    {
+        'start': 3600.001, 'end': 3601.0, 'text': '', 'confidence': 1.0,
+        'tokens': [1], 'avg_logprob': 0.0, 'no_speech_prob': 1.0,
+        'words': {'text': [' x'], 'start': [3600.001], 'end': [3601.0], 'probability': [1.0]}
+    }
+]
+
+def test_full_round_trip():
+    assert decode(encode(FULL)) == FULL
+
+def test_minimal_segments_round_trip():
+    segments = [{'start': 0.5, 'end': 1.0, 'text': 'a'}, {'start': 1.0, 'end': 2.0, 'text': 'b'}]
+    assert decode(encode(segments)) == segments
+
+def test_empty_transcript():
+    assert decode(encode([])) == []
+
+def test_field_present_on_only_some_segments_is_dropped():
+    segments = [{'start': 0.0, 'end': 1.0, 'text': 'a', 'confidence': 0.5}, {'start': 1.0, 'end': 2.0, 'text': 'b'}]
+    assert decode(encode(segments)) == [{'start': 0.0, 'end': 1.0, 'text': 'a'}, {'start': 1.0, 'end': 2.0, 'text': 'b'}]
+
+def test_times_round_to_the_millisecond():
+    decoded = decode(encode([{'start': 1.2344, 'end': 1.2346, 'text': 'a'}]))
+    assert (decoded[0]['start'], decoded[0]['end']) == (1.234, 1.235)
+
+def test_zlib_fallback(monkeypatch):
+    monkeypatch.setattr(segment_codec, 'zstandard', None)
+    data = encode(FULL)
+    assert HEADER.unpack_from(data)[2] == segment_codec.CODEC_ZLIB
+    assert decode(data) == FULL
+
+def test_header():
+    magic, version, _, fields, count = HEADER.unpack_from(encode(FULL))
+    assert (magic, version, count) == (MAGIC, VERSION, 3)
+    assert fields == (segment_codec.FIELD_CONFIDENCE | segment_codec.FIELD_TOKENS
+                      | segment_codec.FIELD_STATS | segment_codec.FIELD_WORDS)
+
+def test_rejects_unknown_version():
+    data = bytearray(encode(FULL))
+    data[4] = VERSION + 1
+    with pytest.raises(ValueError, match='version'):
+        decode(bytes(data))
+
+def test_rejects_foreign_blob():
+    with pytest.raises(ValueError, match='Not a packed segment blob'):
+        decode(b'JSON' + encode(FULL)[4:])
+
+def test_varints_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 16383, 16384, 2 ** 32, 2 ** 62], dtype=np.uint64)
+    data, sizes = encode_varints(values)
+    assert sizes.tolist() == [1, 1, 1, 2, 2, 2, 3, 5, 9]
+    assert decode_varints(data).tolist() == values.astype(np.int64).tolist()
@@ -0,0 +1,73 @@
+"""
+trim_silence and OffsetMap: cutting non-speech and mapping times back
+"""
+import numpy as np
+import pytest
+from audio_utils import SAMPLE_RATE
+from silence_trimmer import OffsetMap, trim_silence
+import config
+
+@pytest.fixture(autouse=True)
+def trim_settings(monkeypatch):
+    monkeypatch.setattr(config, 'SILENCE_TRIM_DB', -45.0)
+    monkeypatch.setattr(config, 'SILENCE_TRIM_ZCR', 0.3)
+    monkeypatch.setattr(config, 'SILENCE_TRIM_MIN_GAP', 2.0)
+    monkeypatch.setattr(config, 'SILENCE_TRIM_PADDING', 0.3)
+
+def tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+def test_no_long_gap_is_left_alone():
+    audio = np.concatenate([tone(3), silence(1), tone(3)])
+    trimmed, offset_map = trim_silence(audio)
+    assert offset_map is None
+    assert trimmed is audio
+
+def test_inner_gap_is_cut_with_padding():
+    audio = np.concatenate([tone(3), silence(10), tone(3)])
+    trimmed, offset_map = trim_silence(audio)
+    assert offset_map is not None
+    # 10 s gap keeps about 2 x 0.3 s of padding (frame rounding aside)
+    assert len(trimmed) / SAMPLE_RATE == pytest.approx(6.6, abs=0.1)
+    assert offset_map.original_duration == pytest.approx(16.0)
+
+def test_leading_and_trailing_silence_keep_padding_next_to_speech():
+    audio = np.concatenate([silence(5), tone(3), silence(5)])
+    trimmed, offset_map = trim_silence(audio)
+    assert len(trimmed) / SAMPLE_RATE == pytest.approx(3.6, abs=0.1)
+    assert offset_map.to_original(np.array([0.0]))[0] == pytest.approx(4.7, abs=0.05)
+
+def test_all_silence_keeps_first_second():
+    trimmed, offset_map = trim_silence(silence(30))
+    assert len(trimmed) == SAMPLE_RATE
+    assert offset_map.original_duration == 30.0
+
+def test_offset_map_maps_across_regions():
+    # Kept: original 0-2 s and 10-12 s → trimmed 0-2 s and 2-4 s
+    offset_map = OffsetMap([(0, 2 * SAMPLE_RATE), (10 * SAMPLE_RATE, 12 * SAMPLE_RATE)], 12 * SAMPLE_RATE)
+    assert offset_map.to_original(np.array([0.5, 2.0, 3.0])).tolist() == [0.5, 10.0, 11.0]
+    # A segment ending on the boundary ends in the earlier region
+    assert offset_map.to_original(np.array([2.0]), ends=True).tolist() == [2.0]
+
+def test_remap_segments_moves_words_too():
+    offset_map = OffsetMap([(0, 2 * SAMPLE_RATE), (10 * SAMPLE_RATE, 12 * SAMPLE_RATE)], 12 * SAMPLE_RATE)
+    segment = {
+        'start': 1.5, 'end': 3.0, 'text': 'a b',
+        'words': {'text': [' a', ' b'], 'start': [1.5, 2.5], 'end': [2.0, 3.0], 'probability': [0.9, 0.8]}
+    }
+    [remapped] = offset_map.remap_segments([segment])
+    assert (remapped['start'], remapped['end']) == (1.5, 11.0)
+    assert remapped['words']['start'] == [1.5, 10.5]
+    assert remapped['words']['end'] == [2.0, 11.0]
+    assert segment['start'] == 1.5 and segment['words']['start'] == [1.5, 2.5]  # Input untouched
+
+def test_remap_result_keeps_other_fields():
+    offset_map = OffsetMap([(SAMPLE_RATE, 3 * SAMPLE_RATE)], 3 * SAMPLE_RATE)
+    result = {'text': 'hi', 'language': 'en', 'segments': [{'start': 0.0, 'end': 1.0, 'text': 'hi'}]}
+    remapped = offset_map.remap_result(result)
+    assert remapped['segments'] == [{'start': 1.0, 'end': 2.0, 'text': 'hi'}]
+    assert (remapped['text'], remapped['language']) == ('hi', 'en')
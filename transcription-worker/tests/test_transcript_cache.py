@@ -0,0 +1,28 @@
+"""
+TranscriptCache.make_key: audio identity plus every setting that shapes the transcript
+"""
+import pytest
+from transcript_cache import TranscriptCache
+import config
+
+def test_same_inputs_same_key():
+    assert TranscriptCache.make_key('etag:abc', 'small', 'en') == TranscriptCache.make_key('etag:abc', 'small', 'en')
+
+@pytest.mark.parametrize('args', [
+    ('etag:other', 'small', 'en'),
+    ('etag:abc', 'base', 'en'),
+    ('etag:abc', 'small', 'de'),
+])
+def test_audio_model_and_language_change_key(args):
+    assert TranscriptCache.make_key(*args) != TranscriptCache.make_key('etag:abc', 'small', 'en')
+
+@pytest.mark.parametrize('setting, value', [
+    ('WORD_TIMESTAMPS_ENABLED', True),
+    ('MERGE_MIN_SEGMENT', 0.0),
+    ('SILENCE_TRIM_ENABLED', True),
+    ('SILENCE_TRIM_PADDING', 1.0),
+])
+def test_output_settings_change_key(monkeypatch, setting, value):
+    before = TranscriptCache.make_key('etag:abc', 'small', 'en')
+    monkeypatch.setattr(config, setting, value)
+    assert TranscriptCache.make_key('etag:abc', 'small', 'en') != before
@@ -0,0 +1,126 @@
+"""
+postprocess: segment ordering, overlap fixes, merging, word clipping and confidence
+"""
+import math
+import pytest
+from transcript_postprocessor import format_segment, media_confidence, postprocess
+import config
+
+@pytest.fixture(autouse=True)
+def merge_settings(monkeypatch):
+    monkeypatch.setattr(config, 'MERGE_MIN_SEGMENT', 0.3)
+    monkeypatch.setattr(config, 'MERGE_MAX_GAP', 0.5)
+
+def raw_segment(start, end, text, tokens=(1, 2, 3), avg_logprob=-0.1, no_speech_prob=0.01, words=None):
+    segment = {
+        'start': start,
+        'end': end,
+        'text': text,
+        'tokens': list(tokens),
+        'avg_logprob': avg_logprob,
+        'no_speech_prob': no_speech_prob
+    }
+    if words is not None:
+        segment['words'] = words
+    return segment
+
+def raw_result(*segments):
+    return {'text': ' ' + ''.join(segment['text'] for segment in segments), 'segments': list(segments), 'language': 'en'}
+
+def test_empty_result():
+    assert postprocess({'text': ' ', 'segments': [], 'language': 'en'}) == {
+        'text': '', 'segments': [], 'language': 'en', 'confidence': 0.0
+    }
+
+def test_segments_are_sorted_by_start():
+    result = postprocess(raw_result(raw_segment(5.0, 7.0, ' second'), raw_segment(0.0, 2.0, ' first')))
+    assert [segment['text'] for segment in result['segments']] == ['first', 'second']
+
+def test_overlaps_are_fixed():
+    result = postprocess(raw_result(raw_segment(0.0, 3.0, ' a'), raw_segment(2.0, 5.0, ' b')))
+    assert [(segment['start'], segment['end']) for segment in result['segments']] == [(0.0, 3.0), (3.0, 5.0)]
+
+def test_tiny_segment_joins_previous_one():
+    result = postprocess(raw_result(
+        raw_segment(0.0, 2.0, ' Hello', tokens=(1, 2)),
+        raw_segment(2.1, 2.2, ' there.', tokens=(3,))
+    ))
+    assert len(result['segments']) == 1
+    segment = result['segments'][0]
+    assert (segment['start'], segment['end']) == (0.0, 2.2)
+    assert segment['text'] == 'Hello there.'
+    assert segment['tokens'] == [1, 2, 3]
+
+def test_tiny_first_segment_joins_next_one():
+    result = postprocess(raw_result(raw_segment(0.0, 0.1, ' Um,'), raw_segment(0.2, 2.0, ' so')))
+    assert [segment['text'] for segment in result['segments']] == ['Um, so']
+
+def test_tiny_segment_after_long_pause_stays_alone():
+    result = postprocess(raw_result(raw_segment(0.0, 2.0, ' a'), raw_segment(5.0, 5.1, ' b')))
+    assert len(result['segments']) == 2
+
+def test_merging_off(monkeypatch):
+    monkeypatch.setattr(config, 'MERGE_MIN_SEGMENT', 0.0)
+    result = postprocess(raw_result(raw_segment(0.0, 2.0, ' a'), raw_segment(2.1, 2.2, ' b')))
+    assert len(result['segments']) == 2
+
+def test_merged_logprob_is_token_weighted():
+    # Weights are len(tokens) + 1: 4 and 2
+    result = postprocess(raw_result(
+        raw_segment(0.0, 2.0, ' a', tokens=(1, 2, 3), avg_logprob=-0.1),
+        raw_segment(2.0, 2.1, ' b', tokens=(4,), avg_logprob=-1.0, no_speech_prob=0.9)
+    ))
+    segment = result['segments'][0]
+    assert segment['avg_logprob'] == pytest.approx((4 * -0.1 + 2 * -1.0) / 6, abs=1e-4)
+    assert segment['no_speech_prob'] == 0.01
+
+def test_confidence_is_geometric_mean_token_probability():
+    result = postprocess(raw_result(raw_segment(0.0, 2.0, ' a', avg_logprob=-0.5)))
+    assert result['segments'][0]['confidence'] == round(math.exp(-0.5), 3)
+    assert result['confidence'] == round(math.exp(-0.5), 3)
+
+def test_words_are_clipped_into_their_segment():
+    words = [{'word': ' b', 'start': 2.5, 'end': 4.0, 'probability': 0.8}]
+    result = postprocess(raw_result(raw_segment(0.0, 3.0, ' a'), raw_segment(2.0, 5.0, ' b', words=words)))
+    assert 'words' not in result['segments'][0]
+    # The second segment now starts at 3.0, so its word does too
+    assert result['segments'][1]['words'] == {'text': [' b'], 'start': [3.0], 'end': [4.0], 'probability': [0.8]}
+
+def test_format_segment_keeps_times_and_packs_words():
+    segment = format_segment(raw_segment(
+        1.23456, 2.0, ' hi ', words=[{'word': ' hi', 'start': 1.3, 'end': 1.9, 'probability': 0.95}]
+    ))
+    assert (segment['start'], segment['end'], segment['text']) == (1.235, 2.0, 'hi')
+    assert segment['words'] == {'text': [' hi'], 'start': [1.3], 'end': [1.9], 'probability': [0.95]}
+
+def test_media_confidence_weights_by_tokens():
+    segments = [
+        {'tokens': [1, 2, 3], 'avg_logprob': -0.1, 'confidence': 0.9},
+        {'tokens': [], 'avg_logprob': -2.0, 'confidence': 0.1}
+    ]
+    expected = round(math.exp((4 * -0.1 + 1 * -2.0) / 5), 3)
+    assert media_confidence(segments) == expected
+
+def test_media_confidence_of_legacy_segments_uses_confidence():
+    assert media_confidence([{'tokens': [1], 'confidence': 0.5}]) == 0.5
+
+def test_media_confidence_empty():
+    assert media_confidence([]) == 0.0
+
+def test_segment_confidence_comes_from_its_words():
+    # Same window-level avg_logprob on both segments, different words
+    sure = [{'word': ' a', 'start': 0.0, 'end': 1.0, 'probability': 0.9}]
+    unsure = [{'word': ' b', 'start': 3.0, 'end': 3.5, 'probability': 0.4},
+              {'word': ' c', 'start': 3.5, 'end': 4.0, 'probability': 0.1}]
+    result = postprocess(raw_result(
+        raw_segment(0.0, 2.0, ' a', avg_logprob=-0.2, words=sure),
+        raw_segment(3.0, 5.0, ' b c', avg_logprob=-0.2, words=unsure)
+    ))
+    assert [segment['confidence'] for segment in result['segments']] == [0.9, 0.2]
+    assert result['confidence'] == round((0.9 * 0.4 * 0.1) ** (1 / 3), 3)
+
+def test_format_segment_confidence_from_words():
+    segment = format_segment(raw_segment(0.0, 1.0, ' hi', avg_logprob=-0.01, words=[
+        {'word': ' hi', 'start': 0.0, 'end': 1.0, 'probability': 0.5}
+    ]))
+    assert segment['confidence'] == 0.5
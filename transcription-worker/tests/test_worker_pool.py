@@ -0,0 +1,68 @@
+"""
+TranscriptionPool: a dead child charges a crash only to its own job
+"""
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from queue_service import JobInterrupted
+from worker_pool import TranscriptionPool
+import config
+
+class FakeProcess:
+    def __init__(self, exitcode):
+        self.exitcode = exitcode
+
+class FakeExecutor:
+    """Broken executor whose child 102 has died (101 and 103 are still being terminated)"""
+    _broken = 'A child process terminated abruptly'
+
+    def __init__(self):
+        self._processes = {101: FakeProcess(None), 102: FakeProcess(1), 103: FakeProcess(None)}
+
+class FakeDB:
+    def __init__(self):
+        self.released = []
+
+    def release_job_attempts(self, jobs):
+        self.released.extend(jobs)
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(config, 'JOB_CRASH_LIMIT', 2)
+    pool = TranscriptionPool()
+    pool.db_service = FakeDB()
+    monkeypatch.setattr(pool, '_pool_broken', lambda executor: None)
+    return pool
+
+def break_pool(pool, executor, jobs):
+    """Settle every sent job with BrokenProcessPool; returns the proxy futures"""
+    proxies = []
+    for number, job in jobs:
+        child, proxy = Future(), Future()
+        pool._sent[child] = (job, number)
+        child.set_exception(BrokenProcessPool("terminated abruptly"))
+        pool._relay(executor, proxy, child)
+        proxies.append(proxy)
+    return proxies
+
+def test_only_the_dead_childs_job_keeps_its_crash(pool):
+    executor = FakeExecutor()
+    # Children 101, 102, 103 run jobs 1, 2, 3; job 4 was still queued in the executor
+    pool._running[executor] = ([101, 102, 103], [1, 2, 3])
+    proxies = break_pool(pool, executor, [
+        (1, {'mediaId': 'a'}),
+        (2, {'mediaId': 'poison'}),
+        (3, {'mediaId': 'c', 'operation': 'upgrade'}),
+        (4, {'mediaId': 'queued'}),
+    ])
+    assert pool.db_service.released == [('a', 'transcribe'), ('c', 'upgrade')]
+    for proxy in proxies:
+        with pytest.raises(JobInterrupted):
+            proxy.result()
+
+def test_nothing_released_without_crash_limit(pool, monkeypatch):
+    monkeypatch.setattr(config, 'JOB_CRASH_LIMIT', 0)
+    executor = FakeExecutor()
+    pool._running[executor] = ([101, 102, 103], [1, 2, 3])
+    break_pool(pool, executor, [(1, {'mediaId': 'a'}), (2, {'mediaId': 'poison'})])
+    assert pool.db_service.released == []
@@ -0,0 +1,109 @@
+"""
+Content-addressed transcript cache
+Reuses transcripts of identical audio instead of running Whisper again
+"""
+import hashlib
+from typing import Dict, Optional
+from logger import logger
+import metrics
+import config
+
+# Bump when a code change alters transcripts for the same settings (segment format, post-processing)
+FORMAT_VERSION = 2
+
+def output_settings() -> str:
+    """Settings other than model and language that change a transcript, as a key component"""
+    return '|'.join(str(value) for value in (
+        f"v{FORMAT_VERSION}",
+        config.WORD_TIMESTAMPS_ENABLED,
+        config.MERGE_MIN_SEGMENT,
+        config.MERGE_MAX_GAP,
+        config.SILENCE_TRIM_ENABLED,
+        config.SILENCE_TRIM_DB,
+        config.SILENCE_TRIM_ZCR,
+        config.SILENCE_TRIM_MIN_GAP,
+        config.SILENCE_TRIM_PADDING,
+        config.VAD_SILENCE_DB,
+        config.VAD_MIN_SILENCE,
+        config.CHUNK_MAX_DURATION
+    ))
+
+class TranscriptCache:
+    def __init__(self, db_service):
+        """
+        Initialize cache backed by the transcript_cache table
+        
+        Args:
+            db_service: Database service holding the cache table
+        """
+        self.db_service = db_service
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+    
+    @staticmethod
+    def make_key(content_id: str, model_name: Optional[str] = None, language: Optional[str] = None) -> str:
+        """
+        Build a cache key from audio identity and transcription settings
+        
+        Changing any setting in output_settings() (e.g. turning on word
+        timestamps) starts a fresh set of keys instead of serving
+        transcripts made under the old settings.
+        
+        Args:
+            content_id: 'etag:…' from S3 or 'sha256:…' of the audio
+            model_name: Whisper model used (None = config.WHISPER_MODEL)
+            language: Language transcribed with (None = config.WHISPER_LANGUAGE)
+        """
+        language = language if language is not None else config.WHISPER_LANGUAGE
+        identity = (
+            f"{content_id}|{config.WHISPER_BACKEND}|{model_name or config.WHISPER_MODEL}|"
+            f"{language or 'auto'}|{output_settings()}"
+        )
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+    
+    def _log_stats(self, outcome: str):
+        """Log running hit/miss counters"""
+        total = self.hits + self.misses
+        logger.info(
+            f"🗃️  Transcript cache {outcome} "
+            f"(hits: {self.hits}, misses: {self.misses}, hit rate: {self.hits / total:.1%})"
+        )
+    
+    def get(self, cache_key: str) -> Optional[Dict]:
+        """
+        Look up a transcript; cache errors count as a miss
+        
+        Returns:
+            Transcript dict or None
+        """
+        try:
+            result = self.db_service.get_cached_transcript(cache_key)
+        except Exception as e:
+            logger.warning(f"⚠️  Transcript cache lookup failed: {str(e)}")
+            result = None
+        
+        if result is None:
+            self.misses += 1
+            metrics.CACHE_LOOKUPS_TOTAL.labels('miss').inc()
+            self._log_stats('miss')
+        else:
+            self.hits += 1
+            metrics.CACHE_LOOKUPS_TOTAL.labels('hit').inc()
+            self._log_stats('hit')
+        return result
+    
+    def put(self, cache_key: str, result: Dict):
+        """Store a transcript and periodically evict old / excess entries"""
+        try:
+            self.db_service.put_cached_transcript(cache_key, result)
+            self.puts += 1
+            
+            if self.puts % config.TRANSCRIPT_CACHE_EVICT_EVERY == 0:
+                removed = self.db_service.evict_transcript_cache(
+                    max_age_days=config.TRANSCRIPT_CACHE_MAX_AGE_DAYS,
+                    max_bytes=config.TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024
+                )
+                logger.info(f"🧹 Transcript cache eviction removed {removed} entries")
+        except Exception as e:
+            logger.warning(f"⚠️  Transcript cache write failed: {str(e)}")
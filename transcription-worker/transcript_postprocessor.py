@@ -0,0 +1,260 @@
+"""
+Transcript post-processing: confidence from word or token probabilities, segment cleanup, word timings
+
+Runs on every raw backend result, so everything per-segment is done on
+NumPy arrays; Python only loops to build the output dicts.
+
+Both backends report avg_logprob per decoding window (up to 30 s), not per
+segment: every segment of a window carries the same value. Segment
+confidence therefore comes from the segment's own word probabilities when
+word timestamps are on, and is window-level otherwise.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import config
+
+def token_weights(segments: List[Dict]) -> np.ndarray:
+    """
+    Tokens each segment's avg_logprob averages over
+
+    Whisper divides a segment's summed token log-probabilities by
+    len(tokens) + 1 (the end-of-text token), so that is the weight that
+    turns averages back into sums.
+    """
+    return np.fromiter((len(segment.get('tokens') or ()) + 1 for segment in segments), np.float64, len(segments))
+
+def logprob_confidence(avg_logprob: np.ndarray) -> np.ndarray:
+    """Geometric-mean token probability, 0-1"""
+    return np.clip(np.exp(avg_logprob), 0.0, 1.0)
+
+def word_logprobs(probabilities) -> np.ndarray:
+    """Log word probabilities (floored so a 0.0 doesn't become -inf)"""
+    return np.log(np.maximum(np.asarray(probabilities, dtype=np.float64), 1e-6))
+
+def _segment_logprob(segment: Dict) -> Tuple[float, float]:
+    """
+    (mean log-probability, weight) of a saved-format segment
+
+    Words when it has them (weight: word count), else its window-level
+    avg_logprob (weight: tokens + 1); segments saved before avg_logprob was
+    kept, e.g. old chunk checkpoints, count with their confidence.
+    """
+    words = segment.get('words')
+    if words and len(words['probability']):
+        logs = word_logprobs(words['probability'])
+        return float(logs.mean()), float(len(logs))
+    weight = len(segment.get('tokens') or ()) + 1
+    if 'avg_logprob' in segment:
+        return segment['avg_logprob'], weight
+    return float(np.log(max(segment['confidence'], 1e-6))), weight
+
+def media_confidence(segments: List[Dict]) -> float:
+    """
+    Confidence of a whole transcript: geometric-mean probability over all its words (or tokens)
+
+    Args:
+        segments: Saved-format segments
+
+    Returns:
+        Confidence 0-1 (0.0 for an empty transcript)
+    """
+    if not segments:
+        return 0.0
+    logprobs, weights = np.array([_segment_logprob(segment) for segment in segments], dtype=np.float64).T
+    return round(float(logprob_confidence(np.dot(weights, logprobs) / weights.sum())), 3)
+
+def pack_words(words: Optional[List[Dict]]) -> Optional[Dict]:
+    """
+    Backend word list → parallel arrays
+
+    {'text': [...], 'start': [...], 'end': [...], 'probability': [...]} is
+    a fraction of the size of one object per word, in JSON and in memory.
+    """
+    if not words:
+        return None
+    return {
+        'text': [word['word'] for word in words],
+        'start': [round(float(word['start']), 3) for word in words],
+        'end': [round(float(word['end']), 3) for word in words],
+        'probability': [round(float(word['probability']), 3) for word in words]
+    }
+
+def format_segment(segment: Dict) -> Dict:
+    """
+    Raw backend segment → saved segment format (no merging or overlap fixes)
+
+    Used for segments streamed before the transcript is complete.
+    """
+    words = segment.get('words')
+    logprob = word_logprobs([word['probability'] for word in words]).mean() if words else segment['avg_logprob']
+    formatted = {
+        'start': round(float(segment['start']), 3),
+        'end': round(float(segment['end']), 3),
+        'text': segment['text'].strip(),
+        'confidence': round(float(logprob_confidence(logprob)), 3),
+        'tokens': list(segment.get('tokens') or ()),
+        'avg_logprob': round(float(segment['avg_logprob']), 4),
+        'no_speech_prob': round(float(segment['no_speech_prob']), 4)
+    }
+    packed = pack_words(words)
+    if packed:
+        formatted['words'] = packed
+    return formatted
+
+def remap_times(
+    segments: List[Dict],
+    map_starts: Callable[[np.ndarray], np.ndarray],
+    map_ends: Callable[[np.ndarray], np.ndarray]
+) -> List[Dict]:
+    """
+    Copies of saved-format segments with their times (and their words' times) mapped
+
+    Args:
+        segments: Saved-format segments
+        map_starts: Vectorized mapping for start times
+        map_ends: Vectorized mapping for end times
+
+    Returns:
+        New segment dicts, times rounded to the millisecond
+    """
+    if not segments:
+        return []
+    count = len(segments)
+    starts = np.round(map_starts(np.fromiter((segment['start'] for segment in segments), np.float64, count)), 3)
+    ends = np.round(map_ends(np.fromiter((segment['end'] for segment in segments), np.float64, count)), 3)
+
+    word_lists = [segment['words'] for segment in segments if segment.get('words')]
+    if word_lists:
+        word_starts = np.round(map_starts(np.concatenate([words['start'] for words in word_lists])), 3).tolist()
+        word_ends = np.round(map_ends(np.concatenate([words['end'] for words in word_lists])), 3).tolist()
+
+    remapped, w = [], 0
+    for segment, start, end in zip(segments, starts.tolist(), ends.tolist()):
+        segment = {**segment, 'start': start, 'end': end}
+        if segment.get('words'):
+            n = len(segment['words']['start'])
+            segment['words'] = {**segment['words'], 'start': word_starts[w:w + n], 'end': word_ends[w:w + n]}
+            w += n
+        remapped.append(segment)
+    return remapped
+
+def fix_overlaps(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Make segment times monotonic
+
+    Each start is moved past the latest end before it, and each end to at
+    least its start. Expects segments sorted by start.
+    """
+    previous_end = np.maximum.accumulate(np.concatenate(([0.0], ends[:-1])))
+    starts = np.maximum(starts, previous_end)
+    ends = np.maximum(ends, starts)
+    return starts, ends
+
+def merge_groups(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Indices of the segments that start each merged segment
+
+    A segment shorter than MERGE_MIN_SEGMENT joins the segment before it
+    (the one after it, if it's first) when the pause between them is at
+    most MERGE_MAX_GAP; otherwise it stays on its own.
+    """
+    count = len(starts)
+    new_group = np.ones(count, dtype=bool)
+    if count < 2 or config.MERGE_MIN_SEGMENT <= 0:
+        return np.flatnonzero(new_group)
+
+    tiny = (ends - starts) < config.MERGE_MIN_SEGMENT
+    close = np.zeros(count, dtype=bool)
+    close[1:] = (starts[1:] - ends[:-1]) <= config.MERGE_MAX_GAP
+    new_group[1:] = ~(tiny[1:] & close[1:])
+    if tiny[0] and close[1]:
+        new_group[1] = False
+    return np.flatnonzero(new_group)
+
+def postprocess(result: Dict) -> Dict:
+    """
+    Raw backend result → transcript dict saved by the worker
+
+    Segments are sorted, their overlaps fixed and tiny ones merged into a
+    neighbour. Word timings (WORD_TIMESTAMPS_ENABLED) are clipped into
+    their segment, and a segment's confidence is the geometric mean of its
+    word probabilities; without words it is the window-level token
+    confidence. The media confidence covers all words (or tokens).
+
+    Args:
+        result: {'text', 'segments', 'language'} with raw segments carrying
+            start/end/text/tokens/avg_logprob/no_speech_prob (and words)
+
+    Returns:
+        {'text', 'segments', 'language', 'confidence'}
+    """
+    raw = result['segments']
+    count = len(raw)
+    transcript = {'text': result['text'].strip(), 'segments': [], 'language': result['language'], 'confidence': 0.0}
+    if not count:
+        return transcript
+
+    starts = np.fromiter((segment['start'] for segment in raw), np.float64, count)
+    order = np.argsort(starts, kind='stable')
+    if np.any(order != np.arange(count)):
+        raw = [raw[i] for i in order]
+        starts = starts[order]
+    ends = np.fromiter((segment['end'] for segment in raw), np.float64, count)
+    starts, ends = fix_overlaps(starts, ends)
+
+    weights = token_weights(raw)
+    logprob_sums = weights * np.fromiter((segment['avg_logprob'] for segment in raw), np.float64, count)
+    no_speech = np.fromiter((segment['no_speech_prob'] for segment in raw), np.float64, count)
+
+    # Merged segment = its members' span; avg_logprob over all their tokens; speech if any member is
+    first = merge_groups(starts, ends)
+    last = np.concatenate((first[1:], [count]))
+    group_ends = np.maximum.reduceat(ends, first)
+    avg_logprob = np.add.reduceat(logprob_sums, first) / np.add.reduceat(weights, first)
+    no_speech = np.minimum.reduceat(no_speech, first)
+    confidence = logprob_confidence(avg_logprob)
+
+    # Word timings on one flat array, clipped into their (fixed) segment
+    word_counts = np.fromiter((len(segment.get('words') or ()) for segment in raw), np.int64, count)
+    word_bounds = np.concatenate(([0], np.cumsum(word_counts)))
+    if word_bounds[-1]:
+        words = [word for segment in raw for word in (segment.get('words') or ())]
+        owner = np.repeat(np.arange(count), word_counts)
+        word_starts = np.clip([word['start'] for word in words], starts[owner], ends[owner])
+        word_ends = np.clip([word['end'] for word in words], word_starts, ends[owner])
+        word_starts, word_ends = np.round(word_starts, 3).tolist(), np.round(word_ends, 3).tolist()
+        word_probs = np.round([word['probability'] for word in words], 3).tolist()
+        word_texts = [word['word'] for word in words]
+        
+        # Per merged segment: mean log-probability of its own words where it has any
+        log_sums = np.concatenate(([0.0], np.cumsum(word_logprobs([word['probability'] for word in words]))))
+        group_words = word_bounds[last] - word_bounds[first]
+        has_words = group_words > 0
+        word_mean = (log_sums[word_bounds[last]] - log_sums[word_bounds[first]])[has_words] / group_words[has_words]
+        confidence[has_words] = logprob_confidence(word_mean)
+
+    segments = []
+    for g, (i, j) in enumerate(zip(first.tolist(), last.tolist())):
+        members = raw[i:j]
+        segment = {
+            'start': round(float(starts[i]), 3),
+            'end': round(float(group_ends[g]), 3),
+            'text': ''.join(member['text'] for member in members).strip(),
+            'confidence': round(float(confidence[g]), 3),
+            'tokens': [token for member in members for token in (member.get('tokens') or ())],
+            'avg_logprob': round(float(avg_logprob[g]), 4),
+            'no_speech_prob': round(float(no_speech[g]), 4)
+        }
+        a, b = int(word_bounds[i]), int(word_bounds[j])
+        if b > a:
+            segment['words'] = {
+                'text': word_texts[a:b],
+                'start': word_starts[a:b],
+                'end': word_ends[a:b],
+                'probability': word_probs[a:b]
+            }
+        segments.append(segment)
+
+    transcript['segments'] = segments
+    transcript['confidence'] = media_confidence(segments)
+    return transcript
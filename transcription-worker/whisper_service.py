@@ -1,16 +1,101 @@
 """
 Whisper AI service for audio transcription
 """
-import whisper
-import torch
-from typing import Dict, List
+import os
+import gc
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from logger import logger
+from audio_utils import SAMPLE_RATE, decode_file, split_on_silence
+from transcript_postprocessor import format_segment, postprocess
+import metrics
 import config
 
-class WhisperService:
-    def __init__(self):
-        """Initialize Whisper model"""
-        logger.info(f"🔄 Loading Whisper model '{config.WHISPER_MODEL}'...")
+LANGUAGE_AUTO = 'auto'  # Per-call language: let the model detect it
+
+def resolve_language(language: Optional[str]) -> Optional[str]:
+    """Per-call language → backend language (None = config.WHISPER_LANGUAGE, LANGUAGE_AUTO = detect)"""
+    if language is None:
+        return config.WHISPER_LANGUAGE
+    return None if language == LANGUAGE_AUTO else language
+
+class WhisperBackend:
+    """
+    Inference engine behind WhisperService
+    
+    Backends return raw results ({'text', 'segments', 'language'}, segments as
+    dicts with at least start/end/text/tokens/avg_logprob/no_speech_prob, plus
+    words when WORD_TIMESTAMPS_ENABLED); WhisperService turns them into the
+    transcript format saved by the worker.
+    """
+    name = 'base'
+    
+    def __init__(self, model_name: str, num_threads: Optional[int] = None):
+        self.model_name = model_name
+        self.num_threads = num_threads
+        self.device = 'cpu'
+    
+    @classmethod
+    def ensure_model_downloaded(cls, model_name: str) -> None:
+        """Fetch weights into the local cache (no-op by default)"""
+    
+    def transcribe(self, audio: np.ndarray, language: Optional[str]) -> Dict:
+        raise NotImplementedError
+    
+    def detect_language(self, audio: np.ndarray) -> Tuple[str, float]:
+        """Most likely language of the first 30 s and its probability (multilingual models only)"""
+        raise NotImplementedError
+    
+    def transcribe_batch(self, audios: List[np.ndarray], language: Optional[str]) -> List[Dict]:
+        """Transcribe several clips (one call per clip unless a backend can batch)"""
+        return [self.transcribe(audio, language) for audio in audios]
+    
+    def transcribe_stream(self, audio: np.ndarray, language: Optional[str]) -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        Transcribe incrementally, yielding (language, raw segments) as they're decoded
+        
+        By default the audio is cut on silence into STREAM_WINDOW-second
+        windows, each transcribed on its own; timestamps are shifted onto
+        the full timeline. Later windows reuse the first window's language.
+        """
+        bounds = split_on_silence(
+            audio,
+            max_chunk=config.STREAM_WINDOW,
+            silence_db=config.VAD_SILENCE_DB,
+            min_silence=config.VAD_MIN_SILENCE
+        )
+        for start, end in bounds:
+            result = self.transcribe(audio[start:end], language)
+            language = language or result['language']
+            offset = start / SAMPLE_RATE
+            yield language, [
+                dict(
+                    segment,
+                    start=segment['start'] + offset,
+                    end=segment['end'] + offset,
+                    words=[
+                        dict(word, start=word['start'] + offset, end=word['end'] + offset)
+                        for word in segment['words']
+                    ] if segment.get('words') else None
+                )
+                for segment in result['segments']
+            ]
+
+class OpenAIWhisperBackend(WhisperBackend):
+    """Reference openai-whisper implementation (PyTorch, fp32 on CPU)"""
+    name = 'openai'
+    
+    def __init__(self, model_name: str, num_threads: Optional[int] = None):
+        super().__init__(model_name, num_threads)
+        import torch
+        import whisper
+        
+        # Pin thread count so several workers on one box don't oversubscribe cores
+        if num_threads:
+            torch.set_num_threads(num_threads)
         
         # Check device availability
         if config.WHISPER_DEVICE == 'cuda' and not torch.cuda.is_available():
@@ -19,68 +104,561 @@ class WhisperService:
         else:
             self.device = config.WHISPER_DEVICE
         
-        # Load model
-        self.model = whisper.load_model(config.WHISPER_MODEL, device=self.device)
+        self.model = self._load_model(model_name)
+        logger.info(f"   Threads: {torch.get_num_threads()}")
+    
+    def _cache_path(self, model_name: str) -> str:
+        """Pre-serialized fp32 checkpoint for a model in MODEL_CACHE_DIR"""
+        name = os.path.splitext(os.path.basename(model_name))[0]
+        return os.path.join(config.MODEL_CACHE_DIR, f"openai-{name}.pt")
+    
+    def _load_model(self, model_name: str):
+        """
+        Load the model, memory-mapping weights from MODEL_CACHE_DIR when possible
+        
+        The first load on a host goes through whisper.load_model and writes
+        the fp32 state dict to the cache. Later loads mmap that file instead
+        of reading and copying it, so workers on one host share the weights
+        through the page cache and start in a fraction of the time.
+        """
+        import whisper
+        
+        if not config.MODEL_CACHE_DIR:
+            return whisper.load_model(model_name, device=self.device)
+        
+        path = self._cache_path(model_name)
+        if os.path.exists(path):
+            try:
+                model = self._load_cached(path, model_name)
+                logger.info(f"   Weights: memory-mapped from {path}")
+                return model.to(self.device)
+            except Exception as e:
+                logger.warning(f"⚠️  Model cache unusable, loading normally: {str(e)}")
+        
+        model = whisper.load_model(model_name, device='cpu')
+        self._write_cache(model, path)
+        return model.to(self.device)
+    
+    def _load_cached(self, path: str, model_name: str):
+        """Build the model on the meta device and assign mmap-backed tensors to it"""
+        import itertools
+        import torch
+        import whisper
+        from whisper.model import ModelDimensions, Whisper
+        
+        checkpoint = torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+        dims = ModelDimensions(**checkpoint['dims'])
+        
+        # Skip random init: every persistent tensor comes from the checkpoint
+        with torch.device('meta'):
+            model = Whisper(dims)
+        model.load_state_dict(checkpoint['model_state_dict'], assign=True)
+        
+        # Non-persistent buffers aren't in the state dict; rebuild them as Whisper.__init__ does
+        mask = torch.empty(dims.n_text_ctx, dims.n_text_ctx).fill_(-np.inf).triu_(1)
+        model.decoder.register_buffer('mask', mask, persistent=False)
+        heads = torch.zeros(dims.n_text_layer, dims.n_text_head, dtype=torch.bool)
+        heads[dims.n_text_layer // 2:] = True
+        model.register_buffer('alignment_heads', heads.to_sparse(), persistent=False)
+        if model_name in whisper._ALIGNMENT_HEADS:
+            model.set_alignment_heads(whisper._ALIGNMENT_HEADS[model_name])
+        
+        if any(t.is_meta for t in itertools.chain(model.parameters(), model.buffers())):
+            raise RuntimeError("checkpoint left tensors unmaterialized")
+        return model
+    
+    def _write_cache(self, model, path: str) -> None:
+        """Serialize the loaded model for later mmap loads (atomic rename)"""
+        import torch
+        
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            torch.save({'dims': vars(model.dims), 'model_state_dict': model.state_dict()}, tmp_path)
+            os.replace(tmp_path, path)
+            logger.info(f"💾 Cached model weights: {path}")
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to write model cache: {str(e)}")
+    
+    @classmethod
+    def ensure_model_downloaded(cls, model_name: str) -> None:
+        import whisper
+        
+        if model_name not in whisper._MODELS:
+            return  # Local checkpoint path, nothing to download
+        
+        default = os.path.join(os.path.expanduser("~"), ".cache")
+        download_root = os.path.join(os.getenv("XDG_CACHE_HOME", default), "whisper")
+        whisper._download(whisper._MODELS[model_name], download_root, in_memory=False)
+    
+    def transcribe(self, audio: np.ndarray, language: Optional[str]) -> Dict:
+        return self.model.transcribe(
+            audio,
+            language=language,
+            task='transcribe',
+            fp16=(self.device == 'cuda'),  # Use FP16 on GPU for speed
+            word_timestamps=config.WORD_TIMESTAMPS_ENABLED,
+            verbose=False
+        )
+    
+    def detect_language(self, audio: np.ndarray) -> Tuple[str, float]:
+        """One encoder pass and one decoder step over a 30 s window"""
+        import torch
+        import whisper
+        
+        mel = whisper.log_mel_spectrogram(
+            whisper.pad_or_trim(torch.from_numpy(audio)),
+            n_mels=self.model.dims.n_mels
+        ).to(self.device)
+        _, probs = self.model.detect_language(mel)
+        language = max(probs, key=probs.get)
+        return language, float(probs[language])
+    
+    def transcribe_batch(self, audios: List[np.ndarray], language: Optional[str]) -> List[Dict]:
+        """
+        Transcribe clips of up to 30 s in one batched encoder/decoder pass
+        
+        Each clip is padded to a 30 s window, the mels are stacked and
+        whisper.decode runs once for the whole batch (language detection is
+        per clip). Greedy decoding has no temperature fallback, so clips whose
+        result looks degenerate, and clips longer than one window, go through
+        the regular transcribe path. So does every clip when word timestamps
+        are on: they come from cross-attention alignment that whisper.decode
+        doesn't run.
+        """
+        import torch
+        import whisper
+        from whisper.audio import N_SAMPLES
+        
+        results = [None] * len(audios)
+        batchable = [
+            i for i, audio in enumerate(audios)
+            if len(audio) <= N_SAMPLES and not config.WORD_TIMESTAMPS_ENABLED
+        ]
+        
+        if batchable:
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(torch.from_numpy(audios[i])),
+                    n_mels=self.model.dims.n_mels
+                )
+                for i in batchable
+            ]).to(self.device)
+            options = whisper.DecodingOptions(
+                task='transcribe',
+                language=language,
+                fp16=(self.device == 'cuda')
+            )
+            decoded = whisper.decode(self.model, mel, options)
+            
+            for i, result in zip(batchable, decoded):
+                # Same thresholds transcribe() uses to trigger its fallback
+                if result.compression_ratio > 2.4 or result.avg_logprob < -1.0:
+                    continue
+                results[i] = self._decoded_to_result(result, len(audios[i]) / SAMPLE_RATE)
+        
+        for i, audio in enumerate(audios):
+            if results[i] is None:
+                results[i] = self.transcribe(audio, language)
+        return results
+    
+    def _decoded_to_result(self, decoded, duration: float) -> Dict:
+        """Split a DecodingResult into segments at its timestamp tokens"""
+        from whisper.tokenizer import get_tokenizer
+        
+        tokenizer = get_tokenizer(
+            self.model.is_multilingual,
+            num_languages=self.model.num_languages,
+            language=decoded.language,
+            task='transcribe'
+        )
+        # Timestamp tokens count in 20 ms steps: <|0.00|> text <|2.40|><|2.40|> text <|5.00|>
+        segments = []
+        
+        def emit(start: float, end: float, tokens: List[int]):
+            segments.append({
+                'id': len(segments),
+                'start': start,
+                'end': min(end, duration),
+                'text': tokenizer.decode(tokens),
+                'tokens': tokens,
+                'temperature': decoded.temperature,
+                'avg_logprob': decoded.avg_logprob,
+                'compression_ratio': decoded.compression_ratio,
+                'no_speech_prob': decoded.no_speech_prob
+            })
+        
+        start, text_tokens = None, []
+        for token in decoded.tokens:
+            if token >= tokenizer.timestamp_begin:
+                timestamp = (token - tokenizer.timestamp_begin) * 0.02
+                if start is not None and text_tokens:
+                    emit(start, timestamp, text_tokens)
+                    start, text_tokens = None, []
+                else:
+                    start = timestamp
+            elif token < tokenizer.eot:
+                text_tokens.append(token)
+        if text_tokens:
+            emit(start or 0.0, duration, text_tokens)
+        
+        return {
+            'text': decoded.text,
+            'segments': segments,
+            'language': decoded.language
+        }
+
+class FasterWhisperBackend(WhisperBackend):
+    """CTranslate2 implementation (faster-whisper), int8-quantized by default"""
+    name = 'faster-whisper'
+    
+    def __init__(self, model_name: str, num_threads: Optional[int] = None):
+        super().__init__(model_name, num_threads)
+        import ctranslate2
+        from faster_whisper import WhisperModel
+        
+        if config.WHISPER_DEVICE == 'cuda' and ctranslate2.get_cuda_device_count() == 0:
+            logger.warning("⚠️  CUDA requested but not available, falling back to CPU")
+            self.device = 'cpu'
+        else:
+            self.device = config.WHISPER_DEVICE
+        
+        self.model = WhisperModel(
+            model_name,
+            device=self.device,
+            compute_type=config.WHISPER_COMPUTE_TYPE,
+            cpu_threads=num_threads or 0
+        )
+        logger.info(f"   Compute type: {config.WHISPER_COMPUTE_TYPE}")
+    
+    @classmethod
+    def ensure_model_downloaded(cls, model_name: str) -> None:
+        from faster_whisper import download_model
+        
+        if not os.path.isdir(model_name):
+            download_model(model_name)
+    
+    def _run(self, audio: np.ndarray, language: Optional[str]):
+        return self.model.transcribe(
+            audio,
+            language=language,
+            task='transcribe',
+            word_timestamps=config.WORD_TIMESTAMPS_ENABLED
+        )
+    
+    def detect_language(self, audio: np.ndarray) -> Tuple[str, float]:
+        language, probability, _ = self.model.detect_language(audio)
+        return language, float(probability)
+    
+    @staticmethod
+    def _segment_dict(segment) -> Dict:
+        """faster-whisper Segment → openai-whisper style segment dict"""
+        return {
+            'id': segment.id,
+            'seek': segment.seek,
+            'start': segment.start,
+            'end': segment.end,
+            'text': segment.text,
+            'tokens': list(segment.tokens),
+            'temperature': segment.temperature,
+            'avg_logprob': segment.avg_logprob,
+            'compression_ratio': segment.compression_ratio,
+            'no_speech_prob': segment.no_speech_prob,
+            'words': [
+                {'word': word.word, 'start': word.start, 'end': word.end, 'probability': word.probability}
+                for word in segment.words
+            ] if segment.words else None
+        }
+    
+    def transcribe_stream(self, audio: np.ndarray, language: Optional[str]) -> Iterator[Tuple[str, List[Dict]]]:
+        """Native streaming: faster-whisper yields each segment as it's decoded"""
+        segments, info = self._run(audio, language)
+        for segment in segments:
+            yield info.language, [self._segment_dict(segment)]
+    
+    def transcribe(self, audio: np.ndarray, language: Optional[str]) -> Dict:
+        segments, info = self._run(audio, language)
+        
+        # faster-whisper decodes lazily; consuming the generator runs inference
+        raw_segments = [self._segment_dict(segment) for segment in segments]
+        return {
+            'text': ''.join(segment['text'] for segment in raw_segments),
+            'segments': raw_segments,
+            'language': info.language
+        }
+
+class BatchedFasterWhisperBackend(FasterWhisperBackend):
+    """faster-whisper with batched inference over VAD-split windows of one file"""
+    name = 'faster-whisper-batched'
+    
+    def __init__(self, model_name: str, num_threads: Optional[int] = None):
+        super().__init__(model_name, num_threads)
+        from faster_whisper import BatchedInferencePipeline
+        
+        self.pipeline = BatchedInferencePipeline(model=self.model)
+        logger.info(f"   Batch size: {config.WHISPER_BATCH_SIZE}")
+    
+    def _run(self, audio: np.ndarray, language: Optional[str]):
+        return self.pipeline.transcribe(
+            audio,
+            language=language,
+            task='transcribe',
+            batch_size=config.WHISPER_BATCH_SIZE,
+            word_timestamps=config.WORD_TIMESTAMPS_ENABLED
+        )
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (OpenAIWhisperBackend, FasterWhisperBackend, BatchedFasterWhisperBackend)
+}
+
+def get_backend_class(name: str):
+    """Look up a backend by WHISPER_BACKEND name"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown WHISPER_BACKEND '{name}' (options: {', '.join(BACKENDS)})")
+    return BACKENDS[name]
+
+def ensure_model_downloaded(model_name: str) -> None:
+    """
+    Download model weights into the local cache once
+    
+    Called by the pool supervisor before spawning children, so N processes
+    don't race each other downloading (and corrupting) the same checkpoint.
+    
+    Args:
+        model_name: Whisper model name (tiny, base, small, ...)
+    """
+    get_backend_class(config.WHISPER_BACKEND).ensure_model_downloaded(model_name)
+    logger.info(f"✅ Whisper model '{model_name}' available locally")
+
+# Approximate resident size of fp32 weights, by model family (MB)
+MODEL_MEMORY_MB = {
+    'tiny': 150,
+    'base': 300,
+    'small': 1000,
+    'medium': 3100,
+    'large': 6200,
+    'turbo': 3300,
+}
+
+def model_memory_mb(model_name: str) -> int:
+    """Estimated memory of a loaded model ('base.en' → base, 'large-v3' → large)"""
+    family = os.path.basename(model_name).split('.')[0].split('-')[0]
+    return MODEL_MEMORY_MB.get(family, MODEL_MEMORY_MB['large'])
+
+class WhisperService:
+    def __init__(self, num_threads: Optional[int] = None, default_model: Optional[str] = None):
+        """
+        Initialize Whisper model
+        
+        The default model is loaded now and never evicted. Other models are
+        loaded on first use and kept in an LRU bounded by
+        MODEL_MEMORY_BUDGET_MB. With language routing, English jobs run the
+        .en variant instead, so the default is evicted like any other model
+        rather than held beside it.
+        
+        Args:
+            num_threads: Intra-op thread count (None = backend default)
+            default_model: Model to load now and use when none is given (None = config.WHISPER_MODEL)
+        """
+        self.num_threads = num_threads
+        self.default_model = default_model or config.WHISPER_MODEL
+        self.backend_class = get_backend_class(config.WHISPER_BACKEND)
+        self.backends = OrderedDict()  # model name → backend, least recently used first
+        self.pin_default = not config.LANGUAGE_ROUTING_ENABLED
+        self._lock = threading.Lock()
+        
+        # No reference kept here: an evicted model's memory must actually be freed
+        backend = self.get_backend(self.default_model)
+        self.device = backend.device
+        self.last_rtf = None  # Real-time factor of the most recent transcription
         
         logger.info(f"✅ Whisper model loaded (device: {self.device})")
-        logger.info(f"   Model size: {config.WHISPER_MODEL}")
+        logger.info(f"   Model size: {self.default_model}")
+        logger.info(f"   Backend: {backend.name}")
         logger.info(f"   Language: {config.WHISPER_LANGUAGE or 'auto-detect'}")
     
-    def transcribe(self, audio_path: str) -> Dict:
+    def detect_language(self, audio: np.ndarray, model_name: Optional[str] = None) -> Tuple[str, float]:
+        """
+        Identify the spoken language from the start of the audio
+        
+        Args:
+            audio: 16 kHz float32 PCM (only the first 30 s are used)
+            model_name: Multilingual Whisper model to detect with (None = config.LANGUAGE_DETECT_MODEL)
+            
+        Returns:
+            (language code, probability 0-1)
+        """
+        backend = self.get_backend(model_name or config.LANGUAGE_DETECT_MODEL)
+        start_time = time.time()
+        language, probability = backend.detect_language(audio)
+        logger.info(
+            f"🌐 Detected language: {language} ({probability:.0%}) in {time.time() - start_time:.2f}s "
+            f"({backend.model_name})"
+        )
+        return language, probability
+    
+    def get_backend(self, model_name: Optional[str] = None) -> WhisperBackend:
+        """
+        Return a loaded backend for a model, loading it if needed
+        
+        Args:
+            model_name: Whisper model name (None = the default model)
+        """
+        model_name = model_name or self.default_model
+        with self._lock:
+            backend = self.backends.get(model_name)
+            if backend is not None:
+                self.backends.move_to_end(model_name)
+                return backend
+            
+            self._evict_for(model_memory_mb(model_name))
+            logger.info(f"🔄 Loading Whisper model '{model_name}' ({config.WHISPER_BACKEND})...")
+            backend = self.backend_class(model_name, num_threads=self.num_threads)
+            self.backends[model_name] = backend
+            return backend
+    
+    def _evict_for(self, needed_mb: int) -> None:
+        """Drop least recently used models (never a pinned default) until `needed_mb` fits the budget"""
+        used_mb = sum(model_memory_mb(name) for name in self.backends)
+        for name in list(self.backends):
+            if used_mb + needed_mb <= config.MODEL_MEMORY_BUDGET_MB:
+                break
+            if name == self.default_model and self.pin_default:
+                continue
+            del self.backends[name]
+            used_mb -= model_memory_mb(name)
+            logger.info(f"♻️  Evicted Whisper model '{name}' (memory budget {config.MODEL_MEMORY_BUDGET_MB} MB)")
+        gc.collect()
+        
+        if used_mb + needed_mb > config.MODEL_MEMORY_BUDGET_MB:
+            logger.warning(f"⚠️  Loaded models exceed MODEL_MEMORY_BUDGET_MB ({used_mb + needed_mb} MB estimated)")
+    
+    def warm_up(self) -> None:
+        """
+        Run one inference on a second of silence
+        
+        Pays for lazy initialisation (kernels, allocator, CTranslate2 thread
+        pools) before the worker reports ready instead of on the first job.
+        """
+        start_time = time.time()
+        self.get_backend().transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), config.WHISPER_LANGUAGE)
+        logger.info(f"🔥 Warm-up inference took {time.time() - start_time:.2f}s")
+    
+    def transcribe_batch(
+        self,
+        audios: List[np.ndarray],
+        model_name: Optional[str] = None,
+        language: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Transcribe several short in-memory clips in one backend call
+        
+        Args:
+            audios: 16 kHz float32 PCM clips
+            model_name: Whisper model to use (None = the default model)
+            language: Spoken language (None = config.WHISPER_LANGUAGE, LANGUAGE_AUTO = detect)
+            
+        Returns:
+            One transcript dict per clip, in order (same format as transcribe)
+        """
+        try:
+            audio_duration = sum(len(audio) for audio in audios) / SAMPLE_RATE
+            logger.info(f"🎙️  Transcribing batch: {len(audios)} clips, {audio_duration:.1f}s total")
+            
+            backend = self.get_backend(model_name)
+            start_time = time.time()
+            results = backend.transcribe_batch(audios, resolve_language(language))
+            elapsed = time.time() - start_time
+            
+            self.last_rtf = elapsed / audio_duration if audio_duration else None
+            metrics.INFERENCE_SECONDS.labels(backend.name, backend.model_name).observe(elapsed)
+            if self.last_rtf is not None:
+                metrics.REAL_TIME_FACTOR.labels(backend.name, backend.model_name).observe(self.last_rtf)
+            
+            logger.info(f"✅ Batch transcription complete: {len(audios)} clips in {elapsed:.2f}s")
+            if self.last_rtf is not None:
+                logger.info(f"   Real-time factor: {self.last_rtf:.3f} ({backend.name}/{backend.model_name})")
+            
+            return [postprocess(result) for result in results]
+            
+        except Exception as e:
+            logger.error(f"❌ Batch transcription failed: {str(e)}")
+            raise
+    
+    def transcribe_stream(
+        self,
+        audio: np.ndarray,
+        model_name: Optional[str] = None,
+        language: Optional[str] = None
+    ) -> 'TranscriptStream':
+        """
+        Transcribe in-memory PCM, yielding segments as they're decoded
+        
+        Args:
+            audio: 16 kHz float32 PCM
+            model_name: Whisper model to use (None = the default model)
+            language: Spoken language (None = config.WHISPER_LANGUAGE, LANGUAGE_AUTO = detect)
+            
+        Returns:
+            TranscriptStream: iterate for segments, then read `.result`
+        """
+        logger.info(f"🎙️  Streaming transcription: {len(audio) / SAMPLE_RATE:.1f}s in-memory PCM")
+        return TranscriptStream(self, self.get_backend(model_name), audio, resolve_language(language))
+    
+    def transcribe(
+        self,
+        audio: Union[str, np.ndarray],
+        model_name: Optional[str] = None,
+        language: Optional[str] = None
+    ) -> Dict:
         """
         Transcribe audio file using Whisper
         
         Args:
-            audio_path: Path to audio file
+            audio: Path to audio file, or 16 kHz float32 PCM already in memory
+            model_name: Whisper model to use (None = the default model)
+            language: Spoken language (None = config.WHISPER_LANGUAGE, LANGUAGE_AUTO = detect)
             
         Returns:
             Dictionary with transcription results:
             {
                 'text': str,              # Full transcript
-                'segments': List[Dict],   # Segments with timestamps
+                'segments': List[Dict],   # Segments with timestamps, token log-probs (and words)
                 'language': str,          # Detected language
-                'confidence': float       # Average confidence (0-1)
+                'confidence': float       # Geometric-mean token probability (0-1)
             }
         """
         try:
-            logger.info(f"🎙️  Transcribing audio: {audio_path}")
+            if isinstance(audio, np.ndarray):
+                logger.info(f"🎙️  Transcribing audio: {len(audio) / SAMPLE_RATE:.1f}s in-memory PCM")
+            else:
+                logger.info(f"🎙️  Transcribing audio: {audio}")
+                audio = decode_file(audio)
             
-            # Transcribe with Whisper
-            result = self.model.transcribe(
-                audio_path,
-                language=config.WHISPER_LANGUAGE,
-                task='transcribe',
-                fp16=(self.device == 'cuda'),  # Use FP16 on GPU for speed
-                verbose=False
-            )
+            # Transcribe with the configured backend
+            backend = self.get_backend(model_name)
+            start_time = time.time()
+            result = backend.transcribe(audio, resolve_language(language))
+            elapsed = time.time() - start_time
             
-            # Extract segments with timestamps
-            segments = []
-            total_confidence = 0.0
-            
-            for segment in result['segments']:
-                segments.append({
-                    'start': segment['start'],
-                    'end': segment['end'],
-                    'text': segment['text'].strip(),
-                    'confidence': segment.get('no_speech_prob', 0.0)
-                })
-                total_confidence += segment.get('no_speech_prob', 0.0)
-            
-            # Calculate average confidence (inverse of no_speech_prob)
-            avg_confidence = 1.0 - (total_confidence / len(segments)) if segments else 0.0
-            
-            transcript_result = {
-                'text': result['text'].strip(),
-                'segments': segments,
-                'language': result['language'],
-                'confidence': round(avg_confidence, 3)
-            }
+            # Seconds of compute per second of audio (< 1 is faster than real time)
+            audio_duration = len(audio) / SAMPLE_RATE
+            self.last_rtf = elapsed / audio_duration if audio_duration else None
+            
+            metrics.INFERENCE_SECONDS.labels(backend.name, backend.model_name).observe(elapsed)
+            if self.last_rtf is not None:
+                metrics.REAL_TIME_FACTOR.labels(backend.name, backend.model_name).observe(self.last_rtf)
+            
+            transcript_result = postprocess(result)
+            segments = transcript_result['segments']
             
             logger.info(f"✅ Transcription complete:")
             logger.info(f"   Language: {transcript_result['language']}")
             logger.info(f"   Segments: {len(segments)}")
             logger.info(f"   Confidence: {transcript_result['confidence']:.1%}")
+            if self.last_rtf is not None:
+                logger.info(f"   Real-time factor: {self.last_rtf:.3f} ({backend.name}/{backend.model_name})")
             logger.info(f"   Text length: {len(transcript_result['text'])} chars")
             logger.info(f"   Preview: {transcript_result['text'][:100]}...")
             
@@ -89,3 +667,42 @@ class WhisperService:
         except Exception as e:
             logger.error(f"❌ Transcription failed: {str(e)}")
             raise
+
+class TranscriptStream:
+    """
+    Segments of one transcription, produced as the backend decodes them
+    
+    Iterating yields segments in the saved format ({start, end, text,
+    confidence, ...}); once the iteration finishes, `result` holds the same
+    transcript dict WhisperService.transcribe returns.
+    """
+    
+    def __init__(self, service: WhisperService, backend: WhisperBackend, audio: np.ndarray, language: Optional[str]):
+        self.service = service
+        self.backend = backend
+        self.audio = audio
+        self.language = language  # Backend language (None = detect)
+        self.result = None
+    
+    def __iter__(self) -> Iterator[Dict]:
+        raw_segments, language = [], self.language
+        start_time = time.time()
+        
+        for language, segments in self.backend.transcribe_stream(self.audio, self.language):
+            raw_segments.extend(segments)
+            for segment in segments:
+                yield format_segment(segment)
+        
+        elapsed = time.time() - start_time
+        audio_duration = len(self.audio) / SAMPLE_RATE
+        self.service.last_rtf = elapsed / audio_duration if audio_duration else None
+        metrics.INFERENCE_SECONDS.labels(self.backend.name, self.backend.model_name).observe(elapsed)
+        if self.service.last_rtf is not None:
+            metrics.REAL_TIME_FACTOR.labels(self.backend.name, self.backend.model_name).observe(self.service.last_rtf)
+        
+        self.result = postprocess({
+            'text': ''.join(segment['text'] for segment in raw_segments),
+            'segments': raw_segments,
+            'language': language or 'en'  # Nothing decoded (silence) and no language configured
+        })
+        logger.info(f"✅ Streaming transcription complete: {len(raw_segments)} segments in {elapsed:.2f}s")
@@ -4,98 +4,554 @@ Processes audio files from S3 using Whisper AI
 """
 import os
 import time
-from typing import Dict
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
 from logger import logger
 from s3_service import S3Service
 from database_service import DatabaseService
-from whisper_service import WhisperService
-from queue_service import QueueService
+from whisper_service import WhisperService, LANGUAGE_AUTO
+from queue_service import QueueService, JobDeferred, JobPoisoned
+from micro_batcher import MicroBatcher
+from model_policy import choose_model, upgrade_job
+from scheduler import LaneScheduler, LANE_LONG, LANE_SHORT, choose_lane
+from chunked_transcriber import ChunkedTranscriber
+from transcript_cache import TranscriptCache
+from embedding_index import EmbeddingIndex, EmbeddingService
+from metrics import start_metrics_server
+from progress_publisher import ProgressPublisher
+from readiness import mark_ready, mark_not_ready
+from silence_trimmer import OffsetMap, trim_silence
+from audio_utils import decode_file, duration_of
+from language_router import LanguageRouter, route
+from memory_guard import MemoryGuard, PLAN_CHUNKED, PLAN_DEFER, PLAN_REJECT, peak_rss_mb, reset_peak_rss
+import metrics
 import config
 
 class TranscriptionWorker:
-    def __init__(self):
-        """Initialize worker with all services"""
-        self.s3_service = S3Service()
-        self.db_service = DatabaseService()
-        self.whisper_service = WhisperService()
-        self.queue_service = QueueService()
+    def __init__(self, num_threads: Optional[int] = None, consumer: bool = True):
+        """
+        Initialize worker with all services
+        
+        Args:
+            num_threads: torch thread count for the Whisper model (None = default)
+            consumer: Consume from RabbitMQ; False in pool children, which only
+                run process_job for the supervisor (no queue, batcher or pipeline)
+        """
+        # Load and warm up the model while S3 and PostgreSQL connect
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-load') as loader:
+            model = loader.submit(self._load_whisper, num_threads)
+            self.s3_service = S3Service()
+            self.db_service = DatabaseService()
+            self.whisper_service = model.result()
+        self.chunked_transcriber = (
+            ChunkedTranscriber(self.whisper_service, self.db_service)
+            if config.LONG_FORM_ENABLED else None
+        )
+        self.transcript_cache = (
+            TranscriptCache(self.db_service) if config.TRANSCRIPT_CACHE_ENABLED else None
+        )
+        self.embedding_index = (
+            EmbeddingIndex(EmbeddingService()) if config.EMBEDDINGS_ENABLED else None
+        )
+        self.progress_publisher = ProgressPublisher() if config.STREAMING_ENABLED else None
+        self.language_router = (
+            LanguageRouter(self.whisper_service, self.db_service) if config.LANGUAGE_ROUTING_ENABLED else None
+        )
+        # Created after the model loads so its baseline includes the model
+        self.memory_guard = MemoryGuard() if config.MEMORY_ADMISSION_ENABLED else None
+        
+        # Micro-batching: several job threads download/decode concurrently and
+        # their short clips share one batched forward pass on a single
+        # inference thread
+        self.micro_batcher = None
+        if consumer and config.MICRO_BATCH_SIZE > 1:
+            self.micro_batcher = MicroBatcher(self.whisper_service)
+            self.job_executor = ThreadPoolExecutor(
+                max_workers=config.MICRO_BATCH_SIZE, thread_name_prefix='job'
+            )
+        
+        # Pipelined mode: a single download thread prefetches audio while a
+        # single transcription thread runs Whisper. Both are FIFO, so slots are
+        # always acquired in the order jobs will be transcribed.
+        self.pipeline_enabled = consumer and config.PIPELINE_ENABLED and self.micro_batcher is None
+        if not consumer:
+            self.queue_service = None
+        elif self.micro_batcher:
+            self.queue_service = QueueService(
+                prefetch_count=max(config.RABBITMQ_PREFETCH, config.MICRO_BATCH_SIZE)
+            )
+        elif self.pipeline_enabled:
+            self.download_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch')
+            self.transcribe_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='transcribe')
+            self.prefetch_slots = threading.BoundedSemaphore(config.PREFETCH_MAX_FILES)
+            self.queue_service = QueueService(
+                prefetch_count=max(config.RABBITMQ_PREFETCH, config.PREFETCH_MAX_FILES + 1)
+            )
+        else:
+            self.queue_service = QueueService()
+        
+        self.scheduler = None  # Set when consuming through priority lanes
+        
+        # (media_id, operation) of running jobs whose start was counted (JOB_CRASH_LIMIT)
+        self._attempts = set()
+        self._attempts_lock = threading.Lock()
         
         # Ensure temp directory exists
         os.makedirs(config.TEMP_DIR, exist_ok=True)
     
-    def process_job(self, job: Dict):
+    def _load_whisper(self, num_threads: Optional[int]) -> WhisperService:
+        """Load the model and run the warm-up inference"""
+        whisper_service = WhisperService(num_threads=num_threads)
+        if config.WARMUP_ENABLED:
+            whisper_service.warm_up()
+        return whisper_service
+    
+    def _audio_path(self, media_id: str) -> str:
+        """Temp file path for a job's audio"""
+        return os.path.join(config.TEMP_DIR, f"{media_id}-audio.mp3")
+    
+    def _fetch_audio(self, job: Dict) -> Union[str, np.ndarray]:
+        """
+        Fetch a job's audio from S3
+        
+        Returns:
+            Decoded PCM when AUDIO_IN_MEMORY is set, else the temp file path
+        """
+        if config.AUDIO_IN_MEMORY:
+            return self.s3_service.download_pcm(job['s3Key'])
+        
+        audio_path = self._audio_path(job['mediaId'])
+        self.s3_service.download_file(job['s3Key'], audio_path)
+        return audio_path
+    
+    def _prefetch_audio(self, job: Dict) -> Union[str, np.ndarray]:
+        """
+        Download a job's audio ahead of transcription (pipelined mode)
+        
+        Blocks until one of PREFETCH_MAX_FILES slots is free. The slot is
+        released by process_job once the audio has been cleaned up.
+        """
+        self.prefetch_slots.acquire()
+        return self._fetch_audio(job)
+    
+    def _content_id(self, audio: Union[str, np.ndarray]) -> str:
+        """SHA-256 of downloaded audio (used when S3 has no ETag)"""
+        digest = hashlib.sha256()
+        if isinstance(audio, np.ndarray):
+            digest.update(audio.data)
+        else:
+            with open(audio, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+        return f"sha256:{digest.hexdigest()}"
+    
+    def _transcribe(
+        self,
+        media: Dict,
+        audio: Union[str, np.ndarray],
+        model_name: str,
+        chunked: bool = False,
+        language: Optional[str] = None
+    ) -> Tuple[Dict, bool]:
+        """
+        Transcribe a job's audio, trimming silence first when enabled
+        
+        Args:
+            chunked: Force the long-form path (memory admission chose it)
+            language: Spoken language (None = config.WHISPER_LANGUAGE, LANGUAGE_AUTO = detect)
+        
+        Returns:
+            (transcript dict on the original media timeline, whether the long-form path was used)
+        """
+        if not config.SILENCE_TRIM_ENABLED:
+            return self._transcribe_audio(media, audio, model_name, chunked=chunked, language=language)
+        
+        pcm = audio if isinstance(audio, np.ndarray) else decode_file(audio)
+        trimmed, offset_map = trim_silence(pcm)
+        if offset_map is None:
+            return self._transcribe_audio(media, pcm, model_name, chunked=chunked, language=language)
+        
+        # Path choice (micro-batch, streaming, chunked) follows the audio actually transcribed
+        trimmed_media = {**media, 'duration': duration_of(trimmed)}
+        result, long_form = self._transcribe_audio(trimmed_media, trimmed, model_name, offset_map, chunked, language)
+        return offset_map.remap_result(result), long_form
+    
+    def _transcribe_audio(
+        self,
+        media: Dict,
+        audio: Union[str, np.ndarray],
+        model_name: str,
+        offset_map: Optional[OffsetMap] = None,
+        chunked: bool = False,
+        language: Optional[str] = None
+    ) -> Tuple[Dict, bool]:
+        """
+        Transcribe audio, batching short clips when micro-batching is on
+        
+        Returns:
+            (transcript dict, whether the long-form path was used)
+        """
+        if self.micro_batcher is None:
+            return self._transcribe_direct(media, audio, model_name, offset_map, chunked, language)
+        
+        duration = media.get('duration')
+        if not chunked and duration is not None and duration <= config.MICRO_BATCH_MAX_DURATION:
+            # Decode on this job thread so clips are ready when the batch forms
+            pcm = audio if isinstance(audio, np.ndarray) else decode_file(audio)
+            return self.micro_batcher.transcribe(pcm, model_name, language), False
+        
+        return self.micro_batcher.run(
+            lambda: self._transcribe_direct(media, audio, model_name, offset_map, chunked, language)
+        )
+    
+    def _transcribe_direct(
+        self,
+        media: Dict,
+        audio: Union[str, np.ndarray],
+        model_name: str,
+        offset_map: Optional[OffsetMap] = None,
+        chunked: bool = False,
+        language: Optional[str] = None
+    ) -> Tuple[Dict, bool]:
+        """
+        Transcribe a job's audio, using the chunked or streaming path for long media
+        
+        Args:
+            offset_map: Set when audio was trimmed; streamed partial segments are
+                remapped with it (the caller remaps the final result)
+            chunked: Use the chunked path whatever the duration (bounds memory)
+            language: Spoken language (None = config.WHISPER_LANGUAGE, LANGUAGE_AUTO = detect)
+        
+        Returns:
+            (transcript dict, whether the long-form path was used)
+        """
+        if self.chunked_transcriber is None and self.progress_publisher is None:
+            return self.whisper_service.transcribe(audio, model_name, language), False
+        
+        # Prefer the duration recorded by media-worker; decode only if it's missing
+        duration = media.get('duration')
+        pcm = audio if isinstance(audio, np.ndarray) else None
+        if duration is None:
+            pcm = pcm if pcm is not None else decode_file(audio)
+            duration = duration_of(pcm)
+        
+        if self.chunked_transcriber and (chunked or duration >= config.LONG_FORM_MIN_DURATION):
+            pcm = pcm if pcm is not None else decode_file(audio)
+            on_progress = (lambda progress: self._report_progress(media, progress)) if self.progress_publisher else None
+            return self.chunked_transcriber.transcribe(media['id'], pcm, model_name, on_progress, language), True
+        
+        if self.progress_publisher and duration >= config.STREAM_MIN_DURATION:
+            pcm = pcm if pcm is not None else decode_file(audio)
+            return self._transcribe_streaming(media, pcm, model_name, offset_map, language), False
+        
+        return self.whisper_service.transcribe(pcm if pcm is not None else audio, model_name, language), False
+    
+    def _report_progress(self, media: Dict, progress: int, segments: Optional[List[Dict]] = None, first_index: int = 0):
+        """
+        Persist partial progress and publish it (best effort: never fails the job)
+        
+        Args:
+            media: Media record
+            progress: Percent transcribed
+            segments: New partial segments to make searchable now
+            first_index: Transcript index of segments[0]
+        """
+        try:
+            if segments:
+                self.db_service.append_segments(media['id'], first_index, segments, progress)
+            else:
+                self.db_service.update_media_progress(media['id'], progress)
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to save partial progress: {str(e)}")
+        self.progress_publisher.publish(media, progress, segments=segments, first_index=first_index)
+    
+    def _transcribe_streaming(
+        self,
+        media: Dict,
+        pcm: np.ndarray,
+        model_name: str,
+        offset_map: Optional[OffsetMap] = None,
+        language: Optional[str] = None
+    ) -> Dict:
+        """
+        Transcribe long media, writing segments as they're decoded
+        
+        Segments are flushed every STREAM_BATCH_SEGMENTS segments or
+        STREAM_FLUSH_INTERVAL seconds, so the first text is searchable long
+        before the job finishes.
+        """
+        duration = offset_map.original_duration if offset_map else duration_of(pcm)
+        stream = self.whisper_service.transcribe_stream(pcm, model_name, language)
+        pending, written = [], 0
+        last_flush = time.monotonic()
+        
+        for segment in stream:
+            pending.append(segment)
+            if (len(pending) >= config.STREAM_BATCH_SEGMENTS
+                    or time.monotonic() - last_flush >= config.STREAM_FLUSH_INTERVAL):
+                if offset_map:
+                    pending = offset_map.remap_segments(pending)
+                # Capped below 100: only complete_transcript marks the media done
+                progress = min(99, int(pending[-1]['end'] / duration * 100)) if duration else 0
+                self._report_progress(media, progress, pending, written)
+                logger.info(f"📤 Streamed {written + len(pending)} segments ({progress}%)")
+                written += len(pending)
+                pending = []
+                last_flush = time.monotonic()
+        
+        # The remainder is written by complete_transcript with the full transcript
+        return stream.result
+    
+    def submit_job(self, job: Dict) -> Future:
+        """
+        Schedule a job in pipelined or micro-batching mode
+        
+        Pipelined: the download starts immediately; transcription starts
+        once the previous job has finished with the model. Micro-batching:
+        the whole job runs on one of MICRO_BATCH_SIZE job threads.
+        """
+        if self.micro_batcher:
+            return self.job_executor.submit(self.process_job, job)
+        
+        download = self.download_executor.submit(self._prefetch_audio, job)
+        return self.transcribe_executor.submit(self.process_job, job, download)
+    
+    def _choose_model(self, job: Dict, media: Dict) -> Tuple[str, bool]:
+        """Model for this job, and whether to queue an upgrade afterwards"""
+        if job.get('model'):
+            return job['model'], False
+        
+        quality = None
+        if config.ADAPTIVE_MODELS_ENABLED:
+            quality = self.db_service.get_project_quality(media['project_id'])
+        return choose_model(media.get('duration'), job.get('queueDepth'), quality)
+    
+    def _route_language(self, model_name: str, detected: Tuple[str, float]) -> Tuple[str, str]:
+        """Model and language for a job from its detected (language, probability)"""
+        routed_model, language = route(model_name, *detected)
+        logger.info(
+            f"🌐 Language: {detected[0]} ({detected[1]:.0%}) → model {routed_model}"
+            + (" (uncertain, the model detects again)" if language == LANGUAGE_AUTO else "")
+        )
+        return routed_model, language
+    
+    def process_job(self, job: Dict, prefetched: Optional[Future] = None) -> Optional[Dict]:
         """
         Process a transcription job
         
+        Args:
+            job: Job payload (format below)
+            prefetched: Future of a background download started by submit_job
+        
         Job format:
         {
             'mediaId': str,
             'userId': str,
             'projectId': str,
             's3Key': str,  # Audio S3 key (from media-worker)
-            'operation': 'transcribe'
+            'operation': 'transcribe',  # or 'upgrade' (re-transcribe with 'model')
+            'model': str,  # Optional: skip the model policy
+            'queueDepth': int  # Optional: stamped by the consumer for the model policy
         }
+        
+        Returns:
+            Follow-up upgrade job if a fast model was used under load, else None
         """
         media_id = job['mediaId']
-        audio_s3_key = job['s3Key']
+        upgrade = job.get('operation') == 'upgrade'
+        operation = job.get('operation') or 'transcribe'
         
         logger.info(f"🎯 Processing transcription job: {media_id}")
         
-        # Temp file path
-        audio_path = os.path.join(config.TEMP_DIR, f"{media_id}-audio.mp3")
+        # Temp file path (never written in AUDIO_IN_MEMORY mode)
+        audio_path = self._audio_path(media_id)
         
         try:
+            # A job whose earlier starts never settled took its worker down with it
+            # (usually an OOM kill): fail it instead of crashing the next worker too
+            if config.JOB_CRASH_LIMIT > 0:
+                crashes = self.db_service.start_job_attempt(media_id, operation) - 1
+                with self._attempts_lock:
+                    self._attempts.add((media_id, operation))
+                if crashes >= config.JOB_CRASH_LIMIT:
+                    raise JobPoisoned(f"Job crashed {crashes} workers (likely out of memory)")
+            
             # Step 1: Get media info
             logger.info("📋 Step 1/4: Fetching media info...")
             media = self.db_service.get_media(media_id)
             if not media:
                 raise Exception(f"Media not found: {media_id}")
             
-            # Step 2: Download audio from S3
-            logger.info("📥 Step 2/4: Downloading audio from S3...")
-            self.s3_service.download_file(audio_s3_key, audio_path)
+            model_name, upgrade_later = self._choose_model(job, media)
+            if model_name != config.WHISPER_MODEL or upgrade:
+                logger.info(f"🧠 Model: {model_name}" + (" (upgrade)" if upgrade else ""))
             
-            # Step 3: Transcribe with Whisper
-            logger.info("🎙️  Step 3/4: Transcribing with Whisper AI...")
-            start_time = time.time()
+            # Language prefilter: a language detected by an earlier attempt routes the job right away
+            language, routed = None, self.language_router is None
+            if self.language_router:
+                detected = self.language_router.cached(media_id)
+                if detected:
+                    model_name, language = self._route_language(model_name, detected)
+                    routed = True
             
-            result = self.whisper_service.transcribe(audio_path)
+            # Memory admission: run whole-file, fall back to the chunked path, or redeliver later
+            chunked, estimate_mb = False, None
+            if self.memory_guard:
+                plan, estimate_mb = self.memory_guard.admit(
+                    media_id,
+                    media.get('duration'),
+                    model_name,
+                    model_loaded=model_name in self.whisper_service.backends,
+                    can_chunk=self.chunked_transcriber is not None
+                )
+                if plan == PLAN_DEFER:
+                    raise JobDeferred(f"Needs ~{estimate_mb:.0f} MB, not available now")
+                if plan == PLAN_REJECT:
+                    raise JobPoisoned(
+                        f"Needs ~{estimate_mb:.0f} MB, over the {self.memory_guard.budget_mb:.0f} MB budget"
+                    )
+                if plan == PLAN_CHUNKED:
+                    logger.info(f"🧮 Using the chunked path to fit memory (~{estimate_mb:.0f} MB)")
+                    chunked = True
             
-            transcription_time = time.time() - start_time
-            logger.info(f"⏱️  Transcription took {transcription_time:.2f} seconds")
+            # Identical audio seen before? The S3 ETag lets us skip the download too
+            # (the key includes model and language, so not before the language is known)
+            result, cache_key, long_form = None, None, False
+            transcription_time = 0.0
+            etag = None
+            if self.transcript_cache:
+                etag = self.s3_service.get_etag(job['s3Key'])
+                if etag and routed:
+                    cache_key = TranscriptCache.make_key(f"etag:{etag}", model_name, language)
+                    result = self.transcript_cache.get(cache_key)
             
-            # Step 4: Save to database
-            logger.info("💾 Step 4/4: Saving transcript to database...")
-            transcript_id = self.db_service.save_transcript(
-                media_id=media_id,
-                text=result['text'],
-                segments=result['segments'],
-                language=result['language'],
-                confidence=result['confidence']
-            )
+            if result is None:
+                # Step 2: Download audio from S3 (or wait for the prefetch)
+                if prefetched is not None:
+                    logger.info("📥 Step 2/4: Waiting for prefetched audio...")
+                    audio = prefetched.result()
+                else:
+                    logger.info("📥 Step 2/4: Downloading audio from S3...")
+                    audio = self._fetch_audio(job)
+                
+                if not routed:
+                    # The detection model runs on the inference thread like every other model call
+                    detected = self.language_router.detect(
+                        media_id, audio, run=self.micro_batcher.run if self.micro_batcher else None
+                    )
+                    model_name, language = self._route_language(model_name, detected)
+                
+                if self.transcript_cache and cache_key is None:
+                    content_id = f"etag:{etag}" if etag else self._content_id(audio)
+                    cache_key = TranscriptCache.make_key(content_id, model_name, language)
+                    result = self.transcript_cache.get(cache_key)
             
-            # Update media status to COMPLETE
-            self.db_service.update_media_status(media_id, 'complete')
+            if result is None:
+                # Step 3: Transcribe with Whisper
+                logger.info("🎙️  Step 3/4: Transcribing with Whisper AI...")
+                start_time = time.time()
+                reset_peak_rss()
+                
+                result, long_form = self._transcribe(media, audio, model_name, chunked, language)
+                
+                transcription_time = time.time() - start_time
+                logger.info(f"⏱️  Transcription took {transcription_time:.2f} seconds")
+                peak_mb = peak_rss_mb()
+                if peak_mb:
+                    metrics.JOB_PEAK_RSS_BYTES.observe(peak_mb * 1024 * 1024)
+                    if estimate_mb is not None:
+                        logger.info(f"🧮 Peak RSS {peak_mb:.0f} MB (estimated {estimate_mb:.0f} MB)")
+                
+                if self.transcript_cache:
+                    self.transcript_cache.put(cache_key, result)
+            else:
+                logger.info("♻️  Step 2-3/4: Reusing cached transcript")
+            
+            # Step 4: Save transcript and mark media COMPLETE in one commit
+            # (chunk checkpoints are only needed until the transcript is saved)
+            logger.info("💾 Step 4/4: Saving transcript to database...")
+            if upgrade:
+                # The fast transcript stays unless this one replaces it
+                if not self.db_service.upgrade_transcript(
+                    media_id=media_id,
+                    text=result['text'],
+                    segments=result['segments'],
+                    language=result['language'],
+                    confidence=result['confidence'],
+                    model=model_name,
+                    clear_chunks=long_form
+                ):
+                    logger.info(f"⏭️  No transcript to upgrade for media {media_id}")
+                    return None
+                transcript_id = None
+            else:
+                transcript_id = self.db_service.complete_transcript(
+                    media_id=media_id,
+                    text=result['text'],
+                    segments=result['segments'],
+                    language=result['language'],
+                    confidence=result['confidence'],
+                    clear_chunks=long_form,
+                    model=model_name
+                )
             
             logger.info(f"✅ Transcription complete!")
             logger.info(f"   Media ID: {media_id}")
-            logger.info(f"   Transcript ID: {transcript_id}")
+            logger.info(f"   Transcript ID: {transcript_id or 'upgraded in place'}")
+            logger.info(f"   Model: {model_name}")
+            
+            if self.progress_publisher and not upgrade:
+                self.progress_publisher.publish(media, 100, status='complete')
             logger.info(f"   Language: {result['language']}")
             logger.info(f"   Duration: {transcription_time:.2f}s")
             logger.info(f"   Segments: {len(result['segments'])}")
             
+            # Optional: semantic index (the transcript is already committed, so never fail here)
+            if self.embedding_index:
+                try:
+                    self.embedding_index.add_media(media['project_id'], media_id, result['segments'])
+                except Exception as e:
+                    logger.warning(f"⚠️  Failed to index segment embeddings: {str(e)}")
+            
+            return upgrade_job(job) if upgrade_later else None
+            
+        except JobDeferred as e:
+            # Not a failure: the media stays in its current status until redelivery
+            logger.info(f"⏳ Deferring job {media_id}: {str(e)}")
+            raise
+            
         except Exception as e:
             logger.error(f"❌ Job failed: {str(e)}")
             
-            # Update media status to FAILED
-            try:
-                self.db_service.update_media_status(media_id, 'failed', str(e))
-            except:
-                pass
+            # Update media status to FAILED (a failed upgrade leaves the existing transcript)
+            if not upgrade:
+                try:
+                    self.db_service.update_media_status(media_id, 'failed', str(e))
+                except:
+                    pass
             
             raise
         
         finally:
+            if self.memory_guard:
+                self.memory_guard.release(media_id)
+            
+            # The job settled (even by failing), so it didn't crash the worker
+            if config.JOB_CRASH_LIMIT > 0:
+                with self._attempts_lock:
+                    self._attempts.discard((media_id, operation))
+                try:
+                    self.db_service.finish_job_attempt(media_id, operation)
+                except Exception as e:
+                    logger.warning(f"⚠️  Failed to clear job attempts: {str(e)}")
+            
+            # Never delete a file the prefetch thread is still writing
+            if prefetched is not None:
+                wait([prefetched])
+            
             # Cleanup temp file
             if os.path.exists(audio_path):
                 try:
@@ -103,6 +559,10 @@ class TranscriptionWorker:
                     logger.info(f"🗑️  Cleaned up temp file: {audio_path}")
                 except Exception as e:
                     logger.warning(f"⚠️  Failed to cleanup temp file: {str(e)}")
+            
+            # Free the disk slot for the next prefetch
+            if prefetched is not None:
+                self.prefetch_slots.release()
     
     def start(self):
         """Start the worker"""
@@ -114,15 +574,31 @@ class TranscriptionWorker:
         logger.info("🚀 Starting Transcription Worker...")
         
         try:
+            start_metrics_server()
+            
             # Connect to RabbitMQ
             self.queue_service.connect()
             
+            # Model is loaded and warmed up (in __init__), queue is connected
+            mark_ready()
+            
             logger.info("✅ Worker initialized")
             logger.info("🎬 Transcription Worker started - waiting for jobs...")
             logger.info("")
             
             # Start consuming jobs
-            self.queue_service.consume(self.process_job)
+            if config.LANES_ENABLED:
+                if self.pipeline_enabled:
+                    logger.warning("⚠️  PIPELINE_ENABLED is ignored when LANES_ENABLED is set")
+                self.start_lanes()
+            elif self.micro_batcher:
+                logger.info(f"📦 Micro-batching clips ≤{config.MICRO_BATCH_MAX_DURATION}s")
+                self.queue_service.consume_concurrent(self.submit_job)
+            elif self.pipeline_enabled:
+                logger.info(f"🔀 Pipelined mode: up to {config.PREFETCH_MAX_FILES} audio files prefetched")
+                self.queue_service.consume_concurrent(self.submit_job)
+            else:
+                self.queue_service.consume(self.process_job)
             
         except KeyboardInterrupt:
             logger.info("")
@@ -133,12 +609,57 @@ class TranscriptionWorker:
             self.stop()
             raise
     
+    def route_job(self, job: Dict) -> str:
+        """Assign a job to a lane by its media duration"""
+        return choose_lane(self.db_service.get_media(job['mediaId']))
+    
+    def start_lanes(self):
+        """
+        Consume through short/long lanes on a single slot
+        
+        One process has one model, so a running long job can't be
+        preempted; lanes still put every queued short job ahead of
+        queued long ones.
+        """
+        self.scheduler = LaneScheduler(
+            self.process_job, slots=config.MICRO_BATCH_SIZE if self.micro_batcher else 1
+        )
+        self.scheduler.start()
+        logger.info(f"🚦 Priority lanes: ≤{config.SHORT_JOB_MAX_DURATION}s jobs run first")
+        self.queue_service.consume_lanes(
+            self.route_job,
+            self.scheduler.submit,
+            {LANE_SHORT: max(config.RABBITMQ_PREFETCH, 1), LANE_LONG: 1}
+        )
+    
     def stop(self):
         """Stop the worker gracefully"""
         logger.info("🛑 Shutting down Transcription Worker...")
+        mark_not_ready()
+        
+        # Before waiting on running jobs: if the stop grace period runs out,
+        # they must not count as crashes on redelivery
+        with self._attempts_lock:
+            running = list(self._attempts)
+        try:
+            self.db_service.release_job_attempts(running)
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to release job attempts: {str(e)}")
         
         try:
             self.queue_service.disconnect()
+            if self.scheduler:
+                self.scheduler.shutdown()
+            if self.micro_batcher:
+                self.job_executor.shutdown(wait=True, cancel_futures=True)
+                self.micro_batcher.shutdown()
+            if self.pipeline_enabled:
+                self.download_executor.shutdown(wait=True, cancel_futures=True)
+                self.transcribe_executor.shutdown(wait=True, cancel_futures=True)
+            if self.chunked_transcriber:
+                self.chunked_transcriber.shutdown()
+            if self.progress_publisher:
+                self.progress_publisher.close()
             self.db_service.disconnect()
         except Exception as e:
             logger.error(f"❌ Error during shutdown: {str(e)}")
@@ -0,0 +1,366 @@
+"""
+Multi-process Transcription Pool
+Supervisor consumes jobs from RabbitMQ and fans them out to child processes
+"""
+import os
+import time
+import queue
+import weakref
+import functools
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Set, Tuple
+from logger import logger
+from queue_service import QueueService, JobInterrupted
+from database_service import DatabaseService
+from scheduler import LaneScheduler, LANE_LONG, LANE_SHORT, choose_lane, long_slot_limit
+from whisper_service import ensure_model_downloaded
+from language_router import english_model, multilingual_model
+from metrics import start_metrics_server
+from readiness import mark_ready, mark_not_ready
+import config
+
+# Per-child worker, created once by the pool initializer
+_child_worker = None
+# This child's slot in the executor's running table, and the table's job numbers
+_child_slot = None
+_child_jobs = None
+
+def _init_child(num_threads: int, ready, pids, jobs):
+    """Build a job-only TranscriptionWorker (no queue connection) inside a freshly spawned child"""
+    global _child_worker, _child_slot, _child_jobs
+    
+    # Cap BLAS/OpenMP threads before torch spins up its thread pools
+    os.environ['OMP_NUM_THREADS'] = str(num_threads)
+    os.environ['MKL_NUM_THREADS'] = str(num_threads)
+    
+    with pids.get_lock():
+        _child_slot = list(pids).index(0)
+        pids[_child_slot] = os.getpid()
+    _child_jobs = jobs
+    
+    from worker import TranscriptionWorker
+    _child_worker = TranscriptionWorker(num_threads=num_threads, consumer=False)
+    logger.info(f"👷 Pool child {os.getpid()} ready ({num_threads} threads)")
+    ready.put(os.getpid())
+
+def _run_job(job: Dict, number: int) -> Optional[Dict]:
+    """Process one job in the child (download, transcribe, save); returns any follow-up job"""
+    # Published so the supervisor can tell which job was on a child that died
+    _child_jobs[_child_slot] = number
+    try:
+        return _child_worker.process_job(job)
+    finally:
+        _child_jobs[_child_slot] = 0
+
+def _attempt_key(job: Dict) -> Tuple[str, str]:
+    """(media_id, operation) of a job's row in job_attempts"""
+    return job['mediaId'], job.get('operation') or 'transcribe'
+
+def _ping() -> int:
+    """No-op task used to wait for children to finish loading"""
+    return os.getpid()
+
+class TranscriptionPool:
+    def __init__(self):
+        """Initialize supervisor (children are spawned on start)"""
+        self.pool_size = config.WORKER_POOL_SIZE
+        self.num_threads = config.WORKER_THREADS_PER_CHILD
+        
+        # Keep at least one job in flight per child
+        self.queue_service = QueueService(
+            prefetch_count=max(config.RABBITMQ_PREFETCH, self.pool_size)
+        )
+        self.executor = None
+        self.scheduler = None  # Lane scheduler (LANES_ENABLED)
+        self.db_service = None  # Media lookups for lane routing
+        
+        # A dead child breaks the whole executor; jobs submitted while it is
+        # being replaced wait here (still unacked) instead of bouncing
+        self._lock = threading.Lock()
+        self._restarting = False
+        self._stopping = False
+        self._waiting: List[Tuple[Dict, Future]] = []
+        self._sent: Dict[Future, Tuple[Dict, int]] = {}  # Child future → (job, job number), until it settles
+        self._numbers = itertools.count(1)
+        # Executor → (child pid, number of the job it is running) per slot, shared with its children
+        self._running = weakref.WeakKeyDictionary()
+        self._crashes = weakref.WeakKeyDictionary()  # Broken executor → _running_jobs() when it broke
+    
+    def _spawn(self) -> ProcessPoolExecutor:
+        """Start pool_size children and wait until each has loaded its model"""
+        # 'spawn' avoids forking a parent that may already hold torch thread state
+        context = multiprocessing.get_context('spawn')
+        ready = context.Queue()  # Each child's pid, once its initializer has finished
+        pids = context.Array('i', self.pool_size)
+        jobs = context.Array('q', self.pool_size)  # 0 = idle
+        executor = ProcessPoolExecutor(
+            max_workers=self.pool_size,
+            mp_context=context,
+            initializer=_init_child,
+            initargs=(self.num_threads, ready, pids, jobs)
+        )
+        self._running[executor] = (pids, jobs)
+        
+        # Pings make the executor start every child (it spawns on demand), but
+        # one fast child may answer all of them: wait for every child's report.
+        # A child that fails to load breaks the executor, which fails the pings.
+        try:
+            pings = [executor.submit(_ping) for _ in range(self.pool_size)]
+            children = set()
+            while len(children) < self.pool_size:
+                try:
+                    children.add(ready.get(timeout=1.0))
+                except queue.Empty:
+                    for ping in pings:
+                        if ping.done() and ping.exception() is not None:
+                            raise ping.exception()
+        except Exception:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        return executor
+    
+    def submit(self, job: Dict) -> Future:
+        """
+        Send a job to the next free child
+        
+        The returned future fails with JobInterrupted if the job's child
+        dies, so the message goes back to the broker (and the crash is
+        counted on redelivery) instead of using a retry.
+        """
+        future = Future()
+        with self._lock:
+            if self._restarting:
+                self._waiting.append((job, future))
+                return future
+            executor = self.executor
+        self._send(executor, job, future)
+        return future
+    
+    def _send(self, executor: ProcessPoolExecutor, job: Dict, future: Future):
+        """Submit a job to `executor`, relaying its outcome to `future`"""
+        number = next(self._numbers)
+        try:
+            child = executor.submit(_run_job, job, number)
+        except BrokenProcessPool:
+            # Nothing ran yet: hold the job until the pool is back
+            with self._lock:
+                self._waiting.append((job, future))
+            self._pool_broken(executor)
+            return
+        with self._lock:
+            self._sent[child] = (job, number)
+        child.add_done_callback(functools.partial(self._relay, executor, future))
+    
+    def _relay(self, executor: ProcessPoolExecutor, future: Future, child: Future):
+        """Copy a child future's outcome, turning a pool crash into JobInterrupted"""
+        with self._lock:
+            job, number = self._sent.pop(child, (None, 0))
+        if child.cancelled():
+            future.set_exception(JobInterrupted("Worker pool shut down before the job ran"))
+            return
+        error = child.exception()
+        if isinstance(error, BrokenProcessPool):
+            # Read once, before the restart shuts the broken executor down
+            with self._lock:
+                if executor not in self._crashes:
+                    self._crashes[executor] = self._running_jobs(executor)
+                running, crashed = self._crashes[executor]
+            self._pool_broken(executor)
+            # Only the job on the child that died is charged a crash. Its running
+            # siblings give their start back before the message is requeued.
+            if config.JOB_CRASH_LIMIT > 0 and job is not None and crashed and number in running - crashed:
+                self._release_attempts([_attempt_key(job)])
+            future.set_exception(JobInterrupted(f"Pool child died: {str(error)}"))
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(child.result())
+    
+    def _running_jobs(self, executor: ProcessPoolExecutor) -> Tuple[Set[int], Set[int]]:
+        """
+        Numbers of the jobs running on an executor's children, and of those whose child has exited
+        
+        A broken executor fails its futures before it terminates the
+        surviving children, so while the futures settle only the child that
+        died has an exit code. The second set is empty for an executor that
+        isn't broken, or if the culprit can't be told apart.
+        """
+        pids, jobs = self._running.get(executor, ((), ()))
+        processes = list((getattr(executor, '_processes', None) or {}).items())
+        exited = set()
+        if executor._broken:
+            # The dead child's pipe can close a moment before it can be reaped
+            deadline = time.monotonic() + 1.0
+            while not exited and time.monotonic() < deadline:
+                exited = {pid for pid, process in processes if process.exitcode is not None}
+                if not exited:
+                    time.sleep(0.02)
+        running = {number for number in jobs if number}
+        crashed = {number for pid, number in zip(pids, jobs) if number and pid in exited}
+        return running, crashed
+    
+    def _pool_broken(self, executor: ProcessPoolExecutor):
+        """Take the replica out of rotation and rebuild a broken executor (once)"""
+        with self._lock:
+            if self._stopping or self._restarting or executor is not self.executor:
+                return
+            self._restarting = True
+        mark_not_ready()
+        logger.error("💥 A pool child died; restarting the worker pool")
+        # Off the calling thread: it may be the RabbitMQ connection thread
+        threading.Thread(target=self._restart, args=(executor,), name='pool-restart', daemon=True).start()
+    
+    def _restart(self, broken: ProcessPoolExecutor):
+        """Replace the broken executor, then send the jobs that waited for it"""
+        broken.shutdown(wait=False, cancel_futures=True)
+        executor = None
+        while executor is None and not self._stopping:
+            try:
+                executor = self._spawn()
+            except Exception as e:
+                logger.error(f"❌ Failed to restart worker pool: {str(e)}")
+                time.sleep(config.RETRY_DELAY)
+        
+        with self._lock:
+            if executor is not None and self._stopping:
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = None
+            waiting, self._waiting = self._waiting, []
+            if executor is not None:
+                self.executor = executor
+            self._restarting = False
+        if executor is None:
+            for _, future in waiting:
+                future.set_exception(JobInterrupted("Worker pool shut down before the job ran"))
+            return
+        
+        mark_ready()
+        logger.info(f"✅ Worker pool restarted ({len(waiting)} waiting jobs)")
+        for job, future in waiting:
+            self._send(executor, job, future)
+    
+    def _run_in_child(self, job: Dict) -> Optional[Dict]:
+        """Run a job on a child and wait for it (called from a scheduler slot)"""
+        return self.submit(job).result()
+    
+    def route_job(self, job: Dict) -> str:
+        """Assign a job to a lane by its media duration"""
+        return choose_lane(self.db_service.get_media(job['mediaId']))
+    
+    def _consume_lanes(self):
+        """
+        Consume through short/long lanes, one scheduler slot per child
+        
+        Long jobs may occupy at most pool_size - SHORT_RESERVED_SLOTS
+        children, so a short clip always has a child to run on.
+        """
+        long_slots = long_slot_limit(self.pool_size)
+        self.db_service = self.db_service or DatabaseService()
+        self.scheduler = LaneScheduler(self._run_in_child, self.pool_size, long_slots)
+        self.scheduler.start()
+        logger.info(f"🚦 Priority lanes: ≤{config.SHORT_JOB_MAX_DURATION}s jobs run first, "
+                    f"{self.pool_size - long_slots} children reserved for them")
+        self.queue_service.consume_lanes(
+            self.route_job,
+            self.scheduler.submit,
+            {LANE_SHORT: max(config.RABBITMQ_PREFETCH, self.pool_size), LANE_LONG: long_slots}
+        )
+    
+    def start(self):
+        """Start the pool"""
+        logger.info("═" * 60)
+        logger.info("🎙️  SyncSearch Transcription Worker (pool mode)")
+        logger.info("    Whisper AI Transcription Service")
+        logger.info("═" * 60)
+        logger.info("")
+        logger.info(f"🚀 Starting {self.pool_size} workers x {self.num_threads} threads...")
+        
+        try:
+            # Fetch weights once so children only read from the cache
+            ensure_model_downloaded(config.WHISPER_MODEL)
+            if config.ADAPTIVE_MODELS_ENABLED:
+                ensure_model_downloaded(config.WHISPER_FAST_MODEL)
+            if config.LANGUAGE_ROUTING_ENABLED:
+                for model_name in {
+                    config.LANGUAGE_DETECT_MODEL,
+                    english_model(config.WHISPER_MODEL),
+                    multilingual_model(config.WHISPER_MODEL)
+                }:
+                    ensure_model_downloaded(model_name)
+            
+            self.executor = self._spawn()
+            
+            # Gives back the starts of jobs whose sibling child crashed
+            if config.JOB_CRASH_LIMIT > 0:
+                self.db_service = DatabaseService()
+            
+            start_metrics_server()
+            self.queue_service.connect()
+            
+            # Every child has loaded and warmed up its model (pings returned)
+            mark_ready()
+            
+            logger.info("✅ Worker pool initialized")
+            logger.info("🎬 Transcription Worker started - waiting for jobs...")
+            logger.info("")
+            
+            if config.LANES_ENABLED:
+                self._consume_lanes()
+            else:
+                self.queue_service.consume_concurrent(self.submit)
+            
+        except KeyboardInterrupt:
+            logger.info("")
+            logger.info("🛑 Received shutdown signal")
+            self.stop()
+        except Exception as e:
+            logger.error(f"❌ Worker pool error: {str(e)}")
+            self.stop()
+            raise
+    
+    def _release_attempts(self, jobs: List[Tuple[str, str]]):
+        """Uncount the starts of jobs that didn't crash their child (JOB_CRASH_LIMIT)"""
+        if not jobs:
+            return
+        db_service = self.db_service
+        try:
+            if db_service is None:
+                db_service = DatabaseService()
+            db_service.release_job_attempts(jobs)
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to release job attempts: {str(e)}")
+        finally:
+            if db_service is not None and db_service is not self.db_service:
+                db_service.disconnect()
+    
+    def stop(self):
+        """Stop the pool, letting running jobs finish"""
+        logger.info("🛑 Shutting down Transcription Worker pool...")
+        mark_not_ready()
+        with self._lock:
+            self._stopping = True
+        
+        # Before waiting on the children: if the stop grace period runs out,
+        # their jobs must not count as crashes on redelivery
+        if config.JOB_CRASH_LIMIT > 0 and self.executor:
+            running, _ = self._running_jobs(self.executor)
+            with self._lock:
+                jobs = [_attempt_key(job) for job, number in self._sent.values() if number in running]
+            self._release_attempts(jobs)
+        
+        try:
+            self.queue_service.disconnect()
+            if self.scheduler:
+                self.scheduler.shutdown(wait=False)
+            if self.executor:
+                self.executor.shutdown(wait=True, cancel_futures=True)
+            if self.db_service:
+                self.db_service.disconnect()
+        except Exception as e:
+            logger.error(f"❌ Error during shutdown: {str(e)}")
+        
+        logger.info("✅ Worker pool stopped")